@@ -0,0 +1,40 @@
+"""
+Сравнение кодеков кэша на странице из 50 фильмов (List[Film]).
+
+Запуск из корня репозитория:
+    PYTHONPATH=src python -m benchmarks.cache_codec
+"""
+from db.cacher.codec import OrjsonCodec, PickleCodec
+from models.film import Film
+
+from benchmarks.utils import best_of, load_films, print_table
+
+NUMBER = 200
+
+
+def main() -> None:
+    page = [Film(**row) for row in load_films(50)]
+
+    rows = []
+    for codec in (PickleCodec(), OrjsonCodec()):
+        payload = codec.encode(page)
+        assert codec.decode(payload) == page
+
+        rows.append(
+            [
+                type(codec).__name__,
+                len(payload),
+                f"{best_of(lambda: codec.encode(page), NUMBER):.1f}",
+                f"{best_of(lambda: codec.decode(payload), NUMBER):.1f}",
+            ]
+        )
+
+    print_table(
+        "List[Film], 50 items",
+        ["codec", "bytes", "encode, us", "decode, us"],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
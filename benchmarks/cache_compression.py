@@ -0,0 +1,100 @@
+"""
+Сжатие значений кэша: размер и время кодирования страниц фильмов и
+персон с фильмографией без сжатия, с zstd и с zstd со словарём.
+
+Запуск из корня репозитория:
+    PYTHONPATH=src python -m benchmarks.cache_compression [--save-dict PATH]
+
+С --save-dict обученный словарь сохраняется в файл, путь к которому
+указывается в настройке CACHE_ZSTD_DICT_PATH.
+"""
+import argparse
+import random
+from typing import List
+
+from db.cacher.codec import OrjsonCodec
+from db.cacher.compression import CompressedCodec, train_dictionary
+from models.film import Film
+from models.person import Person
+
+from benchmarks.utils import (
+    best_of,
+    load_dump,
+    load_persons_with_films,
+    print_table,
+)
+
+NUMBER = 100
+PAGE_SIZES = (10, 20, 50)
+
+
+def make_pages(rows: List, model: type, seed: int) -> List[list]:
+    rnd = random.Random(seed)
+    pages = []
+    for _ in range(300):
+        size = rnd.choice(PAGE_SIZES)
+        start = rnd.randrange(0, max(len(rows) - size, 1))
+        pages.append([model(**row) for row in rows[start:start + size]])
+    return pages
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--save-dict", help="куда сохранить словарь zstd")
+    args = parser.parse_args()
+
+    films = list(load_dump("film"))
+    persons = load_persons_with_films()
+
+    inner = OrjsonCodec()
+    train = make_pages(films, Film, 1) + make_pages(persons, Person, 1)
+    dict_data = train_dictionary([inner.encode(page) for page in train])
+
+    if args.save_dict:
+        with open(args.save_dict, "wb") as f_out:
+            f_out.write(dict_data)
+        print(f"Dictionary saved to {args.save_dict}")
+
+    codecs = [
+        ("plain", inner),
+        ("zstd", CompressedCodec(inner, threshold=0)),
+        (
+            "zstd+dict",
+            CompressedCodec(inner, threshold=0, dict_data=dict_data),
+        ),
+    ]
+
+    # проверяем на страницах, не участвовавших в обучении словаря
+    samples = [
+        ("List[Film] x50", [Film(**row) for row in films[-50:]]),
+        ("List[Film] x10", [Film(**row) for row in films[-60:-50]]),
+        ("List[Person] x50", [Person(**row) for row in persons[-50:]]),
+        ("Person", Person(**max(persons, key=lambda p: len(p["films"])))),
+    ]
+
+    rows = []
+    for title, value in samples:
+        plain_size = len(inner.encode(value))
+        for name, codec in codecs:
+            payload = codec.encode(value)
+            assert codec.decode(payload) == value
+            rows.append(
+                [
+                    title,
+                    name,
+                    len(payload),
+                    f"{plain_size / len(payload):.1f}",
+                    f"{best_of(lambda: codec.encode(value), NUMBER):.1f}",
+                    f"{best_of(lambda: codec.decode(payload), NUMBER):.1f}",
+                ]
+            )
+
+    print_table(
+        "Cache payload compression",
+        ["value", "codec", "bytes", "ratio", "encode, us", "decode, us"],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Нагрузка на ES при истечении кэша: воспроизведение потока запросов
+к ключам, записанным одной пачкой (холодный старт, сброс кэша).
+
+Сравниваются три режима cache_method: фиксированный TTL, TTL с
+разбросом (jitter) и разброс вместе с досрочным обновлением (XFetch).
+Время модельное, решения принимают те же функции, что и в
+cache_method.
+
+Средний TTL с разбросом тот же, поэтому за долгое время обращений
+к ES столько же; меняется их распределение по секундам. Окно
+прогона заканчивается посреди периода TTL: окно, кратное TTL,
+обрезает очередную волну фиксированного TTL целиком, а волны
+с разбросом только наполовину, и число обращений без разброса
+выходит заниженным.
+
+Запуск из корня репозитория:
+    PYTHONPATH=src python -m benchmarks.cache_expiry [--keys N]
+"""
+import argparse
+import heapq
+import random
+from collections import Counter
+from typing import Dict, Optional
+
+from db.cacher.entry import CacheEntry
+from db.cacher.expiry import jittered_ttl, should_recompute_early
+
+from benchmarks.utils import print_table
+
+EXPIRE = 300
+HORIZON = 20 * EXPIRE + EXPIRE // 2
+# воркеров, которые при промахе одновременно идут в ES
+WORKERS = 4
+
+MODES = [
+    ("fixed ttl", 0.0, None),
+    ("jitter 10%", 0.1, None),
+    ("jitter + xfetch", 0.1, 1.0),
+]
+
+
+def replay(
+    keys: int, rate: float, jitter: float, beta: Optional[float], seed: int
+) -> Dict[str, float]:
+    """
+    Прогоняет поток запросов и возвращает число обращений к ES
+    (всего, в пиковую секунду, 99-й перцентиль по секундам) и число
+    запросов, ждавших ответа ES.
+    """
+    rnd = random.Random(seed)
+    random.seed(seed)
+    deltas = [rnd.lognormvariate(-1.2, 0.6) for _ in range(keys)]
+
+    entries = {}
+    expires_at = {}
+    refreshing_until = {}
+    stampede: Counter = Counter()
+    es_calls: Counter = Counter()
+    waited = 0
+
+    def store(key: int, now: float) -> None:
+        ttl = jittered_ttl(EXPIRE, jitter)
+        entries[key] = CacheEntry(None, now + ttl, deltas[key])
+        expires_at[key] = now + ttl
+
+    for key in range(keys):
+        es_calls[0] += 1
+        store(key, deltas[key])
+
+    arrivals = [(rnd.expovariate(rate), key) for key in range(keys)]
+    heapq.heapify(arrivals)
+    while arrivals:
+        now, key = heapq.heappop(arrivals)
+        if now > HORIZON:
+            break
+        heapq.heappush(arrivals, (now + rnd.expovariate(rate), key))
+
+        busy_until = refreshing_until.get(key, 0.0)
+        if now >= expires_at[key]:
+            # промах: запрос ждёт ES, пока значение не записано
+            waited += 1
+            if now >= busy_until:
+                refreshing_until[key] = now + deltas[key]
+                stampede[key] = 0
+                store(key, now + deltas[key])
+            if stampede[key] < WORKERS:
+                # одновременные промахи на разных воркерах
+                stampede[key] += 1
+                es_calls[int(now)] += 1
+            continue
+
+        if (
+            beta is not None
+            and now >= busy_until
+            and should_recompute_early(entries[key], beta, now=now)
+        ):
+            refreshing_until[key] = now + deltas[key]
+            es_calls[int(now)] += 1
+            store(key, now + deltas[key])
+
+    steady = [es_calls[second] for second in range(1, HORIZON)]
+    return {
+        "calls": sum(steady),
+        "peak": max(steady),
+        "p99": sorted(steady)[int(len(steady) * 0.99)],
+        "waited": waited,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--keys", type=int, default=500)
+    parser.add_argument(
+        "--rate", type=float, default=2.0, help="запросов в секунду на ключ"
+    )
+    args = parser.parse_args()
+
+    rows = []
+    for name, jitter, beta in MODES:
+        result = replay(args.keys, args.rate, jitter, beta, seed=1)
+        rows.append(
+            [
+                name,
+                result["calls"],
+                result["peak"],
+                result["p99"],
+                result["waited"],
+            ]
+        )
+
+    print_table(
+        f"ES calls after a burst of {args.keys} keys, TTL {EXPIRE}s, "
+        f"{args.rate} rps per key, {HORIZON}s replay",
+        ["mode", "ES calls", "peak/s", "p99/s", "waited on ES"],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
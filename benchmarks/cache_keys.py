@@ -0,0 +1,56 @@
+"""
+Сравнение построения ключей кэша: старый pickle+sha256 и form_key.
+Хэширование длинных аргументов в form_key ограничивает длину ключа
+(столбец bytes), а не ускоряет его построение.
+
+Запуск из корня репозитория:
+    PYTHONPATH=src python -m benchmarks.cache_keys
+"""
+import pickle
+from hashlib import sha256
+
+from db.cacher.keys import form_key
+
+from benchmarks.utils import best_of, print_table
+
+NUMBER = 20000
+
+CALLS = [
+    ("get_by_id", ("3d825f60-9fff-4dfe-b294-1a45fa1e115d",), {}),
+    ("render_popular_films", ("-imdb_rating", 50, 1, None), {}),
+    ("render_search", ("Star Wars", 50, 3), {}),
+    ("render_search", ("long query " * 20, 50, 1), {}),
+]
+
+
+def legacy_form_key(*args, **kwargs) -> str:
+    return sha256(pickle.dumps((args, kwargs))).hexdigest()
+
+
+def main() -> None:
+    rows = []
+    for name, args, kwargs in CALLS:
+        namespace = f"FilmService.{name}"
+        legacy = best_of(
+            lambda: legacy_form_key(name, args, kwargs), NUMBER
+        )
+        new = best_of(lambda: form_key(namespace, args, kwargs), NUMBER)
+        rows.append(
+            [
+                name,
+                f"{legacy:.2f}",
+                f"{new:.2f}",
+                len(form_key(namespace, args, kwargs)),
+                form_key(namespace, args, kwargs),
+            ]
+        )
+
+    print_table(
+        "Cache key building, us per key",
+        ["method", "pickle+sha256", "form_key", "bytes", "key"],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Сборка моделей из документов ES на странице из 50 документов:
+model(**row) для каждого документа (как было), строгий режим
+models.decode (валидация списка одним TypeAdapter) и доверенный
+режим (сборка без валидации).
+
+Запуск из корня репозитория:
+    PYTHONPATH=src python -m benchmarks.model_decode
+"""
+from models import decode
+from models.film import Film, FilmShort
+from models.person import Person
+
+from benchmarks.utils import (
+    best_of,
+    load_films,
+    load_persons_with_films,
+    print_table,
+)
+
+NUMBER = 200
+PAGE_SIZE = 50
+
+
+def decode_many(model, rows, trusted):
+    decode.trusted = trusted
+    try:
+        return decode.decode_many(model, rows)
+    finally:
+        decode.trusted = False
+
+
+def main() -> None:
+    films = load_films(PAGE_SIZE)
+    # персоны с самыми длинными фильмографиями
+    persons = sorted(
+        load_persons_with_films(), key=lambda row: -len(row["films"])
+    )[:PAGE_SIZE]
+
+    rows = []
+    for model, page in ((Film, films), (FilmShort, films), (Person, persons)):
+        expected = [model(**row) for row in page]
+        for trusted in (False, True):
+            result = decode_many(model, page, trusted)
+            assert result == expected
+            assert [m.model_dump_json() for m in result] == [
+                m.model_dump_json() for m in expected
+            ]
+
+        old = best_of(lambda: [model(**row) for row in page], NUMBER)
+        strict = best_of(lambda: decode_many(model, page, False), NUMBER)
+        trusted = best_of(lambda: decode_many(model, page, True), NUMBER)
+        rows.append(
+            [
+                model.__name__,
+                f"{old:.1f}",
+                f"{strict:.1f}",
+                f"{trusted:.1f}",
+                f"{old - trusted:.1f}",
+            ]
+        )
+
+    print_table(
+        f"Models from {PAGE_SIZE} ES documents",
+        ["model", "model(**row), us", "strict, us", "trusted, us",
+         "saved, us"],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
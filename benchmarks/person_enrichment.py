@@ -0,0 +1,130 @@
+"""
+Сборка страницы персон с фильмографиями: фильмы каждой персоны
+отдельным поиском по очереди (как было) и фильмы всех персон
+страницы одним поиском.
+
+Вместо ES - поиск в памяти по дампу с задержкой RTT на каждый поиск,
+поэтому время складывается в основном из числа запросов. KB - объём
+найденных документов фильмов, который передал бы ES.
+
+Запуск из корня репозитория:
+    PYTHONPATH=src python -m benchmarks.person_enrichment
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List
+
+import orjson
+
+from db.searcher import query_factory
+from db.searcher.memory_searcher import InMemorySearchEngine
+from db.searcher.query import FilmsByPersonIDQuery
+from models.person import Person, PersonFilm
+from models.query_params import QueryParams
+from services.person import PERSON_ROLE_FIELDS, PersonService
+
+from benchmarks.utils import DUMP_DIR, print_table
+
+RTT = 0.001
+QUERIES = ("george", "john", "michael")
+PAGE_SIZE = 50
+
+
+def slow_engine() -> InMemorySearchEngine:
+    """Поиск в памяти с сетевой задержкой, счётчиком поисков и байт"""
+    engine = InMemorySearchEngine.from_dump(DUMP_DIR)
+    search = engine.search
+
+    async def slow_search(data_source: str, search_query: Any) -> Any:
+        engine.searches += 1
+        await asyncio.sleep(RTT)
+        result = await search(data_source, search_query)
+        engine.bytes += len(orjson.dumps(result.items))
+        return result
+
+    engine.searches = 0
+    engine.bytes = 0
+    engine.search = slow_search
+    return engine
+
+
+async def one_by_one(
+    engine: InMemorySearchEngine, rows: List[Dict[str, Any]]
+) -> List[Person]:
+    persons = []
+    for row in rows:
+        params = QueryParams(query=row["id"], page_size=50, page_number=1)
+        query = query_factory(engine, FilmsByPersonIDQuery, params)
+        films = (await engine.search("film", query)).items
+        person_films = [
+            PersonFilm(
+                uuid=film["id"],
+                roles=[
+                    role
+                    for field, role in PERSON_ROLE_FIELDS.items()
+                    if any(p["id"] == row["id"] for p in film[field])
+                ],
+            )
+            for film in films
+        ]
+        persons.append(Person(**row, films=person_films))
+    return persons
+
+
+async def measure(engine: InMemorySearchEngine, coro: Any) -> List[Any]:
+    engine.searches = engine.bytes = 0
+    started = time.perf_counter()
+    persons = await coro
+    elapsed = (time.perf_counter() - started) * 1e3
+    return [
+        engine.searches, f"{elapsed:.1f}", f"{engine.bytes / 1024:.1f}",
+        persons,
+    ]
+
+
+async def main() -> None:
+    logging.disable(logging.WARNING)
+    engine = slow_engine()
+    service = PersonService(cache=None, search_engine=engine)
+
+    rows = []
+    for text in QUERIES:
+        query = service._get_query(text, PAGE_SIZE, 1)
+        page = (await engine.search("person", query)).items
+
+        old_searches, old_ms, old_kb, old = await measure(
+            engine, one_by_one(engine, page)
+        )
+        new_searches, new_ms, new_kb, new = await measure(
+            engine, service._make_models(page)
+        )
+        same = all(
+            {f.uuid: f.roles for f in a.films}
+            == {f.uuid: f.roles for f in b.films}
+            for a, b in zip(old, new)
+        )
+        rows.append(
+            [
+                text,
+                len(page),
+                old_searches,
+                old_ms,
+                old_kb,
+                new_searches,
+                new_ms,
+                new_kb,
+                "yes" if same else "NO",
+            ]
+        )
+
+    print_table(
+        f"Person page enrichment, {RTT * 1e3:.0f} ms per search",
+        ["query", "persons", "old searches", "old ms", "old KB",
+         "new searches", "new ms", "new KB", "same films"],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,101 @@
+"""
+Тело ответа /v1/films для страницы из 50 фильмов: через модели
+(FilmPage в кэше, FilmSchema в обработчике, проверка и сериализация
+по response_model в FastAPI, как было) и отрендеренное сразу
+из документов ES, которое лежит в кэше готовыми байтами.
+
+Запуск из корня репозитория:
+    PYTHONPATH=src python -m benchmarks.response_render
+"""
+from typing import List, Optional
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from db.cacher.codec import OrjsonCodec
+from db.searcher import SearchResult
+from models import decode
+from models.film import FilmShort
+from models.page import Page
+from schemas.film import FilmSchema
+from utils.render import render_page
+
+from benchmarks.utils import best_of, load_films, print_table
+
+NUMBER = 200
+PAGE_SIZE = 50
+
+response_adapter = TypeAdapter(List[FilmSchema])
+
+
+class FilmPage(Page):
+    """Страница фильмов, которую сервис кэшировал до рендеринга"""
+
+    items: List[FilmShort]
+    next_cursor: Optional[str] = None
+
+
+def old_body(page: FilmPage) -> bytes:
+    """Схемы в обработчике, затем response_model и orjson в FastAPI"""
+    items = [
+        FilmSchema(uuid=hit.uuid, title=hit.title, imdb_rating=hit.imdb_rating)
+        for hit in page.items
+    ]
+    validated = response_adapter.validate_python(
+        [item.model_dump() for item in items]
+    )
+    return orjson.dumps(jsonable_encoder(validated))
+
+
+def main() -> None:
+    fields = ("id", "title", "imdb_rating")
+    rows = [
+        {key: row.get(key) for key in fields} for row in load_films(PAGE_SIZE)
+    ]
+    result = SearchResult(items=rows, total=PAGE_SIZE)
+    codec = OrjsonCodec()
+
+    def model_page() -> FilmPage:
+        return FilmPage(
+            items=decode.decode_many(FilmShort, rows), total=PAGE_SIZE
+        )
+
+    decode.trusted = True
+    try:
+        page = model_page()
+        rendered = render_page(FilmSchema, result)
+        assert old_body(page) == rendered.body
+
+        page_payload = codec.encode(page)
+        rendered_payload = codec.encode(rendered)
+        assert codec.decode(rendered_payload) == rendered
+
+        miss = [
+            best_of(
+                lambda: (old_body(page), codec.encode(model_page())), NUMBER
+            ),
+            best_of(
+                lambda: codec.encode(render_page(FilmSchema, result)), NUMBER
+            ),
+        ]
+        hit = [
+            best_of(lambda: old_body(codec.decode(page_payload)), NUMBER),
+            best_of(lambda: codec.decode(rendered_payload).body, NUMBER),
+        ]
+    finally:
+        decode.trusted = False
+
+    print_table(
+        f"/v1/films body, {PAGE_SIZE} films",
+        ["", "models", "rendered"],
+        [
+            ["cache miss, us"] + [f"{us:.1f}" for us in miss],
+            ["cache hit, us"] + [f"{us:.1f}" for us in hit],
+            ["cache entry, bytes", len(page_payload), len(rendered_payload)],
+        ],
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Пропускная способность поиска при большом числе одновременных запросов:
+каждый запрос отдельным search и запросы, объединённые в _msearch.
+
+Вместо ES используется заглушка с моделью стоимости: пул из
+CONNECTIONS соединений (как у клиента по умолчанию), задержка сети
+RTT на каждый HTTP-запрос и SEARCH_THREADS потоков поиска на сервере,
+каждый запрос занимает поток на QUERY_TIME.
+
+Запуск из корня репозитория:
+    PYTHONPATH=src python -m benchmarks.search_msearch
+"""
+import asyncio
+import statistics
+import time
+from typing import Any, Dict, List
+
+from elasticsearch import AsyncElasticsearch
+
+from db.searcher import query_factory
+from db.searcher.batching import MSearchBatcher
+from db.searcher.elastic_searcher import ElasticSearchEngine
+from db.searcher.query import PopularFilmQuery
+from models.query_params import SortableQueryParams
+
+from benchmarks.utils import load_films, print_table
+
+CONNECTIONS = 10
+RTT = 0.001
+SEARCH_THREADS = 8
+QUERY_TIME = 0.0002
+CONCURRENCY = (500, 1000, 2000)
+
+
+class StandInElasticsearch(AsyncElasticsearch):
+    """Заглушка ES: отвечает страницей фильмов из дампа"""
+
+    def __init__(self) -> None:
+        super().__init__("http://localhost:9200")
+        self.requests = 0
+        self._hits = {
+            "hits": {"hits": [{"_source": row} for row in load_films(10)]}
+        }
+        self._connections = asyncio.Semaphore(CONNECTIONS)
+        self._threads = asyncio.Semaphore(SEARCH_THREADS)
+
+    async def _query(self) -> Dict[str, Any]:
+        async with self._threads:
+            await asyncio.sleep(QUERY_TIME)
+        return self._hits
+
+    async def _http(self, queries: int) -> List[Dict[str, Any]]:
+        async with self._connections:
+            self.requests += 1
+            await asyncio.sleep(RTT / 2)
+            result = await asyncio.gather(
+                *(self._query() for _ in range(queries))
+            )
+            await asyncio.sleep(RTT / 2)
+            return result
+
+    async def search(self, **kwargs: Any) -> Dict[str, Any]:
+        return (await self._http(1))[0]
+
+    async def msearch(self, **kwargs: Any) -> Dict[str, Any]:
+        return {"responses": await self._http(len(kwargs["searches"]) // 2)}
+
+
+async def run(concurrency: int, batched: bool) -> List[Any]:
+    client = StandInElasticsearch()
+    batcher = MSearchBatcher(client) if batched else None
+    engine = ElasticSearchEngine(client, batcher=batcher)
+    latencies = []
+
+    async def one(i: int) -> None:
+        params = SortableQueryParams(
+            query=None, page_size=10, page_number=i % 5 + 1, sort="-title"
+        )
+        query = query_factory(engine, PopularFilmQuery, params)
+        started = time.perf_counter()
+        await engine.search("film", query)
+        latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    await client.close()
+
+    latencies.sort()
+    return [
+        concurrency,
+        "msearch" if batched else "search",
+        client.requests,
+        f"{concurrency / elapsed:.0f}",
+        f"{statistics.median(latencies) * 1000:.1f}",
+        f"{latencies[int(len(latencies) * 0.99)] * 1000:.1f}",
+    ]
+
+
+def main() -> None:
+    rows = []
+    for concurrency in CONCURRENCY:
+        for batched in (False, True):
+            rows.append(asyncio.run(run(concurrency, batched)))
+
+    print_table(
+        "Concurrent searches against an ES stand-in "
+        f"({CONNECTIONS} connections, RTT {RTT * 1000:.0f} ms)",
+        ["concurrent", "mode", "HTTP requests", "queries/s", "p50 ms",
+         "p99 ms"],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
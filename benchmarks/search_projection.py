@@ -0,0 +1,77 @@
+"""
+Проекция _source для списков фильмов: размер ответа ES и время
+разбора страницы в модели при полных документах (Film) и при
+запросе только полей FilmShort.
+
+Запуск из корня репозитория:
+    PYTHONPATH=src python -m benchmarks.search_projection
+"""
+from typing import Any, Dict, List
+
+import orjson
+
+from db.searcher import source_fields
+from models.film import Film, FilmShort
+
+from benchmarks.utils import best_of, load_dump, print_table
+
+NUMBER = 200
+PAGE_SIZES = (10, 50)
+
+
+def es_response(rows: List[Dict[str, Any]]) -> bytes:
+    hits = [
+        {"_index": "film", "_id": row["id"], "_source": row} for row in rows
+    ]
+    return orjson.dumps({"hits": {"hits": hits}})
+
+
+def parse(payload: bytes, model: type) -> list:
+    hits = orjson.loads(payload)["hits"]["hits"]
+    return [model(**hit["_source"]) for hit in hits]
+
+
+def main() -> None:
+    films = list(load_dump("film"))
+    fields = source_fields(FilmShort)
+    projected = [{k: row.get(k) for k in fields} for row in films]
+
+    rows = []
+    for size in PAGE_SIZES:
+        # самые «тяжёлые» страницы: фильмы с наибольшим числом персон
+        heavy = sorted(
+            films,
+            key=lambda f: -len(f["actors"]) - len(f["writers"]),
+        )[:size]
+        heavy_ids = {film["id"] for film in heavy}
+        short = [row for row in projected if row["id"] in heavy_ids]
+
+        full_payload = es_response(heavy)
+        short_payload = es_response(short)
+        full_time = best_of(lambda: parse(full_payload, Film), NUMBER)
+        short_time = best_of(
+            lambda: parse(short_payload, FilmShort), NUMBER
+        )
+        rows.append(
+            [
+                size,
+                len(full_payload),
+                len(short_payload),
+                f"{len(full_payload) / len(short_payload):.1f}x",
+                f"{full_time:.1f}",
+                f"{short_time:.1f}",
+                f"{full_time / short_time:.1f}x",
+            ]
+        )
+
+    print_table(
+        "ES response size and decode time of a film page "
+        f"(_source includes {fields})",
+        ["page", "full B", "projected B", "bytes", "Film us",
+         "FilmShort us", "speedup"],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Построение запроса через query_factory: прежний поиск реализации
+обходом всех подклассов абстрактного запроса на каждый вызов
+и поиск в реестре, заполненном register_query.
+
+Запуск из корня репозитория:
+    PYTHONPATH=src python -m benchmarks.search_query_factory
+"""
+from typing import Type
+
+from db.searcher import IQuery, _query_registry, query_factory
+from db.searcher.elastic_searcher import ElasticSearchEngine
+from db.searcher.query import FilmsByPersonIDQuery, PopularFilmQuery
+from models.query_params import QueryParams, SortableQueryParams
+from utils.utils import get_all_subclasses
+
+from benchmarks.utils import best_of, print_table
+
+NUMBER = 20_000
+
+
+def walk_resolve(engine_cls: Type, query_cls: Type[IQuery]) -> Type[IQuery]:
+    """Поиск реализации до реестра: обход иерархии на каждый вызов"""
+    linked_query = [
+        cls
+        for cls in get_all_subclasses(query_cls)
+        if cls.linked_searcher_class == engine_cls
+    ]
+    if len(linked_query) != 1:
+        raise ValueError(f"No single query class in {query_cls.__name__}")
+    return linked_query[0]
+
+
+def walk_factory(
+    engine_cls: Type, query_cls: Type[IQuery], params: QueryParams
+) -> IQuery:
+    return walk_resolve(engine_cls, query_cls)(params)
+
+
+def main() -> None:
+    cases = [
+        (
+            FilmsByPersonIDQuery,
+            QueryParams(query="id", page_size=50, page_number=1),
+        ),
+        (
+            PopularFilmQuery,
+            SortableQueryParams(
+                query=None, page_size=50, page_number=1, sort="-imdb_rating"
+            ),
+        ),
+    ]
+
+    rows = []
+    for query_cls, params in cases:
+        key = (ElasticSearchEngine, query_cls)
+        walk_lookup = best_of(
+            lambda: walk_resolve(ElasticSearchEngine, query_cls), NUMBER
+        )
+        registry_lookup = best_of(lambda: _query_registry[key], NUMBER)
+        walk = best_of(
+            lambda: walk_factory(ElasticSearchEngine, query_cls, params),
+            NUMBER,
+        )
+        registry = best_of(
+            lambda: query_factory(ElasticSearchEngine, query_cls, params),
+            NUMBER,
+        )
+        rows.append(
+            [
+                query_cls.__name__,
+                f"{walk_lookup:.2f}",
+                f"{registry_lookup:.2f}",
+                f"{walk:.2f}",
+                f"{registry:.2f}",
+                f"{walk / registry:.1f}x",
+            ]
+        )
+
+    print_table(
+        "Query class lookup and whole query_factory call, us per call",
+        ["query", "walk lookup", "registry lookup", "walk call",
+         "registry call", "speedup"],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Подготовка тела поискового запроса на стороне клиента: dict,
+сериализуемый JSON-сериализатором клиента ES, и тело из заранее
+сериализованного шаблона запроса с подставленными параметрами.
+
+Запуск из корня репозитория:
+    PYTHONPATH=src python -m benchmarks.search_templates
+"""
+import asyncio
+
+from elasticsearch import AsyncElasticsearch
+
+from db.searcher import query_factory, source_fields
+from db.searcher.elastic_searcher import ElasticSearchEngine
+from db.searcher.query import FilmsByPersonIDQuery, PopularFilmQuery
+from models.film import FilmShort
+from models.query_params import QueryParams, SortableQueryParams
+
+from benchmarks.utils import best_of, print_table
+
+NUMBER = 20_000
+
+
+def main() -> None:
+    client = AsyncElasticsearch("http://localhost:9200")
+    serializer = client.transport.serializers.get_serializer(
+        "application/json"
+    )
+    fields = source_fields(FilmShort)
+    cases = [
+        (
+            "films_by_person",
+            FilmsByPersonIDQuery,
+            QueryParams(
+                query="a5a8f573-3cee-4ccc-8a2b-91cb9f55250a",
+                page_size=50,
+                page_number=1,
+            ),
+        ),
+        (
+            "film_popular_by_genre",
+            PopularFilmQuery,
+            SortableQueryParams(
+                query="3d8d9bf5-0d90-4353-88ba-4ccc5d2c07ff",
+                page_size=50,
+                page_number=2,
+                sort="-imdb_rating",
+            ),
+        ),
+    ]
+
+    rows = []
+    for name, query_cls, params in cases:
+        for templates in (False, True):
+            engine = ElasticSearchEngine(client, templates=templates)
+
+            def prepare() -> bytes:
+                query = query_factory(engine, query_cls, params, fields)
+                return serializer.dumps(engine._search_request(query))
+
+            rows.append(
+                [
+                    name,
+                    "template" if templates else "dict",
+                    len(prepare()),
+                    f"{best_of(prepare, NUMBER):.2f}",
+                ]
+            )
+
+    asyncio.run(client.close())
+    print_table(
+        "Search request body: query_factory + serialization, us per call",
+        ["query", "mode", "bytes", "us"],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
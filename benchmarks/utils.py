@@ -0,0 +1,61 @@
+import json
+import pathlib
+import timeit
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterator, List
+
+DUMP_DIR = pathlib.Path(__file__).resolve().parent.parent / "elasticdump"
+
+
+def load_dump(index: str) -> Iterator[Dict[str, Any]]:
+    """Читает документы индекса из файла elasticdump/<index>_dump.json"""
+    with open(DUMP_DIR / f"{index}_dump.json") as f_in:
+        for line in f_in:
+            yield json.loads(line)["_source"]
+
+
+def load_films(limit: int = 50) -> List[Dict[str, Any]]:
+    return [row for _, row in zip(range(limit), load_dump("film"))]
+
+
+def load_persons_with_films() -> List[Dict[str, Any]]:
+    """
+    Персоны из дампа с фильмографией в том виде,
+    в котором её собирает PersonService
+    """
+    roles = defaultdict(lambda: defaultdict(set))
+    for film in load_dump("film"):
+        for field, role in (
+            ("actors", "actor"),
+            ("directors", "director"),
+            ("writers", "writer"),
+        ):
+            for person in film[field]:
+                roles[person["id"]][film["id"]].add(role)
+
+    return [
+        {
+            **person,
+            "films": [
+                {"uuid": film_id, "roles": sorted(film_roles)}
+                for film_id, film_roles in roles[person["id"]].items()
+            ],
+        }
+        for person in load_dump("person")
+    ]
+
+
+def best_of(func: Callable[[], Any], number: int, repeat: int = 5) -> float:
+    """Возвращает лучшее время одного вызова func в микросекундах"""
+    timer = timeit.Timer(func)
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1e6
+
+
+def print_table(title: str, header: List[str], rows: List[List[Any]]) -> None:
+    print(f"\n{title}")
+    widths = [
+        max(len(str(cell)) for cell in column)
+        for column in zip(header, *rows)
+    ]
+    for row in [header, *rows]:
+        print("  ".join(str(c).rjust(w) for c, w in zip(row, widths)))
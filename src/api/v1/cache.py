@@ -0,0 +1,56 @@
+from typing import Dict
+
+from fastapi import APIRouter, Depends
+
+from db.cacher import AbstractCache, get_cacher
+from db.cacher.stats import cache_stats
+from db.redis import invalidate_documents
+from schemas.cache import InvalidateResultSchema, InvalidateSchema
+from services.auth import PermissionChecker
+
+router = APIRouter(
+    dependencies=[Depends(PermissionChecker(required="ADMIN"))],
+)
+
+
+@router.get(
+    "/stats",
+    response_model=Dict[str, float],
+    summary="Счётчики кэша",
+    description="Возвращает счётчики кэша текущего воркера: "
+    "сколько вычислений выполнено и сколько запросов к ним присоединилось, "
+    "степень и время сжатия значений",
+)
+async def get_cache_stats() -> Dict[str, float]:
+    """
+    Обработчик маршрута api/v1/cache/stats,
+    служебный, доступен только администратору.
+    """
+    stats = cache_stats.snapshot()
+    if stats.get("compress_out_bytes"):
+        stats["compression_ratio"] = (
+            stats["compress_in_bytes"] / stats["compress_out_bytes"]
+        )
+    return stats
+
+
+@router.post(
+    "/invalidate",
+    response_model=InvalidateResultSchema,
+    summary="Инвалидация кэша по документам",
+    description="Удаляет из кэша все результаты, построенные "
+    "из переданных документов индекса",
+)
+async def invalidate_cache(
+    body: InvalidateSchema,
+    cacher: AbstractCache = Depends(get_cacher),
+) -> InvalidateResultSchema:
+    """
+    Обработчик маршрута api/v1/cache/invalidate,
+    вызывается при изменении документов в ES.
+    Параметры:
+      :body: InvalidateSchema индекс и id изменённых документов
+    Возвращает: кол-во удалённых записей кэша
+    """
+    keys = await invalidate_documents(cacher, body.index, body.ids)
+    return InvalidateResultSchema(evicted=len(keys))
@@ -1,12 +1,15 @@
 import logging
 from http import HTTPStatus
-from typing import List, Optional
+from typing import AsyncIterator, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 
+from db.searcher.cursor import InvalidCursorError
 from schemas.film import FilmDetailSchema, FilmPerson, FilmSchema, GenreFilm
-from services.film import FilmService, get_film_service
-from utils.film_utils import get_response_list, validate_page_number
+from services.film import VALID_SORT_OPT, FilmService, get_film_service
+from utils.film_utils import validate_page_number
+from utils.render import json_response
 from services.auth import PermissionChecker
 import utils.response_getter as rg
 
@@ -16,15 +19,6 @@ router = APIRouter(
     dependencies=[Depends(PermissionChecker(required="USER"))],
 )
 
-VALID_SORT_OPT = (
-    "-imdb_rating",
-    "imdb_rating",
-    "-title",
-    "title",
-    "-creation_date",
-    "creation_date",
-)
-
 
 @router.get(
     "/search",
@@ -41,7 +35,7 @@ async def search_in_films(
     ),
     page_number: int = Query(1, ge=1, description="Номер страницы выдачи"),
     film_service: FilmService = Depends(get_film_service),
-) -> List[FilmSchema]:
+) -> Response:
     """
     Обработчик маршрута api/v1/films/search,
     ищет фильмы в БД по ключевому слову
@@ -51,24 +45,17 @@ async def search_in_films(
       :page_number: int Номер страницы выдачи
       :film_service: Сервис, управляющий извлечением данных из ES
     Возвращает:
-    Модель PopularFilmsSchema - список с вложенными фильмами
+    Список FilmSchema, отрендеренный сервисом в тело ответа
     """
     if not query:
-        return []
-    total = await film_service.get_total_films_count()
-    max_pages = (total + page_size - 1) // page_size
-    validate_page_number(page_number, max_pages)
+        return json_response(b"[]")
 
     logger.debug("Start searching by query")
-    result = await film_service.search(query, page_size, page_number)
-    if not result:
-        return []
+    page = await film_service.render_search(query, page_size, page_number)
+    validate_page_number(page_number, page_size, page.total)
 
-    logger.debug("Start creating response list")
-    resp_list: List[FilmSchema] = await get_response_list(lst=result)
-
-    logger.debug("Returning popular films")
-    return resp_list
+    logger.debug("Returning found films")
+    return json_response(page.body)
 
 
 @router.get(
@@ -86,8 +73,13 @@ async def get_popular_films(
         50, ge=1, le=50, description="Кол-во фильмов в выдаче (1-50)"
     ),
     page_number: int = Query(1, ge=1, description="Номер страницы выдачи"),
-    film_service: FilmService = Depends(get_film_service)
-) -> List[FilmSchema]:
+    cursor: Optional[str] = Query(
+        None,
+        description="Курсор из заголовка X-Next-Cursor предыдущей страницы, "
+        "если передан, page_number не учитывается",
+    ),
+    film_service: FilmService = Depends(get_film_service),
+) -> Response:
     """
     Обработчик маршрута api/v1/films,
     ищет фильмы в БД. Есть возможность фильтровать по жанрам.
@@ -96,31 +88,85 @@ async def get_popular_films(
       :genre_id: str UUID жанра для фильтрации
       :page_size: int Кол-во фильмов в выдаче
       :page_number: int Номер страницы выдачи
+      :cursor: str Курсор следующей страницы, выданный предыдущим ответом
       :film_service: Сервис, управляющий извлечением данных из ES
     Возвращает:
-    Модель PopularFilmsSchema - список с вложенными фильмами
+    Список FilmSchema, отрендеренный сервисом в тело ответа,
+    курсор следующей страницы - в заголовке X-Next-Cursor
     """
-    total = await film_service.get_total_films_count()
-    max_pages = (total + page_size - 1) // page_size
-    validate_page_number(page_number, max_pages)
-
     if sort not in VALID_SORT_OPT:
         raise HTTPException(
             status_code=HTTPStatus.BAD_REQUEST,
             detail=f"Недопустимое поле: {sort}. Допустимые: {VALID_SORT_OPT}",
         )
     logger.debug("Start searching popular films")
-    result = await film_service.get_popular_films(
-        sort, page_size, page_number, genre_id
-    )
-    logger.debug("Start creating response list")
-    if not result:
+    try:
+        if cursor is None:
+            page = await film_service.render_popular_films(
+                sort, page_size, page_number, genre_id
+            )
+        else:
+            page = await film_service.render_films_after_cursor(
+                sort, page_size, genre_id, cursor
+            )
+    except InvalidCursorError:
         raise HTTPException(
-            status_code=HTTPStatus.NOT_FOUND, detail="Films not found"
+            status_code=HTTPStatus.BAD_REQUEST, detail="Недопустимый курсор"
         )
-    resp_list: List[FilmSchema] = await get_response_list(lst=result)
+    if cursor is None:
+        # total посчитан по фильтру жанра в том же запросе
+        validate_page_number(page_number, page_size, page.total)
+        if not page.ids:
+            raise HTTPException(
+                status_code=HTTPStatus.NOT_FOUND, detail="Films not found"
+            )
+    response = json_response(page.body)
+    if page.next_cursor:
+        response.headers["X-Next-Cursor"] = page.next_cursor
     logger.debug("Returning popular films")
-    return resp_list
+    return response
+
+
+@router.get(
+    "/export",
+    response_class=StreamingResponse,
+    summary="Выгрузка фильмов",
+    description="Выгружает все фильмы, сортированные и с возможностью \
+                фильтрации по жанру, в формате NDJSON: по фильму \
+                в строке, ответ передаётся по частям",
+    responses=rg.export_films_response(),
+)
+async def export_films(
+    sort: str = "-imdb_rating",
+    genre_id: Optional[str] = None,
+    film_service: FilmService = Depends(get_film_service),
+) -> StreamingResponse:
+    """
+    Обработчик маршрута api/v1/films/export,
+    отдаёт фильмы пачками по мере чтения из ES, минуя кэш
+    Параметры:
+      :sort: str Поле для сортировки выдачи
+      :genre_id: str UUID жанра для фильтрации
+      :film_service: Сервис, управляющий извлечением данных из ES
+    """
+    if sort not in VALID_SORT_OPT:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail=f"Недопустимое поле: {sort}. Допустимые: {VALID_SORT_OPT}",
+        )
+
+    async def lines() -> AsyncIterator[bytes]:
+        batches = film_service.export_films(sort, genre_id)
+        try:
+            async for films in batches:
+                # одна часть ответа на пачку, а не на каждый фильм
+                yield "".join(
+                    film.model_dump_json() + "\n" for film in films
+                ).encode()
+        finally:
+            await batches.aclose()
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
 
 
 @router.get(
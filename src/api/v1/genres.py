@@ -1,13 +1,14 @@
 from http import HTTPStatus
 from typing import List
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 
 from schemas.genre import GenreSchema
 from services.auth import PermissionChecker
 from services.genre import GenreService, get_genre_service
 import utils.response_getter as rg
 from utils.film_utils import validate_page_number
+from utils.render import json_response
 
 router = APIRouter(
     dependencies=[Depends(PermissionChecker(required="USER"))],
@@ -27,26 +28,17 @@ async def get_genres(
     ),
     page_number: int = Query(1, ge=1, description="Номер страницы выдачи"),
     genre_service: GenreService = Depends(get_genre_service),
-) -> List[GenreSchema]:
+) -> Response:
     """
     Обработчик маршрута api/v1/genres,
     """
-    total = await genre_service.get_total_genres_count()
-
-    max_pages = (total + page_size - 1) // page_size
-
-    validate_page_number(page_number, max_pages)
-
-    genre_list = await genre_service.search("", page_size, page_number)
+    genre_page = await genre_service.render_search(
+        "", page_size, page_number
+    )
 
-    resp_list = [
-        GenreSchema(
-            uuid=genre.id, name=genre.name, description=genre.description
-        )
-        for genre in genre_list
-    ]
+    validate_page_number(page_number, page_size, genre_page.total)
 
-    return resp_list
+    return json_response(genre_page.body)
 
 
 @router.get(
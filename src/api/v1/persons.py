@@ -43,15 +43,14 @@ async def search_persons(
     """
     if not query:
         return []
-    total = await person_service.get_total_persons_count()
-    max_pages = (total + page_size - 1) // page_size
-    validate_page_number(page_number, max_pages)
 
-    person_list = await person_service.search(query, page_size, page_number)
+    person_page = await person_service.search(query, page_size, page_number)
+
+    validate_page_number(page_number, page_size, person_page.total)
 
     persons = []
 
-    for person in person_list:
+    for person in person_page.items:
 
         films_list = [
             PersonFilmSchema(uuid=pf.uuid, roles=pf.roles)
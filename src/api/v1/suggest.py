@@ -0,0 +1,57 @@
+from fastapi import APIRouter, Depends, Query
+
+from schemas.suggest import (
+    FilmSuggestSchema,
+    PersonSuggestSchema,
+    SuggestSchema,
+)
+from services.auth import PermissionChecker
+from services.suggest import SuggestService, get_suggest_service
+import utils.response_getter as rg
+
+router = APIRouter(
+    dependencies=[Depends(PermissionChecker(required="USER"))],
+)
+
+
+@router.get(
+    "/",
+    response_model=SuggestSchema,
+    summary="Подсказки поиска",
+    description="Фильмы и персоны, слова названия или имени которых \
+                начинаются со слов введённого текста, для подсказок \
+                по мере набора",
+    responses=rg.suggest_response(),
+)
+async def suggest(
+    query: str = Query(
+        ...,
+        min_length=2,
+        max_length=100,
+        description="Начало названия фильма или имени персоны",
+    ),
+    size: int = Query(
+        5, ge=1, le=10, description="Кол-во подсказок каждого вида (1-10)"
+    ),
+    suggest_service: SuggestService = Depends(get_suggest_service),
+) -> SuggestSchema:
+    """
+    Обработчик маршрута api/v1/suggest,
+    отдаёт из кэша подсказки для строки поиска
+    Параметры:
+      :query: str Введённый текст
+      :size: int Кол-во подсказок каждого вида
+      :suggest_service: Сервис подсказок
+    """
+    suggestions = await suggest_service.suggest(query, size)
+
+    return SuggestSchema(
+        films=[
+            FilmSuggestSchema(uuid=film.uuid, title=film.title)
+            for film in suggestions.films
+        ],
+        persons=[
+            PersonSuggestSchema(uuid=person.uuid, full_name=person.full_name)
+            for person in suggestions.persons
+        ],
+    )
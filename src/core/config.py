@@ -1,7 +1,12 @@
 import os
+from typing import Literal
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+ROOT_DIR = os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+)
+
 
 class Settings(BaseSettings):
     model_config = SettingsConfigDict(
@@ -10,11 +15,54 @@ class Settings(BaseSettings):
     PROJECT_NAME: str = "movies"
     BASE_DIR: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
+    # elastic - Elasticsearch, memory - документы из дампов в памяти
+    SEARCH_ENGINE: Literal["elastic", "memory"] = "elastic"
+    SEARCH_DUMP_DIR: str = os.path.join(ROOT_DIR, "elasticdump")
+
     ELASTIC_HOST: str = "127.0.0.1"
     ELASTIC_PORT: int = 9200
+    # объединение одновременных поисковых запросов в один _msearch
+    ELASTIC_MSEARCH_ENABLED: bool = False
+    ELASTIC_MSEARCH_WINDOW_MS: float = 2.0
+    ELASTIC_MSEARCH_MAX_BATCH: int = 64
+    # до скольких совпадений точно считать общее число в ответе поиска
+    ELASTIC_TRACK_TOTAL_HITS: int = 10_000
+    # тела поисковых запросов из заранее сериализованных шаблонов
+    ELASTIC_QUERY_TEMPLATES: bool = True
+    # trusted - модели из документов индексов собираются без валидации,
+    # strict - с полной валидацией pydantic (тесты)
+    MODEL_DECODE: Literal["trusted", "strict"] = "trusted"
 
     REDIS_HOST: str = "127.0.0.1"
     REDIS_PORT: int = 6379
+    # standalone - один сервер REDIS_HOST:REDIS_PORT,
+    # cluster - Redis Cluster, sentinel - мастер из Redis Sentinel
+    REDIS_MODE: Literal["standalone", "cluster", "sentinel"] = "standalone"
+    # "host:port,host:port" узлов кластера или сентинелей
+    REDIS_NODES: str = ""
+    REDIS_SENTINEL_MASTER: str = "mymaster"
+    REDIS_READ_FROM_REPLICAS: bool = False
+
+    CACHE_CODEC: str = "orjson"
+    # смена версии при деплое делает недоступными все старые ключи кэша
+    CACHE_KEY_VERSION: str = "v1"
+    # значения больше порога (байт) сжимаются zstd, 0 - без сжатия
+    CACHE_COMPRESSION_THRESHOLD: int = 1024
+    CACHE_COMPRESSION_LEVEL: int = 3
+    # словарь zstd, обученный командой make zstd-dict
+    CACHE_ZSTD_DICT_PATH: str = ""
+
+    LOCAL_CACHE_ENABLED: bool = True
+    LOCAL_CACHE_MAX_ENTRIES: int = 10_000
+    LOCAL_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    LOCAL_CACHE_MAX_TTL: int = 60
+
+    CACHE_WARMUP_ENABLED: bool = True
+    # период повторного прогрева (секунды), 0 - только при старте
+    CACHE_WARMUP_INTERVAL: int = 1200
+    # сколько первых страниц /v1/films прогревать для сортировок и жанров
+    CACHE_WARMUP_PAGES: int = 3
+    CACHE_WARMUP_CONCURRENCY: int = 4
 
 
 settings = Settings()
@@ -0,0 +1,193 @@
+import importlib
+import pickle
+from abc import ABC, abstractmethod
+from dataclasses import asdict
+from functools import lru_cache
+from hashlib import sha1
+from typing import Any, List, Tuple, Type
+
+import orjson
+from pydantic import BaseModel, TypeAdapter
+
+from db.cacher.entry import CacheEntry
+
+
+class CodecError(Exception):
+    """Raised when a cached payload cannot be decoded by the codec."""
+
+
+class ICodec(ABC):
+    """
+    Serializer used by the cache to turn values into bytes and back.
+    """
+
+    @abstractmethod
+    def encode(self, value: Any) -> bytes:
+        pass
+
+    @abstractmethod
+    def decode(self, data: bytes) -> Any:
+        """
+        Raises CodecError if the payload was written by another codec
+        or for another version of the model schema.
+        """
+        pass
+
+
+class PickleCodec(ICodec):
+    """Legacy codec: whole objects are pickled."""
+
+    def encode(self, value: Any) -> bytes:
+        return pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def decode(self, data: bytes) -> Any:
+        try:
+            return pickle.loads(data)
+        except Exception as ex:
+            raise CodecError(str(ex)) from ex
+
+
+class OrjsonCodec(ICodec):
+    """
+    JSON codec aware of pydantic models.
+
+    Payload layout: MAGIC, header as one JSON line, body as JSON.
+    The header names the kind of value and, for models and lists of
+    models, the model class and a hash of its JSON schema. An entry
+    written for a different schema fails to decode and is treated by
+    the cache as a miss, so deploys that change models never read
+    incompatible data. CacheEntry metadata travels in the header too.
+
+    Models with a bytes field named body (rendered API responses) are
+    written as JSON of their other fields, a newline and the body
+    itself, so the body is not escaped into a JSON string and back.
+    """
+
+    MAGIC = b"MC\x01"
+
+    def encode(self, value: Any) -> bytes:
+        meta = None
+        if isinstance(value, CacheEntry):
+            meta = asdict(value)
+            value = meta.pop("value")
+
+        if isinstance(value, BaseModel) and _has_raw_body(type(value)):
+            model = type(value)
+            header = ("raw", *_model_ref(model))
+            body = (
+                value.__pydantic_serializer__.to_json(
+                    value, exclude={"body"}
+                )
+                + b"\n"
+                + value.body
+            )
+        elif isinstance(value, BaseModel):
+            model = type(value)
+            header = ("model", *_model_ref(model))
+            body = value.__pydantic_serializer__.to_json(value)
+        elif _is_model_list(value):
+            model = type(value[0])
+            header = ("list", *_model_ref(model))
+            body = _list_adapter(model).dump_json(value)
+        else:
+            header = ("json", "", "")
+            body = orjson.dumps(value)
+
+        if meta is not None:
+            header = (*header, meta)
+
+        return self.MAGIC + orjson.dumps(header) + b"\n" + body
+
+    def decode(self, data: bytes) -> Any:
+        if not data.startswith(self.MAGIC):
+            raise CodecError("Unknown payload format")
+
+        header, sep, body = data[len(self.MAGIC):].partition(b"\n")
+        if not sep:
+            raise CodecError("Payload header is truncated")
+
+        try:
+            kind, path, version, *meta = orjson.loads(header)
+            value = self._decode_body(kind, path, version, body)
+        except CodecError:
+            raise
+        except Exception as ex:
+            raise CodecError(str(ex)) from ex
+
+        if meta:
+            return CacheEntry(value=value, **meta[0])
+        return value
+
+    @staticmethod
+    def _decode_body(kind: str, path: str, version: str, body: bytes) -> Any:
+        if kind == "json":
+            return orjson.loads(body)
+
+        model = _resolve_model(path)
+        if _schema_version(model) != version:
+            raise CodecError(f"Schema of {path} has changed")
+        if kind == "model":
+            return model.model_validate_json(body)
+        if kind == "list":
+            return _list_adapter(model).validate_json(body)
+        if kind == "raw":
+            fields, _, raw = body.partition(b"\n")
+            return model.model_validate({**orjson.loads(fields), "body": raw})
+
+        raise CodecError(f"Unknown payload kind: {kind}")
+
+
+def _is_model_list(value: Any) -> bool:
+    if not isinstance(value, list) or not value:
+        return False
+    model = type(value[0])
+    return issubclass(model, BaseModel) and all(
+        type(item) is model for item in value
+    )
+
+
+def _model_ref(model: Type[BaseModel]) -> Tuple[str, str]:
+    return f"{model.__module__}:{model.__qualname__}", _schema_version(model)
+
+
+@lru_cache(maxsize=None)
+def _schema_version(model: Type[BaseModel]) -> str:
+    schema = orjson.dumps(
+        model.model_json_schema(), option=orjson.OPT_SORT_KEYS
+    )
+    return sha1(schema).hexdigest()[:12]
+
+
+@lru_cache(maxsize=None)
+def _resolve_model(path: str) -> Type[BaseModel]:
+    module_name, _, qualname = path.partition(":")
+    obj: Any = importlib.import_module(module_name)
+    for attr in qualname.split("."):
+        obj = getattr(obj, attr)
+    if not (isinstance(obj, type) and issubclass(obj, BaseModel)):
+        raise CodecError(f"{path} is not a pydantic model")
+    return obj
+
+
+@lru_cache(maxsize=None)
+def _has_raw_body(model: Type[BaseModel]) -> bool:
+    field = model.model_fields.get("body")
+    return field is not None and field.annotation is bytes
+
+
+@lru_cache(maxsize=None)
+def _list_adapter(model: Type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(List[model])
+
+
+CODECS = {
+    "orjson": OrjsonCodec,
+    "pickle": PickleCodec,
+}
+
+
+def get_codec(name: str) -> ICodec:
+    try:
+        return CODECS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown cache codec: {name}") from None
@@ -0,0 +1,91 @@
+import logging
+import time
+from typing import Any, List, Optional
+
+import zstandard
+
+from db.cacher.codec import CodecError, ICodec
+from db.cacher.stats import cache_stats
+
+logger = logging.getLogger(__name__)
+
+
+class CompressedCodec(ICodec):
+    """
+    Wraps another codec and compresses large payloads with zstd.
+
+    Payloads shorter than `threshold` are stored as produced by the inner
+    codec. Compressed payloads start with MARKER, which neither the
+    orjson nor the pickle codec can produce, so both kinds coexist in
+    one cache. A dictionary trained on typical payloads (film pages,
+    persons with filmographies) makes small values compress well; if the
+    dictionary changes, old compressed entries fail to decode and are
+    treated as misses.
+    """
+
+    MARKER = b"Z"
+
+    def __init__(
+        self,
+        inner: ICodec,
+        threshold: int = 1024,
+        level: int = 3,
+        dict_data: Optional[bytes] = None,
+    ) -> None:
+        self.inner = inner
+        self.threshold = threshold
+
+        zdict = zstandard.ZstdCompressionDict(dict_data) if dict_data else None
+        self._compressor = zstandard.ZstdCompressor(
+            level=level, dict_data=zdict
+        )
+        self._decompressor = zstandard.ZstdDecompressor(dict_data=zdict)
+
+    def encode(self, value: Any) -> bytes:
+        data = self.inner.encode(value)
+        if len(data) < self.threshold:
+            return data
+
+        started = time.perf_counter()
+        compressed = self.MARKER + self._compressor.compress(data)
+        cache_stats.incr("compress_seconds", time.perf_counter() - started)
+
+        if len(compressed) >= len(data):
+            return data
+
+        cache_stats.incr("compress_count")
+        cache_stats.incr("compress_in_bytes", len(data))
+        cache_stats.incr("compress_out_bytes", len(compressed))
+        return compressed
+
+    def decode(self, data: bytes) -> Any:
+        if not data.startswith(self.MARKER):
+            return self.inner.decode(data)
+
+        started = time.perf_counter()
+        try:
+            plain = self._decompressor.decompress(data[len(self.MARKER):])
+        except zstandard.ZstdError as ex:
+            raise CodecError(str(ex)) from ex
+        cache_stats.incr("decompress_seconds", time.perf_counter() - started)
+        cache_stats.incr("decompress_count")
+
+        return self.inner.decode(plain)
+
+
+def load_dictionary(path: str) -> Optional[bytes]:
+    if not path:
+        return None
+    try:
+        with open(path, "rb") as f_in:
+            return f_in.read()
+    except OSError as ex:
+        logger.error("Error loading zstd dictionary: %s", ex)
+        return None
+
+
+def train_dictionary(samples: List[bytes], size: int = 64 * 1024) -> bytes:
+    """
+    Trains a zstd dictionary on encoded cache payloads.
+    """
+    return zstandard.train_dictionary(size, samples).as_bytes()
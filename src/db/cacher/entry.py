@@ -0,0 +1,23 @@
+import time
+from dataclasses import dataclass
+from typing import Any
+
+
+@dataclass
+class CacheEntry:
+    """
+    Cached value with its freshness deadline (unix time).
+
+    Used by cache_method in stale-while-revalidate mode: after
+    fresh_until the value is still served, but is refreshed in the
+    background. delta is the time in seconds the value took to compute,
+    probabilistic early expiration refreshes slow values earlier.
+    """
+
+    value: Any
+    fresh_until: float
+    delta: float = 0.0
+
+    @property
+    def is_fresh(self) -> bool:
+        return time.time() < self.fresh_until
@@ -0,0 +1,60 @@
+import math
+import random
+import time
+from typing import Optional, Tuple
+
+from db.cacher.entry import CacheEntry
+from db.cacher.stats import cache_stats
+
+# границы гистограммы: за сколько секунд до истечения записи
+# было запущено досрочное обновление
+EARLY_REFRESH_BUCKETS: Tuple[float, ...] = (1, 5, 15, 60, 300, 900)
+
+
+def jittered_ttl(expire: int, jitter: float) -> int:
+    """
+    Spreads the TTL uniformly over expire * (1 ± jitter), so that keys
+    written in one burst (deploy, cache flush) do not expire together.
+
+    The mean TTL stays `expire`, so the number of recomputations over
+    time does not change, only their spread; the price is that an entry
+    may be served up to expire * jitter seconds longer.
+    """
+    if not jitter:
+        return expire
+    ttl = expire * random.uniform(1 - jitter, 1 + jitter)
+    return max(1, round(ttl))
+
+
+def should_recompute_early(
+    entry: CacheEntry, beta: float, now: Optional[float] = None
+) -> bool:
+    """
+    XFetch (probabilistic early expiration).
+
+    Recomputation is triggered before fresh_until with a probability
+    that grows as the deadline approaches. The gap is proportional to
+    the time the value took to compute (entry.delta): slow queries are
+    refreshed earlier. beta > 1 favours earlier refreshes, beta < 1
+    later ones.
+
+    An early refresh shortens the entry's life by the gap, so XFetch
+    costs slightly more recomputations in total (about delta * beta
+    per TTL); in exchange the recomputation happens in the background
+    instead of on a miss that requests wait for.
+    """
+    if now is None:
+        now = time.time()
+    # 1 - random() лежит в (0, 1], логарифм от нуля не берём
+    gap = -entry.delta * beta * math.log(1.0 - random.random())
+    return now + gap >= entry.fresh_until
+
+
+def observe_early_refresh(entry: CacheEntry) -> None:
+    """Records how long before its deadline an entry was refreshed."""
+    cache_stats.incr("xfetch_early_refresh")
+    cache_stats.observe(
+        "xfetch_lead_seconds",
+        entry.fresh_until - time.time(),
+        EARLY_REFRESH_BUCKETS,
+    )
@@ -0,0 +1,51 @@
+from hashlib import blake2b
+from typing import Any, Dict, Tuple
+
+import orjson
+
+from core.config import settings
+
+# аргументы длиннее этого порога заменяются хэшем: длина ключа
+# ограничена, сколько бы ни был длинен поисковый запрос
+MAX_ARGS_LENGTH = 128
+
+
+def key_prefix() -> str:
+    """
+    Common prefix of all cache keys. Bumping CACHE_KEY_VERSION on deploy
+    makes every old entry unreachable at once.
+    """
+    return f"{settings.PROJECT_NAME}:{settings.CACHE_KEY_VERSION}"
+
+
+def form_key(
+    namespace: str,
+    args: Tuple[Any, ...],
+    kwargs: Dict[str, Any],
+    grouped: bool = False,
+) -> str:
+    """
+    Builds a readable cache key:
+        movies:v1:FilmService.render_search:["Star",50,1]
+
+    namespace is usually "<service class>.<method>", so methods with the
+    same name in different services never share keys. Arguments are
+    normalized to compact JSON (keyword arguments sorted by name).
+    Arguments longer than MAX_ARGS_LENGTH are replaced by their hash
+    only to bound the key length: keys are stored in Redis and in every
+    tag set they belong to. Hashing does not make building a key faster.
+    Grouped keys put the namespace in a Redis Cluster hash tag, so all
+    of them live in one slot and can be fetched with a single MGET.
+    """
+    payload = orjson.dumps(
+        [args, kwargs] if kwargs else args,
+        default=str,
+        option=orjson.OPT_SORT_KEYS,
+    )
+    if len(payload) > MAX_ARGS_LENGTH:
+        part = "#" + blake2b(payload, digest_size=16).hexdigest()
+    else:
+        part = payload.decode()
+
+    name = f"{{{namespace}}}" if grouped else namespace
+    return f"{key_prefix()}:{name}:{part}"
@@ -0,0 +1,97 @@
+import logging
+import pickle
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+from db.cacher import AbstractCache
+
+logger = logging.getLogger(__name__)
+
+
+class LocalCache(AbstractCache):
+    """
+    In-process LRU cache bounded by entry count and total payload size.
+
+    Values are stored as live objects and returned by reference, so
+    callers must treat cached results as read-only. Entry size is
+    given by the caller (TieredCache passes the length of the value's
+    Redis payload) or, if not, estimated once on write by the length
+    of its pickled form.
+    """
+
+    def __init__(
+        self, max_entries: int, max_bytes: int, max_ttl: int
+    ) -> None:
+        """
+        :param max_entries: maximum number of entries kept in memory
+        :param max_bytes: maximum total estimated size of stored values
+        :param max_ttl: upper bound (seconds) for any entry lifetime
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_ttl = max_ttl
+
+        self._data: "OrderedDict[str, Tuple[float, int, Any]]" = OrderedDict()
+        self._size = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    async def set(
+        self, key: str, value: Any, expire: int, size: Optional[int] = None
+    ) -> None:
+        ttl = min(expire, self.max_ttl)
+        if ttl <= 0:
+            return
+
+        if size is None:
+            try:
+                size = len(
+                    pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+                )
+            except Exception as ex:
+                logger.error("Error estimating local cache entry size: %s", ex)
+                return
+
+        if size > self.max_bytes:
+            logger.debug("Value is too large for local cache: %s", size)
+            return
+
+        self._pop(key)
+        self._data[key] = (time.monotonic() + ttl, size, value)
+        self._size += size
+        self._evict()
+
+    async def get(self, key: str) -> Optional[Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+
+        expires_at, _, value = entry
+        if expires_at <= time.monotonic():
+            self._pop(key)
+            return None
+
+        self._data.move_to_end(key)
+        return value
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self._pop(key)
+
+    def _pop(self, key: str) -> None:
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            self._size -= entry[1]
+
+    def _evict(self) -> None:
+        while self._data and (
+            len(self._data) > self.max_entries or self._size > self.max_bytes
+        ):
+            _, (_, size, _) = self._data.popitem(last=False)
+            self._size -= size
@@ -0,0 +1,53 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict
+
+from db.cacher.stats import cache_stats
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """
+    Deduplicates concurrent calls with the same key inside one process.
+
+    The first caller starts the computation as a task, every caller
+    that arrives while it is running awaits the same task instead of
+    starting its own. The task is shielded, so a cancelled caller does
+    not cancel the work the others are waiting for.
+    """
+
+    def __init__(self) -> None:
+        self._in_flight: Dict[str, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._in_flight)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._in_flight
+
+    async def do(
+        self, key: str, func: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        task = self._in_flight.get(key)
+        if task is not None:
+            cache_stats.incr("singleflight_coalesced")
+            logger.debug("Joined in-flight call")
+            return await asyncio.shield(task)
+
+        cache_stats.incr("singleflight_executed")
+        task = asyncio.ensure_future(func())
+        self._in_flight[key] = task
+        task.add_done_callback(lambda t: self._forget(key, t))
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # помечаем исключение как полученное, даже если все ожидающие
+        # были отменены, чтобы asyncio не ругался в лог
+        if not task.cancelled():
+            task.exception()
+
+
+single_flight = SingleFlight()
@@ -0,0 +1,46 @@
+from collections import Counter
+from typing import Dict, Iterable
+
+
+class CacheStats:
+    """
+    Process-wide counters of the cache layer.
+
+    Counters are per worker process: with several gunicorn workers
+    each one reports its own numbers.
+    """
+
+    def __init__(self) -> None:
+        self._counters: Counter = Counter()
+
+    def incr(self, name: str, value: float = 1) -> None:
+        self._counters[name] += value
+
+    def set(self, name: str, value: float) -> None:
+        self._counters[name] = value
+
+    def observe(
+        self, name: str, value: float, buckets: Iterable[float]
+    ) -> None:
+        """
+        Adds value to a cumulative histogram: counters
+        "<name>_le_<bound>" for every bound >= value, plus
+        "<name>_count" and "<name>_sum".
+        """
+        for bound in buckets:
+            if value <= bound:
+                self._counters[f"{name}_le_{bound}"] += 1
+        self._counters[f"{name}_count"] += 1
+        self._counters[f"{name}_sum"] += value
+
+    def get(self, name: str) -> float:
+        return self._counters[name]
+
+    def snapshot(self) -> Dict[str, float]:
+        return dict(self._counters)
+
+    def reset(self) -> None:
+        self._counters.clear()
+
+
+cache_stats = CacheStats()
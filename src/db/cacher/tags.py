@@ -0,0 +1,76 @@
+from typing import Any, Callable, Iterable, Iterator, Set, Tuple
+
+from pydantic import BaseModel
+
+from db.cacher.keys import key_prefix
+from models.page import RenderedPage
+
+# (индекс ES, id документа)
+Tag = Tuple[str, str]
+TagsGetter = Callable[[Any, Any], Iterable[Tag]]
+
+
+def tag_key(tag: Tag) -> str:
+    index, doc_id = tag
+    return f"{key_prefix()}:tag:{index}:{doc_id}"
+
+
+def _models(result: Any) -> Iterator[BaseModel]:
+    if isinstance(result, BaseModel):
+        if _doc_id(result) is not None:
+            yield result
+            return
+        # страница выдачи: документы лежат в её списках
+        for value in result.__dict__.values():
+            if isinstance(value, list):
+                yield from _models(value)
+    elif isinstance(result, (list, tuple)):
+        for item in result:
+            if isinstance(item, BaseModel):
+                yield item
+
+
+def _doc_id(model: BaseModel) -> Any:
+    return getattr(model, "id", None) or getattr(model, "uuid", None)
+
+
+def _doc_ids(result: Any) -> Iterator[Any]:
+    yield from map(_doc_id, _models(result))
+    # отрендеренная страница хранит только id своих документов
+    if isinstance(result, RenderedPage):
+        yield from result.ids
+
+
+def index_tags(index: str) -> TagsGetter:
+    """
+    Tags a result with the ids of the models it consists of,
+    all of them taken from the given index.
+    """
+
+    def getter(_: Any, result: Any) -> Set[Tag]:
+        return {
+            (index, str(doc_id))
+            for doc_id in _doc_ids(result)
+            if doc_id is not None
+        }
+
+    return getter
+
+
+def source_tags(service: Any, result: Any) -> Set[Tag]:
+    """
+    Tags a result with the ids of its models in the service's data_source.
+    """
+    return index_tags(service.data_source)(service, result)
+
+
+def person_tags(service: Any, result: Any) -> Set[Tag]:
+    """
+    Tags persons and the films of their filmographies, so that a person
+    entry is evicted when any of their films changes.
+    """
+    tags = source_tags(service, result)
+    for person in _models(result):
+        for film in getattr(person, "films", ()):
+            tags.add(("film", str(film.uuid)))
+    return tags
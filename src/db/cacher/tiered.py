@@ -0,0 +1,101 @@
+import logging
+from typing import Any, Iterable, List, Optional
+
+from db.cacher import AbstractCache
+from db.cacher.local import LocalCache
+from db.cacher.tags import Tag
+
+logger = logging.getLogger(__name__)
+
+
+class TieredCache(AbstractCache):
+    """
+    Two-level cache: in-process LocalCache (L1) in front of a shared
+    remote cache (L2, Redis).
+
+    L1 is opt-in per call through ``local_expire``: without it the
+    cache behaves exactly like the remote one. A value promoted from L2
+    lives in L1 for at most ``local_expire`` seconds (further capped by
+    LocalCache.max_ttl), which bounds the staleness of other workers'
+    writes and invalidations.
+
+    L1 entries are sized by the length of their L2 payload, which is
+    at hand anyway, instead of being serialized once more.
+    """
+
+    def __init__(self, local: LocalCache, remote: AbstractCache) -> None:
+        self.local = local
+        self.remote = remote
+
+    async def set(
+        self,
+        key: str,
+        value: Any,
+        expire: int,
+        local_expire: Optional[int] = None,
+    ) -> None:
+        if not local_expire:
+            await self.remote.set(key, value, expire)
+            return
+
+        size = await self.remote.set_sized(key, value, expire)
+        # не записанное в Redis значение всё равно держится в памяти,
+        # его размер LocalCache оценит сам
+        await self.local.set(
+            key, value, min(expire, local_expire), size=size or None
+        )
+
+    async def get(
+        self, key: str, local_expire: Optional[int] = None
+    ) -> Optional[Any]:
+        if not local_expire:
+            return await self.remote.get(key)
+
+        value = await self.local.get(key)
+        if value is not None:
+            logger.debug("Response from local cache")
+            return value
+
+        value, size = await self.remote.get_sized(key)
+        if value is not None:
+            await self.local.set(key, value, local_expire, size=size)
+        return value
+
+    async def get_many(
+        self, keys: List[str], local_expire: Optional[int] = None
+    ) -> List[Optional[Any]]:
+        if not local_expire:
+            return await self.remote.get_many(keys)
+
+        values = [await self.local.get(key) for key in keys]
+        missed = [key for key, value in zip(keys, values) if value is None]
+        fetched = dict(zip(missed, await self.remote.get_many_sized(missed)))
+
+        result = []
+        for key, value in zip(keys, values):
+            if value is None:
+                value, size = fetched[key]
+                if value is not None:
+                    await self.local.set(key, value, local_expire, size=size)
+            result.append(value)
+        return result
+
+    async def acquire_lease(self, key: str, ttl: int) -> Optional[Any]:
+        return await self.remote.acquire_lease(key, ttl)
+
+    async def lease_held(self, key: str) -> bool:
+        return await self.remote.lease_held(key)
+
+    async def release_lease(self, lease: Any) -> None:
+        await self.remote.release_lease(lease)
+
+    async def add_tags(
+        self, key: str, tags: Iterable[Tag], expire: int
+    ) -> None:
+        await self.remote.add_tags(key, tags, expire)
+
+    async def invalidate_tags(self, tags: Iterable[Tag]) -> List[str]:
+        keys = await self.remote.invalidate_tags(tags)
+        # из памяти других воркеров записи уйдут по local_expire
+        await self.local.delete(*keys)
+        return keys
@@ -1,49 +1,381 @@
+import asyncio
 import logging
-import pickle
+import time
+from contextvars import ContextVar
 from functools import wraps
-from hashlib import sha256
-from typing import Optional, Callable, Any
-from redis.asyncio import Redis
+from typing import (
+    Optional,
+    Callable,
+    Any,
+    Awaitable,
+    Dict,
+    Iterable,
+    List,
+    NamedTuple,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
+from redis.asyncio import Redis, RedisCluster
+from redis.asyncio.cluster import ClusterNode
+from redis.asyncio.lock import Lock
+from redis.asyncio.sentinel import Sentinel
 
 from db.cacher import AbstractCache
+from db.cacher.codec import CodecError, ICodec, OrjsonCodec
+from db.cacher.entry import CacheEntry
+from db.cacher.expiry import (
+    jittered_ttl,
+    observe_early_refresh,
+    should_recompute_early,
+)
+from db.cacher.keys import form_key
+from db.cacher.singleflight import single_flight
+from db.cacher.stats import cache_stats
+from db.cacher.tags import Tag, TagsGetter, tag_key
+from db.cacher.tiered import TieredCache
 
-redis: Optional[Redis] = None
+RedisClient = Union[Redis, RedisCluster]
+
+redis: Optional[RedisClient] = None
+redis_replica: Optional[Redis] = None
 
 logger = logging.getLogger(__name__)
 
+LEASE_POLL_INTERVAL = 0.05
+REFRESH_LEASE_TTL = 30
+DEFAULT_TTL_JITTER = 0.1
+
+# вызовы cache_method в этом контексте не читают кэш, а пересчитывают
+# и перезаписывают значение (используется прогревом кэша)
+force_refresh: ContextVar[bool] = ContextVar("force_refresh", default=False)
+
 
 class RedisCache(AbstractCache):
-    """Реализация кэша с помощью Redis"""
+    """
+    Реализация кэша с помощью Redis.
 
-    def __init__(self, cache_type: Redis) -> None:
+    Работает с одиночным Redis, Redis Cluster и мастером из Sentinel.
+    Если передан replica, чтение значений идёт с реплики.
+    """
+
+    def __init__(
+        self,
+        cache_type: RedisClient,
+        codec: Optional[ICodec] = None,
+        replica: Optional[Redis] = None,
+    ) -> None:
         self.cacher = cache_type
+        self.codec = codec or OrjsonCodec()
+        self.replica = replica
 
     async def set(self, key: str, value: Any, expire: int) -> None:
+        await self.set_sized(key, value, expire)
+
+    async def set_sized(self, key: str, value: Any, expire: int) -> int:
+        """
+        Same as set; returns the length of the stored payload,
+        0 if nothing was stored.
+        """
         try:
-            await self.cacher.set(key, pickle.dumps(value), ex=expire)
+            payload = self.codec.encode(value)
+            await self.cacher.set(key, payload, ex=expire)
             logger.debug("Result stored in cache")
         except Exception as ex:
             logger.error("Error storing to cache: %s", ex)
+            return 0
+        return len(payload)
 
     async def get(self, key: str) -> Optional[Any]:
+        value, _ = await self.get_sized(key)
+        return value
+
+    async def get_sized(self, key: str) -> Tuple[Optional[Any], int]:
+        """Same as get, along with the length of the stored payload."""
+        try:
+            cache_value = await (self.replica or self.cacher).get(key)
+        except Exception as ex:
+            logger.error("Error retrieving from cache: %s", ex)
+            return None, 0
+        return self._decode(cache_value), len(cache_value or b"")
+
+    async def get_many(self, keys: List[str]) -> List[Optional[Any]]:
+        """
+        Reads several keys in one round trip per node. In a cluster keys
+        sharing a hash tag live in one slot and are fetched together.
+        """
+        return [value for value, _ in await self.get_many_sized(keys)]
+
+    async def get_many_sized(
+        self, keys: List[str]
+    ) -> List[Tuple[Optional[Any], int]]:
+        """Same as get_many, along with the lengths of the payloads."""
+        if not keys:
+            return []
+
+        reader = self.replica or self.cacher
         try:
-            cache_value = await self.cacher.get(key)
-            return pickle.loads(cache_value) if cache_value else None
+            if isinstance(reader, RedisCluster):
+                values = await reader.mget_nonatomic(keys)
+            else:
+                values = await reader.mget(keys)
         except Exception as ex:
             logger.error("Error retrieving from cache: %s", ex)
+            return [(None, 0)] * len(keys)
+        return [(self._decode(value), len(value or b"")) for value in values]
+
+    def _decode(self, cache_value: Optional[bytes]) -> Optional[Any]:
+        if not cache_value:
+            return None
+        try:
+            return self.codec.decode(cache_value)
+        except CodecError as ex:
+            # запись старого формата или другой схемы модели - промах
+            logger.debug("Stale cache entry ignored: %s", ex)
             return None
 
+    async def add_tags(
+        self, key: str, tags: Iterable[Tag], expire: int
+    ) -> None:
+        """
+        Records that the entry `key` was built from the tagged documents.
+        Tag sets live at least as long as the entries they point to.
+        """
+        try:
+            async with self.cacher.pipeline(transaction=False) as pipe:
+                for tag in tags:
+                    pipe.sadd(tag_key(tag), key)
+                    pipe.expire(tag_key(tag), expire, gt=True)
+                    pipe.expire(tag_key(tag), expire, nx=True)
+                await pipe.execute()
+        except Exception as ex:
+            logger.error("Error storing cache tags: %s", ex)
+
+    async def invalidate_tags(self, tags: Iterable[Tag]) -> List[str]:
+        """
+        Deletes every entry built from the tagged documents.
+        Returns the deleted keys.
+        """
+        tag_keys = [tag_key(tag) for tag in tags]
+        if not tag_keys:
+            return []
+
+        # SUNION не работает между слотами кластера, поэтому
+        # множества читаются по одному в пайплайне
+        async with self.cacher.pipeline(transaction=False) as pipe:
+            for name in tag_keys:
+                pipe.smembers(name)
+            members = await pipe.execute()
+
+        keys = {k.decode() for tag_members in members for k in tag_members}
+        if keys:
+            await self.cacher.delete(*keys)
+        await self.cacher.delete(*tag_keys)
+
+        logger.debug("Invalidated %s cache entries", len(keys))
+        return list(keys)
+
+    async def acquire_lease(self, key: str, ttl: int) -> Optional[Lock]:
+        """
+        Tries to take a short-lived lease for recomputing `key`.
+        Returns the lock if it was taken, None if it is held by
+        another worker or Redis is unavailable.
+        """
+        lease = self.cacher.lock(_lease_key(key), timeout=ttl, blocking=False)
+        try:
+            if await lease.acquire():
+                return lease
+        except Exception as ex:
+            logger.error("Error acquiring cache lease: %s", ex)
+        return None
+
+    async def lease_held(self, key: str) -> bool:
+        try:
+            return bool(await self.cacher.exists(_lease_key(key)))
+        except Exception as ex:
+            logger.error("Error checking cache lease: %s", ex)
+            return False
+
+    async def release_lease(self, lease: Lock) -> None:
+        try:
+            await lease.release()
+        except Exception as ex:
+            logger.debug("Cache lease already released: %s", ex)
+
+
+def _lease_key(key: str) -> str:
+    return f"lease:{key}"
+
+
+def _refresh_key(key: str) -> str:
+    # аренда фонового обновления отдельна от аренды пересчёта при
+    # промахе: оставленная после обновления, она не должна заставлять
+    # промахи ждать воркера, который ничего не считает
+    return f"refresh:{key}"
+
 
 # Функция понадобится при внедрении зависимостей
-async def get_redis() -> Redis:
+async def get_redis() -> RedisClient:
     return redis
 
 
-def form_key(*args, **kwargs) -> str:
-    return sha256(pickle.dumps((args, kwargs))).hexdigest()
+def _parse_nodes(nodes: str) -> List[Tuple[str, int]]:
+    result = []
+    for node in nodes.split(","):
+        host, _, port = node.strip().rpartition(":")
+        result.append((host, int(port)))
+    return result
 
 
-def cache_method(cache_attr: str, expire: int = 1800):
+def create_redis(
+    mode: str,
+    host: str,
+    port: int,
+    nodes: str = "",
+    sentinel_master: str = "",
+    read_from_replicas: bool = False,
+) -> Tuple[RedisClient, Optional[Redis]]:
+    """
+    Creates the Redis client for the selected topology.
+
+    Parameters:
+    - mode: "standalone", "cluster" or "sentinel"
+    - host, port: address of the standalone server
+    - nodes: "host:port,host:port" of cluster startup nodes or sentinels;
+             if empty, host and port are used
+    - sentinel_master: name of the master monitored by Sentinel
+    - read_from_replicas: serve reads from replicas
+
+    Returns the client for writes and, for Sentinel with
+    read_from_replicas, a separate client for reads.
+    """
+    addresses = _parse_nodes(nodes) if nodes else [(host, port)]
+
+    if mode == "standalone":
+        return Redis(host=host, port=port), None
+
+    if mode == "cluster":
+        client = RedisCluster(
+            startup_nodes=[ClusterNode(h, p) for h, p in addresses],
+            read_from_replicas=read_from_replicas,
+        )
+        return client, None
+
+    if mode == "sentinel":
+        sentinel = Sentinel(addresses)
+        replica = (
+            sentinel.slave_for(sentinel_master) if read_from_replicas else None
+        )
+        return sentinel.master_for(sentinel_master), replica
+
+    raise ValueError(f"Unknown Redis mode: {mode}")
+
+
+async def _wait_for_leaseholder(
+    cache: Any, key: str, lease_ttl: int, tier: Dict[str, Any]
+) -> Optional[Any]:
+    """
+    Waits until the worker holding the lease stores the value.
+    Returns None if the lease is gone or expired without a value.
+    """
+    deadline = time.monotonic() + lease_ttl
+    while time.monotonic() < deadline:
+        await asyncio.sleep(LEASE_POLL_INTERVAL)
+        result = await cache.get(key, **tier)
+        if result is not None:
+            return result
+        if not await cache.lease_held(key):
+            return None
+    return None
+
+
+async def invalidate_documents(
+    cache: AbstractCache, index: str, ids: Iterable[str]
+) -> List[str]:
+    """
+    Evicts every cached result built from the given documents of `index`.
+    Returns the evicted keys.
+    """
+    if not hasattr(cache, "invalidate_tags"):
+        raise ValueError("Cache does not support invalidation")
+
+    keys = await cache.invalidate_tags([(index, str(id_)) for id_ in ids])
+    cache_stats.incr("invalidated_keys", len(keys))
+    return keys
+
+
+def _unwrap(cache_result: Any) -> Any:
+    if isinstance(cache_result, CacheEntry):
+        return cache_result.value
+    return cache_result
+
+
+def _run_in_background(coro: Awaitable[Any]) -> None:
+    task = asyncio.ensure_future(coro)
+    # держим ссылку на задачу, иначе её может собрать GC
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+_background_tasks: Set[asyncio.Task] = set()
+
+
+class CacheOptions(NamedTuple):
+    """
+    Caching parameters of a method decorated with cache_method,
+    available as its `cache_options` attribute.
+    """
+
+    expire: int
+    local_expire: Optional[int]
+    soft_expire: Optional[int]
+    tags: Optional[TagsGetter]
+    grouped: bool
+    jitter: float
+    early_beta: Optional[float]
+
+    @property
+    def wraps_entry(self) -> bool:
+        return self.soft_expire is not None or self.early_beta is not None
+
+    def tier(self, cache: Any) -> Dict[str, Any]:
+        if self.local_expire and isinstance(cache, TieredCache):
+            return {"local_expire": self.local_expire}
+        return {}
+
+
+async def _store(
+    instance: Any,
+    cache: Any,
+    key: str,
+    result: Any,
+    delta: float,
+    options: CacheOptions,
+) -> None:
+    ttl = jittered_ttl(options.expire, options.jitter)
+    value = result
+    if options.wraps_entry:
+        fresh = ttl
+        if options.soft_expire is not None:
+            fresh = min(jittered_ttl(options.soft_expire, options.jitter), ttl)
+        value = CacheEntry(result, time.time() + fresh, delta)
+    await cache.set(key, value, ttl, **options.tier(cache))
+    if options.tags is not None and hasattr(cache, "add_tags"):
+        await cache.add_tags(key, options.tags(instance, result), ttl)
+
+
+def cache_method(
+    cache_attr: str,
+    expire: int = 1800,
+    local_expire: Optional[int] = None,
+    lease_ttl: Optional[int] = None,
+    soft_expire: Optional[int] = None,
+    tags: Optional[TagsGetter] = None,
+    grouped: bool = False,
+    jitter: float = DEFAULT_TTL_JITTER,
+    early_beta: Optional[float] = None,
+):
     """
     cache_method is a decorator that caches the result
     of an asynchronous method in a store.
@@ -53,10 +385,58 @@ def cache_method(cache_attr: str, expire: int = 1800):
                         of store in the class.
     - expire (int): The cache expiration time in seconds.
                     Defaults to 1800 seconds (30 minutes).
+    - local_expire (Optional[int]): Opt-in for the in-process cache tier.
+                    If set and the store is a TieredCache, the result is
+                    also kept in worker memory for this many seconds.
+    - lease_ttl (Optional[int]): Opt-in for the cross-worker lease.
+                    On a miss only the worker holding the Redis lease
+                    recomputes the value, the others wait for it up to
+                    lease_ttl seconds.
+    - soft_expire (Optional[int]): Opt-in for stale-while-revalidate.
+                    After soft_expire seconds the cached value is still
+                    returned, and one background task refreshes it.
+                    Only after `expire` (hard TTL) callers wait for
+                    a fresh value.
+    - tags (Optional[TagsGetter]): Callable (instance, result) returning
+                    (index, document id) pairs the result was built from.
+                    The entry is then evicted by invalidate_documents
+                    when any of these documents changes.
+    - grouped (bool): Put all keys of the method of one service class
+                    under the same hash tag (one cluster slot), so that
+                    they can be read together with get_many.
+    - jitter (float): Every TTL (expire, soft_expire) is randomly spread
+                    by this fraction, so that keys written together do
+                    not expire together. Defaults to 0.1 (±10%).
+    - early_beta (Optional[float]): Opt-in for probabilistic early
+                    expiration (XFetch). The entry remembers how long it
+                    took to compute, and a hit close to its deadline
+                    refreshes it in the background with a probability
+                    growing towards the deadline. 1.0 is the usual value.
+
+    Keys are built by form_key with namespace "<class>.<method>".
+
+    Concurrent misses of the same key inside one worker are always
+    coalesced into a single call of the decorated method.
+
+    When the force_refresh context variable is set, the cached value is
+    ignored and overwritten with a freshly computed one.
 
     Raises:
     - ValueError: If the cacher instance is not set.
     """
+    if soft_expire is not None and soft_expire >= expire:
+        raise ValueError("soft_expire must be less than expire")
+    if not 0 <= jitter < 1:
+        raise ValueError("jitter must be in [0, 1)")
+    options = CacheOptions(
+        expire=expire,
+        local_expire=local_expire,
+        soft_expire=soft_expire,
+        tags=tags,
+        grouped=grouped,
+        jitter=jitter,
+        early_beta=early_beta,
+    )
 
     def decorator(func: Callable) -> Callable:
         @wraps(func)
@@ -66,16 +446,149 @@ def cache_method(cache_attr: str, expire: int = 1800):
             if cache is None:
                 raise ValueError("Cache instance is not set")
 
-            key = form_key(func.__name__, args, kwargs)
+            namespace = f"{type(self).__name__}.{func.__name__}"
+            key = form_key(namespace, args, kwargs, grouped=grouped)
+            tier = options.tier(cache)
+            can_lease = hasattr(cache, "acquire_lease")
+
+            async def compute() -> Any:
+                started = time.perf_counter()
+                result = await func(self, *args, **kwargs)
+                delta = time.perf_counter() - started
+                await _store(self, cache, key, result, delta, options)
+                return result
+
+            async def load() -> Any:
+                lease = None
+                if lease_ttl and can_lease:
+                    lease = await cache.acquire_lease(key, lease_ttl)
+                    if lease is None:
+                        result = await _wait_for_leaseholder(
+                            cache, key, lease_ttl, tier
+                        )
+                        if result is not None:
+                            cache_stats.incr("lease_waited")
+                            return _unwrap(result)
+                        cache_stats.incr("lease_missed")
+                    else:
+                        cache_stats.incr("lease_acquired")
+
+                try:
+                    return await compute()
+                finally:
+                    if lease is not None:
+                        await cache.release_lease(lease)
+
+            async def refresh() -> None:
+                lease = None
+                if can_lease:
+                    lease = await cache.acquire_lease(
+                        _refresh_key(key), lease_ttl or REFRESH_LEASE_TTL
+                    )
+                    if lease is None:
+                        # обновлением уже занят другой воркер
+                        return
+                try:
+                    await single_flight.do(key, compute)
+                    cache_stats.incr("swr_refreshed")
+                except Exception as ex:
+                    logger.error("Error refreshing stale cache: %s", ex)
+                    if lease is not None:
+                        await cache.release_lease(lease)
+                # после успешного обновления аренда истекает сама, чтобы
+                # воркеры, успевшие увидеть устаревшее значение,
+                # не запускали повторное обновление
+
+            if force_refresh.get():
+                cache_stats.incr("forced_refresh")
+                return await single_flight.do(key, compute)
+
+            cache_result = await cache.get(key, **tier)
+            if isinstance(cache_result, CacheEntry):
+                if key not in single_flight:
+                    if not cache_result.is_fresh:
+                        logger.debug("Stale response from cache")
+                        cache_stats.incr("swr_stale_served")
+                        _run_in_background(refresh())
+                    elif early_beta and should_recompute_early(
+                        cache_result, early_beta
+                    ):
+                        logger.debug("Early refresh of cache entry")
+                        observe_early_refresh(cache_result)
+                        _run_in_background(refresh())
+                return cache_result.value
 
-            cache_result = await cache.get(key)
             if cache_result is not None:
                 logger.debug("Response from cache")
                 return cache_result
 
-            result = await func(self, *args, **kwargs)
-            await cache.set(key, result, expire)
-            return result
+            return await single_flight.do(key, load)
+
+        wrapper.cache_options = options
+        return wrapper
+
+    return decorator
+
+
+def cache_many_method(cache_attr: str, method: str):
+    """
+    cache_many_method is a decorator for batch versions of a method
+    cached with cache_method, taking a sequence of ids.
+
+    Results are read from and written to the per-id entries of `method`
+    (the same keys, TTL and tags as its single-id calls), so a batch
+    call and single calls share the cache. The decorated method is
+    called only with the ids missing from the cache and must return
+    one result (or None if not found) per id, in the same order.
+
+    Parameters:
+    - cache_attr (str): The attribute name for the instance
+                        of store in the class.
+    - method (str): Name of the single-id method decorated with
+                    cache_method.
+    """
+
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        async def wrapper(self, ids: Sequence[str]) -> List[Optional[Any]]:
+            cache = getattr(self, cache_attr, None)
+
+            if cache is None:
+                raise ValueError("Cache instance is not set")
+            if not ids:
+                return []
+
+            options: CacheOptions = getattr(type(self), method).cache_options
+            tier = options.tier(cache)
+            namespace = f"{type(self).__name__}.{method}"
+            keys = [
+                form_key(namespace, (id_,), {}, grouped=options.grouped)
+                for id_ in ids
+            ]
+
+            if force_refresh.get():
+                cached = [None] * len(keys)
+            elif hasattr(cache, "get_many"):
+                cached = await cache.get_many(keys, **tier)
+            else:
+                cached = [await cache.get(key, **tier) for key in keys]
+            results = [_unwrap(value) for value in cached]
+
+            missed = [i for i, value in enumerate(results) if value is None]
+            cache_stats.incr("batch_hits", len(ids) - len(missed))
+            cache_stats.incr("batch_misses", len(missed))
+            if not missed:
+                return results
+
+            started = time.perf_counter()
+            fetched = await func(self, [ids[i] for i in missed])
+            delta = time.perf_counter() - started
+
+            for i, result in zip(missed, fetched):
+                results[i] = result
+                if result is not None:
+                    await _store(self, cache, keys[i], result, delta, options)
+            return results
 
         return wrapper
 
@@ -1,8 +1,22 @@
+import inspect
 from abc import ABC, abstractmethod
-from typing import Optional, Any, List, Dict, Type, Union
+from dataclasses import dataclass
+from typing import (
+    Any,
+    AsyncIterator,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+    Type,
+    TypeVar,
+    Union,
+)
+
+from pydantic import BaseModel
+from pydantic.aliases import AliasChoices
 
 from models.query_params import QueryParams
-from utils.utils import get_all_subclasses
 
 
 class IQuery(ABC):
@@ -38,8 +52,18 @@ class IQuery(ABC):
              | + __init__(params)          |
              | + query: dict               |
              |-----------------------------|
+
+    fields limits the stored fields returned for every hit
+    (None - whole documents). Without count_total the engine does not
+    count the total number of matches and returns total None.
+
+    Concrete query classes are registered with @register_query
+    to be found by query_factory.
     """
 
+    fields: Optional[List[str]] = None
+    count_total: bool = True
+
     @abstractmethod
     def __init__(self, params: QueryParams):
         """
@@ -57,6 +81,31 @@ class IQuery(ABC):
         pass
 
 
+@dataclass
+class SearchResult:
+    """
+    Documents found by a search query and the total number of matches.
+
+    total is None if the engine was not asked to count the matches.
+    If total_exact is False, total is a lower bound: the engine stops
+    counting at its accuracy limit.
+    """
+
+    items: List[Dict[str, Any]]
+    total: Optional[int] = None
+    total_exact: bool = True
+
+
+@dataclass
+class SearchPage(SearchResult):
+    """
+    One page of search results with an opaque cursor of the next page
+    (None if this page is the last one).
+    """
+
+    next_cursor: Optional[str] = None
+
+
 class ISearchEngine(ABC):
     """
     An abstract base class that defines the interface for a search engine.
@@ -94,10 +143,29 @@ class ISearchEngine(ABC):
         """
         pass
 
+    @abstractmethod
+    async def mget(
+        self, data_source: str, ids: List[str]
+    ) -> List[Optional[Dict[str, Any]]]:
+        """
+        Retrieves several documents by their identifiers in one request.
+
+        Args:
+            data_source (str): The name or identifier of the data source.
+            ids (List[str]): The identifiers of the documents to retrieve.
+
+        Returns:
+            List[Optional[Dict[str, Any]]]: One item per requested id,
+                                            in the order of ids: the
+                                            document, or None if it is
+                                            not found.
+        """
+        pass
+
     @abstractmethod
     async def search(
         self, data_source: str, search_query: IQuery
-    ) -> List[Dict[str, Any]]:
+    ) -> SearchResult:
         """
         Performs a search query on the specified data source.
 
@@ -106,11 +174,67 @@ class ISearchEngine(ABC):
             search_query (IQuery): An object representing the search query.
 
         Returns:
-            List[Dict[str, Any]]: The retrieved document
-                                  as a list of dictionaries.
+            SearchResult: The retrieved documents as a list of
+                          dictionaries and the total number of documents
+                          matching the query.
 
         This method should process the search query and return all results
-        that match the specified criteria.
+        that match the specified criteria. The total is counted in the
+        same request, so callers can validate paging without a separate
+        count.
+        """
+        pass
+
+    @abstractmethod
+    async def search_page(
+        self,
+        data_source: str,
+        search_query: IQuery,
+        cursor: Optional[str] = None,
+    ) -> SearchPage:
+        """
+        Performs a sorted search query and returns one page of results
+        together with the cursor of the next page.
+
+        Args:
+            data_source (str): The name or identifier of the data source.
+            search_query (IQuery): An object representing a sorted query.
+            cursor (Optional[str]): Cursor returned with the previous page.
+                                    If given, the page continues after it
+                                    and the page number of the query is
+                                    ignored.
+
+        Returns:
+            SearchPage: The retrieved documents, the next cursor and,
+                        for the first page, the total number of matches.
+
+        Unlike offset pagination, following cursors costs the same for
+        every page regardless of its depth.
+        """
+        pass
+
+    @abstractmethod
+    def scan(
+        self, data_source: str, search_query: IQuery, batch_size: int = 1000
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Iterates over all results of a search query in batches.
+
+        Args:
+            data_source (str): The name or identifier of the data source.
+            search_query (IQuery): An object representing the query;
+                                   its page number and size are ignored.
+                                   Results of an unsorted query come in
+                                   an order chosen by the engine.
+            batch_size (int): The number of documents in every batch.
+
+        Returns:
+            AsyncIterator[List[Dict[str, Any]]]: An async generator of
+                                                 batches of documents.
+
+        Only one batch is held at a time, so memory does not depend on
+        the number of results; the results are neither counted nor
+        cached.
         """
         pass
 
@@ -131,10 +255,52 @@ class ISearchEngine(ABC):
         pass
 
 
+# (класс поискового движка, абстрактный класс запроса) -> класс запроса
+_query_registry: Dict[Tuple[Type, Type[IQuery]], Type[IQuery]] = {}
+
+Q = TypeVar("Q", bound=Type[IQuery])
+
+
+def register_query(query_cls: Q) -> Q:
+    """
+    Class decorator registering a concrete query class for its search
+    engine (linked_searcher_class) and every abstract query class
+    it implements, so that query_factory can find it.
+
+    Raises ValueError at import time if another class is already
+    registered for the same engine and abstract query class.
+    """
+    if inspect.isabstract(query_cls):
+        raise TypeError(f"{query_cls.__name__} is abstract")
+
+    search_engine_cls = query_cls.linked_searcher_class
+    for base in query_cls.__mro__[1:]:
+        if (
+            base is IQuery
+            or not issubclass(base, IQuery)
+            # база конкретного движка, например IElasticQuery
+            or isinstance(getattr(base, "linked_searcher_class"), type)
+        ):
+            continue
+
+        registered = _query_registry.setdefault(
+            (search_engine_cls, base), query_cls
+        )
+        if registered is not query_cls:
+            raise ValueError(
+                "Multiple query classes found for "
+                f"{search_engine_cls.__name__} in {base.__name__}: "
+                f"{registered.__name__}, {query_cls.__name__}"
+            )
+
+    return query_cls
+
+
 def query_factory(
     search_engine_: Union[Type[ISearchEngine], ISearchEngine],
     query_cls: Type[IQuery],
     params: QueryParams,
+    fields: Optional[List[str]] = None,
 ) -> IQuery:
     """
     Factory function to create an instance of a query associated
@@ -151,9 +317,16 @@ def query_factory(
         params (QueryParams):
                 Parameters to initialize the query instance.
 
+        fields (Optional[List[str]]):
+                Projection: document fields to return for every hit,
+                None for whole documents.
+
     Returns:
         IQuery: An instance of the query class associated
                 with the specified search engine.
+
+    The implementation is looked up in the registry filled
+    by register_query.
     """
     search_engine_cls = (
         type(search_engine_)
@@ -161,28 +334,31 @@ def query_factory(
         else search_engine_
     )
 
-    query_classes = get_all_subclasses(query_cls)
-
-    linked_query = [
-        cls
-        for cls in query_classes
-        if cls.linked_searcher_class == search_engine_cls
-    ]
-
-    if len(linked_query) > 1:
-        raise ValueError(
-            "Multiple query classes found for "
-            f"{search_engine_cls.__name__} in "
-            f"{query_cls.__name__}"
-        )
-    elif len(linked_query) == 0:
+    linked_query = _query_registry.get((search_engine_cls, query_cls))
+    if linked_query is None:
         raise ValueError(
             f"No query class found for "
             f"{search_engine_cls.__name__} in "
             f"{query_cls.__name__}"
         )
 
-    return linked_query[0](params)
+    query = linked_query(params)
+    query.fields = fields
+    return query
+
+
+def source_fields(model: Type[BaseModel]) -> List[str]:
+    """
+    Document fields a model is built from: for every model field its
+    validation alias (the first one of AliasChoices) or its name.
+    """
+    fields = []
+    for name, field in model.model_fields.items():
+        alias = field.validation_alias
+        if isinstance(alias, AliasChoices):
+            alias = alias.choices[0]
+        fields.append(alias if isinstance(alias, str) else name)
+    return fields
 
 
 search_engine: Optional[ISearchEngine] = None
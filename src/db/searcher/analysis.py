@@ -0,0 +1,332 @@
+"""
+Text analysis for the in-memory search engine, configured from the
+"analysis" settings of an Elasticsearch index (elasticdump/*_idx.json).
+
+Supported: the standard tokenizer (approximated by Unicode word
+boundaries), lowercase, stop (_english_, _russian_ or an explicit
+list), edge_ngram and stemmer filters for english/porter and
+possessive_english.
+Filters without a local implementation (e.g. the russian stemmer)
+are skipped with a warning, so terms in those languages match only
+in the exact word form.
+"""
+import logging
+import re
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
+
+logger = logging.getLogger(__name__)
+
+TokenFilter = Callable[[List[str]], List[str]]
+
+_TOKEN_RE = re.compile(r"\w+(?:['’]\w+)*")
+
+# списки стоп-слов Lucene, которые ES подставляет вместо _english_
+# и _russian_
+STOPWORDS = {
+    "_english_": frozenset(
+        "a an and are as at be but by for if in into is it no not of on "
+        "or such that the their then there these they this to was will "
+        "with".split()
+    ),
+    "_russian_": frozenset(
+        "а без более бы был была были было быть в вам вас весь во вот "
+        "все всего всех вы где да даже для до его ее если есть еще же "
+        "за здесь и из или им их к как ко когда кто ли либо мне может "
+        "мы на надо наш не него нее нет ни них но ну о об однако он она "
+        "они оно от очень по под при с со так также такой там те тем "
+        "то того тоже той только том ты у уже хотя чего чей чем что "
+        "чтобы чье чья эта эти это я".split()
+    ),
+    "_none_": frozenset(),
+}
+
+
+class Analyzer:
+    """Tokenizer followed by a chain of token filters."""
+
+    def __init__(self, filters: Iterable[TokenFilter] = ()) -> None:
+        self.filters = list(filters)
+
+    def __call__(self, text: Optional[str]) -> List[str]:
+        if not text:
+            return []
+        tokens = _TOKEN_RE.findall(text)
+        for token_filter in self.filters:
+            tokens = token_filter(tokens)
+        return tokens
+
+    @classmethod
+    def from_settings(
+        cls, name: str, analysis: Dict[str, Any]
+    ) -> "Analyzer":
+        """
+        Builds the analyzer `name` from the analysis settings of an index.
+        "standard" (the Elasticsearch default) is lowercase only.
+        """
+        if name == "standard":
+            return cls([_lowercase])
+
+        definition = analysis.get("analyzer", {}).get(name)
+        if definition is None:
+            raise ValueError(f"Unknown analyzer: {name}")
+        tokenizer = definition.get("tokenizer", "standard")
+        if tokenizer != "standard":
+            logger.warning(
+                "Tokenizer %s of %s is approximated by standard",
+                tokenizer,
+                name,
+            )
+
+        custom = analysis.get("filter", {})
+        filters = []
+        for filter_name in definition.get("filter", ()):
+            token_filter = _make_filter(custom.get(filter_name, filter_name))
+            if token_filter is None:
+                logger.warning(
+                    "Token filter %s of %s is not supported, skipped",
+                    filter_name,
+                    name,
+                )
+                continue
+            filters.append(token_filter)
+        return cls(filters)
+
+
+def field_analyzers(
+    index_settings: Dict[str, Any], search: bool = False
+) -> Dict[str, Analyzer]:
+    """
+    Analyzers of the top-level text fields of an index and of their
+    text sub-fields ("title.suggest"), from its settings and mappings
+    as stored by elasticdump.
+
+    With search, the analyzers of query text: search_analyzer
+    of the field if it is set.
+    """
+    analysis = index_settings.get("settings", {}).get("analysis", {})
+    properties = index_settings.get("mappings", {}).get("properties", {})
+    return {
+        field: Analyzer.from_settings(
+            _analyzer_name(mapping, search), analysis
+        )
+        for field, mapping in _text_fields(properties)
+    }
+
+
+def _text_fields(
+    properties: Dict[str, Any]
+) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    for field, mapping in properties.items():
+        if mapping.get("type") != "text":
+            continue
+        yield field, mapping
+        for name, sub_mapping in mapping.get("fields", {}).items():
+            if sub_mapping.get("type") == "text":
+                yield f"{field}.{name}", sub_mapping
+
+
+def _analyzer_name(mapping: Dict[str, Any], search: bool) -> str:
+    analyzer = mapping.get("analyzer", "standard")
+    if search:
+        return mapping.get("search_analyzer", analyzer)
+    return analyzer
+
+
+def _make_filter(definition: Any) -> Optional[TokenFilter]:
+    if isinstance(definition, str):
+        definition = {"type": definition}
+
+    kind = definition.get("type")
+    if kind == "lowercase":
+        return _lowercase
+    if kind == "stop":
+        stopwords = definition.get("stopwords", "_english_")
+        words = (
+            STOPWORDS.get(stopwords)
+            if isinstance(stopwords, str)
+            else frozenset(stopwords)
+        )
+        if words is None:
+            return None
+        return lambda tokens: [t for t in tokens if t not in words]
+    if kind == "edge_ngram":
+        min_gram = int(definition.get("min_gram", 1))
+        max_gram = int(definition.get("max_gram", 2))
+        return lambda tokens: [
+            token[:size]
+            for token in tokens
+            for size in range(min_gram, min(len(token), max_gram) + 1)
+        ]
+    if kind == "stemmer":
+        stem = _STEMMERS.get(definition.get("language", "english"))
+        if stem is None:
+            return None
+        return lambda tokens: [stem(t) for t in tokens]
+    return None
+
+
+def _lowercase(tokens: List[str]) -> List[str]:
+    return [token.lower() for token in tokens]
+
+
+def _possessive(token: str) -> str:
+    if token[-2:] in ("'s", "’s"):
+        return token[:-2]
+    return token
+
+
+# --- Porter stemmer (как "english" и "porter" в ES) ---
+
+_VOWELS = frozenset("aeiou")
+
+
+def _is_consonant(word: str, i: int) -> bool:
+    char = word[i]
+    if char in _VOWELS:
+        return False
+    if char == "y":
+        return i == 0 or not _is_consonant(word, i - 1)
+    return True
+
+
+def _measure(stem: str) -> int:
+    """Number of vowel-consonant sequences in the stem."""
+    count = 0
+    previous_vowel = False
+    for i in range(len(stem)):
+        consonant = _is_consonant(stem, i)
+        if consonant and previous_vowel:
+            count += 1
+        previous_vowel = not consonant
+    return count
+
+
+def _has_vowel(stem: str) -> bool:
+    return any(not _is_consonant(stem, i) for i in range(len(stem)))
+
+
+def _double_consonant(word: str) -> bool:
+    return (
+        len(word) > 1
+        and word[-1] == word[-2]
+        and _is_consonant(word, len(word) - 1)
+    )
+
+
+def _cvc(word: str) -> bool:
+    """Ends consonant-vowel-consonant, the last one not w, x or y."""
+    if len(word) < 3:
+        return False
+    n = len(word)
+    return (
+        _is_consonant(word, n - 3)
+        and not _is_consonant(word, n - 2)
+        and _is_consonant(word, n - 1)
+        and word[-1] not in "wxy"
+    )
+
+
+def _replace_suffix(
+    word: str, rules: Iterable[tuple], min_measure: int
+) -> str:
+    for suffix, replacement in rules:
+        if word.endswith(suffix):
+            stem = word[: len(word) - len(suffix)]
+            if _measure(stem) > min_measure:
+                return stem + replacement
+            return word
+    return word
+
+
+# fmt: off
+_STEP2 = (
+    ("ational", "ate"), ("tional", "tion"), ("enci", "ence"),
+    ("anci", "ance"), ("izer", "ize"), ("bli", "ble"), ("alli", "al"),
+    ("entli", "ent"), ("eli", "e"), ("ousli", "ous"),
+    ("ization", "ize"), ("ation", "ate"), ("ator", "ate"),
+    ("alism", "al"), ("iveness", "ive"), ("fulness", "ful"),
+    ("ousness", "ous"), ("aliti", "al"), ("iviti", "ive"),
+    ("biliti", "ble"), ("logi", "log"),
+)
+_STEP3 = (
+    ("icate", "ic"), ("ative", ""), ("alize", "al"), ("iciti", "ic"),
+    ("ical", "ic"), ("ful", ""), ("ness", ""),
+)
+_STEP4 = (
+    "al", "ance", "ence", "er", "ic", "able", "ible", "ant", "ement",
+    "ment", "ent", "ion", "ou", "ism", "ate", "iti", "ous", "ive", "ize",
+)
+# fmt: on
+
+
+def porter_stem(word: str) -> str:
+    if len(word) <= 2 or not word.isalpha() or not word.isascii():
+        return word
+
+    # step 1a
+    if word.endswith("sses"):
+        word = word[:-2]
+    elif word.endswith("ies"):
+        word = word[:-2]
+    elif word.endswith("s") and not word.endswith("ss"):
+        word = word[:-1]
+
+    # step 1b
+    if word.endswith("eed"):
+        if _measure(word[:-3]) > 0:
+            word = word[:-1]
+    else:
+        for suffix in ("ed", "ing"):
+            if word.endswith(suffix) and _has_vowel(word[: -len(suffix)]):
+                word = word[: -len(suffix)]
+                if word.endswith(("at", "bl", "iz")):
+                    word += "e"
+                elif _double_consonant(word) and word[-1] not in "lsz":
+                    word = word[:-1]
+                elif _measure(word) == 1 and _cvc(word):
+                    word += "e"
+                break
+
+    # step 1c
+    if word.endswith("y") and _has_vowel(word[:-1]):
+        word = word[:-1] + "i"
+
+    word = _replace_suffix(word, _STEP2, 0)
+    word = _replace_suffix(word, _STEP3, 0)
+
+    # step 4
+    for suffix in sorted(_STEP4, key=len, reverse=True):
+        if word.endswith(suffix):
+            stem = word[: -len(suffix)]
+            if _measure(stem) > 1 and (
+                suffix != "ion" or stem.endswith(("s", "t"))
+            ):
+                word = stem
+            break
+
+    # step 5
+    if word.endswith("e"):
+        stem = word[:-1]
+        m = _measure(stem)
+        if m > 1 or (m == 1 and not _cvc(stem)):
+            word = stem
+    if _measure(word) > 1 and _double_consonant(word) and word[-1] == "l":
+        word = word[:-1]
+
+    return word
+
+
+_STEMMERS: Dict[str, Callable[[str], str]] = {
+    "english": porter_stem,
+    "porter": porter_stem,
+    "possessive_english": _possessive,
+}
@@ -0,0 +1,108 @@
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
+
+from elasticsearch import AsyncElasticsearch
+
+logger = logging.getLogger(__name__)
+
+# тело запроса - dict или уже сериализованный JSON
+Body = Union[Dict[str, Any], bytes]
+_Pending = Tuple[str, Body, asyncio.Future]
+
+
+class MSearchError(Exception):
+    """Error returned by Elasticsearch for one query of an _msearch."""
+
+    def __init__(self, status: Optional[int], error: Any) -> None:
+        super().__init__(f"{status}: {error}")
+        self.status = status
+        self.error = error
+
+
+class MSearchBatcher:
+    """
+    Collects search queries issued within a short window and sends them
+    to Elasticsearch as one _msearch request.
+
+    A batch is sent `window` seconds after its first query or as soon
+    as it has `max_batch` queries. Every caller gets the response of its
+    own query; an error of one query (MSearchError) does not affect the
+    others, while a failure of the whole request is raised to every
+    caller of the batch.
+    """
+
+    def __init__(
+        self,
+        client: AsyncElasticsearch,
+        window: float = 0.002,
+        max_batch: int = 64,
+    ) -> None:
+        """
+        :param client: клиент Elasticsearch
+        :param window: сколько секунд копить запросы перед отправкой
+        :param max_batch: максимум запросов в одном _msearch
+        """
+        self.client = client
+        self.window = window
+        self.max_batch = max_batch
+
+        self._pending: List[_Pending] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._in_flight: Set[asyncio.Task] = set()
+
+    async def search(self, index: str, body: Body) -> Dict[str, Any]:
+        """
+        Adds the query to the current batch and waits for its response.
+        Returns the search response of this query (with "hits").
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((index, body, future))
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        task = asyncio.ensure_future(self._send(batch))
+        # держим ссылку на задачу, иначе её может собрать GC
+        self._in_flight.add(task)
+        task.add_done_callback(self._in_flight.discard)
+
+    async def _send(self, batch: List[_Pending]) -> None:
+        searches: List[Body] = []
+        for index, body, _ in batch:
+            searches.append({"index": index})
+            searches.append(body)
+
+        logger.debug("msearch: %s queries", len(batch))
+        try:
+            response = await self.client.msearch(searches=searches)
+        except Exception as ex:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(ex)
+            return
+
+        for (_, _, future), item in zip(batch, response["responses"]):
+            # вызывающий мог быть отменён, пока ждал ответа
+            if future.done():
+                continue
+            if "error" in item:
+                future.set_exception(
+                    MSearchError(item.get("status"), item["error"])
+                )
+            else:
+                future.set_result(item)
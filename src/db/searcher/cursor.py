@@ -0,0 +1,129 @@
+import base64
+import binascii
+import time
+from collections import OrderedDict
+from hashlib import blake2b
+from typing import Any, Dict, List, Optional, Tuple
+
+import orjson
+
+# части тела запроса, которые меняются от страницы к странице
+_PAGING_KEYS = ("from", "size", "search_after", "pit")
+
+
+class InvalidCursorError(ValueError):
+    """Raised for a cursor that is malformed or made for another query."""
+
+
+def query_fingerprint(body: Dict[str, Any]) -> str:
+    """Short hash of a query body without its paging parameters."""
+    stable = {k: v for k, v in body.items() if k not in _PAGING_KEYS}
+    payload = orjson.dumps(stable, option=orjson.OPT_SORT_KEYS)
+    return blake2b(payload, digest_size=6).hexdigest()
+
+
+def encode_cursor(fingerprint: str, search_after: List[Any]) -> str:
+    payload = orjson.dumps([fingerprint, search_after])
+    return base64.urlsafe_b64encode(payload).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str, fingerprint: str) -> List[Any]:
+    """
+    Returns the search_after values of the cursor.
+
+    Raises InvalidCursorError if the cursor cannot be decoded
+    or was issued for a query with another fingerprint.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        owner, search_after = orjson.loads(base64.urlsafe_b64decode(padded))
+    except (binascii.Error, orjson.JSONDecodeError, TypeError, ValueError):
+        raise InvalidCursorError("Malformed cursor") from None
+
+    if owner != fingerprint or not isinstance(search_after, list):
+        raise InvalidCursorError("Cursor was issued for another query")
+    return search_after
+
+
+class CursorCache:
+    """
+    Small per-process cache of cursors issued by searches over a point in
+    time: cursor -> (walk, PIT id, full sort values of the last hit).
+
+    A walk is one pagination over one PIT, named by the id the PIT was
+    opened with: Elasticsearch may return a new id on every page, so
+    the latest one is kept per walk. Entries live shorter than the PIT
+    keep-alive; when full, the oldest cursor is evicted (a cursor is
+    usually followed once). A cursor missing here (evicted, expired or
+    issued by another worker) still works, just without the PIT snapshot.
+
+    When the last cursor of a walk leaves the cache, its PIT is no
+    longer reachable; released() hands such PITs over to be closed.
+    """
+
+    def __init__(self, max_entries: int, ttl: float) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data: "OrderedDict[str, Tuple[float, str, List[Any]]]" = (
+            OrderedDict()
+        )
+        # walk -> [cursors in the cache, latest PIT id]
+        self._walks: Dict[str, List[Any]] = {}
+        self._released: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, cursor: str) -> Optional[Tuple[str, str, List[Any]]]:
+        entry = self._data.get(cursor)
+        if entry is None:
+            return None
+
+        expires_at, walk, search_after = entry
+        if expires_at <= time.monotonic():
+            self.discard(cursor)
+            return None
+
+        return walk, self._walks[walk][1], search_after
+
+    def set(
+        self, cursor: str, walk: str, pit_id: str, search_after: List[Any]
+    ) -> None:
+        self.discard(cursor)
+        refs = self._walks.setdefault(walk, [0, pit_id])
+        refs[0] += 1
+        refs[1] = pit_id
+
+        self._data[cursor] = (time.monotonic() + self.ttl, walk, search_after)
+        while len(self._data) > self.max_entries:
+            evicted, _ = self._data.popitem(last=False)
+            self._unref(evicted)
+
+    def discard(self, cursor: str) -> None:
+        entry = self._data.pop(cursor, None)
+        if entry is not None:
+            self._unref(entry[1])
+
+    def released(self) -> List[str]:
+        """
+        Drops expired cursors and returns the PIT ids no cached cursor
+        refers to any more, each once.
+        """
+        now = time.monotonic()
+        # entries are kept in insertion order, which is also the order
+        # they expire in, so stop at the first live one
+        while self._data:
+            cursor, (expires_at, _, _) = next(iter(self._data.items()))
+            if expires_at > now:
+                break
+            self.discard(cursor)
+
+        released, self._released = self._released, []
+        return released
+
+    def _unref(self, walk: str) -> None:
+        refs = self._walks[walk]
+        refs[0] -= 1
+        if refs[0] == 0:
+            del self._walks[walk]
+            self._released.append(refs[1])
@@ -2,11 +2,32 @@ from __future__ import annotations
 
 import logging
 from abc import abstractmethod
-from typing import Any, Optional, Dict, List
+from typing import (
+    Any,
+    AsyncIterator,
+    Optional,
+    Dict,
+    List,
+    Tuple,
+    Union,
+)
 
 from elasticsearch import NotFoundError, AsyncElasticsearch
 
-from db.searcher import ISearchEngine
+from db.searcher import (
+    ISearchEngine,
+    SearchPage,
+    SearchResult,
+    register_query,
+)
+from db.searcher.batching import MSearchBatcher, MSearchError
+from db.searcher.cursor import (
+    CursorCache,
+    decode_cursor,
+    encode_cursor,
+    query_fingerprint,
+)
+from db.searcher.template import BodyTemplate, Slot, extend_body
 from db.searcher.query import (
     IQuery,
     FilmQuery,
@@ -14,11 +35,26 @@ from db.searcher.query import (
     GenreQuery,
     PersonQuery,
     FilmsByPersonIDQuery,
+    FilmsByPersonIDsQuery,
+    FilmSuggestQuery,
+    PersonSuggestQuery,
+    MAX_PERSON_IDS,
 )
-from models.query_params import QueryParams
+from models.query_params import IdsQueryParams, QueryParams
 
 logger = logging.getLogger(__name__)
 
+PIT_KEEP_ALIVE = "1m"
+# курсоры живут в кэше меньше, чем PIT, чтобы не ссылаться на истёкший
+CURSOR_CACHE_TTL = 50
+CURSOR_CACHE_SIZE = 1024
+# значение неявного _shard_doc при переходе на PIT посреди обхода:
+# документ курсора однозначно задан полями сортировки (id в конце),
+# и с максимальным _shard_doc он сам в выдачу не попадает
+_SHARD_DOC_AFTER_ALL = 2**63 - 1
+# index.max_result_window по умолчанию: глубже from + size ES не отдаёт
+MAX_RESULT_WINDOW = 10_000
+
 
 class ElasticSearchEngine(ISearchEngine):
     """
@@ -27,9 +63,22 @@ class ElasticSearchEngine(ISearchEngine):
     an AsyncElasticsearch client.
     """
 
-    def __init__(self, client: Any):
+    def __init__(
+        self,
+        client: Any,
+        batcher: Optional[MSearchBatcher] = None,
+        track_total_hits: int = 10_000,
+        templates: bool = True,
+    ):
         """
         Initializes the ElasticSearchEngine with an AsyncElasticsearch client.
+
+        If batcher is given, search queries are sent through it,
+        batched into _msearch requests. track_total_hits caps counting
+        of the total hits returned with every search: beyond it the
+        total is a lower bound. With templates, search bodies are
+        rendered from the pre-serialized templates of the queries
+        instead of being built as dicts and serialized by the client.
         """
         if not isinstance(client, AsyncElasticsearch):
             raise TypeError(
@@ -38,6 +87,10 @@ class ElasticSearchEngine(ISearchEngine):
             )
 
         self.client = client
+        self.batcher = batcher
+        self.track_total_hits = track_total_hits
+        self.templates = templates
+        self._cursors = CursorCache(CURSOR_CACHE_SIZE, CURSOR_CACHE_TTL)
 
     async def get(self, data_source: str, id: str) -> Optional[Dict[str, Any]]:
         """
@@ -52,26 +105,249 @@ class ElasticSearchEngine(ISearchEngine):
         except NotFoundError:
             return None
 
+    async def mget(
+        self, data_source: str, ids: List[str]
+    ) -> List[Optional[Dict[str, Any]]]:
+        """
+        Retrieves several documents from a specified Elasticsearch index
+        with a single _mget request.
+        """
+        logger.debug("mget: %s ids", len(ids))
+        if not ids:
+            return []
+
+        try:
+            response = await self.client.mget(index=data_source, ids=ids)
+        except NotFoundError:
+            return [None] * len(ids)
+
+        return [
+            doc["_source"] if doc.get("found") else None
+            for doc in response["docs"]
+        ]
+
     async def search(
         self, data_source: str, search_query: IElasticQuery
-    ) -> List[Dict[str, Any]]:
+    ) -> SearchResult:
         """
         Executes a search query against a specified Elasticsearch
         index using an instance of IElasticQuery.
-        """
-        query = search_query.query
 
+        The total hits are counted in the same request. A page beyond
+        the result window is not fetched: only the total is returned.
+        """
         if not isinstance(search_query, IElasticQuery):
             raise TypeError("search_query must be instance of IElasticQuery")
 
+        query = self._search_request(search_query)
+
         try:
             logger.debug("query: %s", query)
-            response = await self.client.search(index=data_source, body=query)
+            if self.batcher is not None:
+                response = await self.batcher.search(data_source, query)
+            else:
+                response = await self.client.search(
+                    index=data_source, body=query
+                )
             logger.debug("Validating response from ES")
 
-            return [hit["_source"] for hit in response["hits"]["hits"]]
+            return SearchResult(
+                [
+                    search_query.document(hit)
+                    for hit in response["hits"]["hits"]
+                ],
+                *_total(response),
+            )
         except NotFoundError:
-            return []
+            return SearchResult(items=[], total=0)
+        except MSearchError as ex:
+            if ex.status == 404:
+                return SearchResult(items=[], total=0)
+            raise
+
+    async def search_page(
+        self,
+        data_source: str,
+        search_query: IElasticQuery,
+        cursor: Optional[str] = None,
+    ) -> SearchPage:
+        """
+        Sorted search with search_after pagination.
+
+        The cursor holds the sort values of the last hit. Following a
+        cursor opens a point in time (PIT), so the rest of the walk reads
+        one snapshot of the index; the PIT of the next page is kept in
+        a small in-process cursor cache. A cursor missing from the cache
+        starts a new PIT, an expired PIT falls back to the live index.
+        A PIT is closed when its walk reaches the last page or its last
+        cursor leaves the cache.
+
+        Raises InvalidCursorError for a cursor of another query.
+        """
+        if not isinstance(search_query, IElasticQuery):
+            raise TypeError("search_query must be instance of IElasticQuery")
+
+        body = _request_body(search_query)
+        sort = body.get("sort")
+        if not sort:
+            raise ValueError("Cursor pagination requires a sorted query")
+
+        fingerprint = query_fingerprint(body)
+        walk = pit_id = None
+        if cursor is None:
+            body = self._counted(body)
+        else:
+            # общее число нужно только первой странице обхода
+            body["track_total_hits"] = False
+            search_after = decode_cursor(cursor, fingerprint)
+            body.pop("from", None)
+            cached = self._cursors.get(cursor)
+            if cached is not None:
+                walk, pit_id, body["search_after"] = cached
+            else:
+                walk = pit_id = await self._open_pit(data_source)
+                body["search_after"] = (
+                    [*search_after, _SHARD_DOC_AFTER_ALL]
+                    if pit_id is not None
+                    else search_after
+                )
+
+        try:
+            response = await self._search_body(data_source, body, pit_id)
+        except NotFoundError:
+            if pit_id is None:
+                return SearchPage(items=[], total=0)
+            logger.debug("PIT expired, continuing on the live index")
+            self._cursors.discard(cursor)
+            walk = pit_id = None
+            body["search_after"] = search_after
+            response = await self._search_body(data_source, body, pit_id)
+
+        hits = response["hits"]["hits"]
+        next_cursor = None
+        if hits and len(hits) >= body.get("size", 10):
+            values = hits[-1]["sort"]
+            next_cursor = encode_cursor(fingerprint, values[: len(sort)])
+            if walk is not None:
+                self._cursors.set(
+                    next_cursor, walk, response.get("pit_id", pit_id), values
+                )
+        elif walk is not None:
+            # последняя страница: обход по этому PIT закончен
+            if cached is None:
+                await self._close_pit(response.get("pit_id", pit_id))
+            else:
+                self._cursors.discard(cursor)
+
+        for released in self._cursors.released():
+            await self._close_pit(released)
+
+        total, total_exact = _total(response)
+        return SearchPage(
+            items=[search_query.document(hit) for hit in hits],
+            total=total,
+            total_exact=total_exact,
+            next_cursor=next_cursor,
+        )
+
+    async def scan(
+        self,
+        data_source: str,
+        search_query: IElasticQuery,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Walks all hits of a query with search_after in one point in time
+        (PIT), batch_size hits per request. The requests bypass the
+        msearch batcher; the PIT is closed when the walk ends or the
+        generator is closed, and it falls back to the live index if the
+        PIT cannot be opened.
+
+        Hits of an unsorted query come in index order (_shard_doc),
+        the cheapest order to walk.
+        """
+        if not isinstance(search_query, IElasticQuery):
+            raise TypeError("search_query must be instance of IElasticQuery")
+
+        body = _request_body(search_query)
+        body.pop("from", None)
+        body["size"] = batch_size
+        body["track_total_hits"] = False
+
+        pit_id = await self._open_pit(data_source)
+        if not body.get("sort"):
+            # без PIT _shard_doc недоступен, _doc - его аналог на индексе
+            body["sort"] = ["_shard_doc" if pit_id is not None else "_doc"]
+        try:
+            while True:
+                try:
+                    response = await self._search_body(
+                        data_source, body, pit_id
+                    )
+                except NotFoundError:
+                    # нет индекса - пустой обход; истёкший PIT посреди
+                    # обхода - ошибка, иначе выгрузка молча оборвётся
+                    if "search_after" in body:
+                        raise
+                    return
+                pit_id = response.get("pit_id", pit_id)
+                hits = response["hits"]["hits"]
+                if hits:
+                    yield [search_query.document(hit) for hit in hits]
+                if len(hits) < batch_size:
+                    break
+                body["search_after"] = hits[-1]["sort"]
+        finally:
+            if pit_id is not None:
+                await self._close_pit(pit_id)
+
+    def _search_request(
+        self, search_query: IElasticQuery
+    ) -> Union[bytes, Dict[str, Any]]:
+        values = search_query.values
+        if _beyond_window(values):
+            # ES отклонит такую страницу, но общее число нужно для ответа
+            values = {**values, "from": 0, "size": 0}
+
+        extra = _source_filter(search_query)
+        extra["track_total_hits"] = (
+            self.track_total_hits if search_query.count_total else False
+        )
+        if self.templates:
+            return extend_body(search_query.template.render(values), extra)
+        return {**search_query.template.build(values), **extra}
+
+    def _counted(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        body["track_total_hits"] = self.track_total_hits
+        if _beyond_window(body):
+            body["from"], body["size"] = 0, 0
+        return body
+
+    async def _search_body(
+        self, data_source: str, body: Dict[str, Any], pit_id: Optional[str]
+    ) -> Dict[str, Any]:
+        if pit_id is None:
+            return await self.client.search(index=data_source, body=body)
+        body = {**body, "pit": {"id": pit_id, "keep_alive": PIT_KEEP_ALIVE}}
+        return await self.client.search(body=body)
+
+    async def _open_pit(self, data_source: str) -> Optional[str]:
+        try:
+            response = await self.client.open_point_in_time(
+                index=data_source, keep_alive=PIT_KEEP_ALIVE
+            )
+        except Exception as ex:
+            logger.error("Error opening point in time: %s", ex)
+            return None
+        return response["id"]
+
+    async def _close_pit(self, pit_id: str) -> None:
+        try:
+            await self.client.close_point_in_time(id=pit_id)
+        except NotFoundError:
+            logger.debug("Point in time already expired")
+        except Exception as ex:
+            logger.error("Error closing point in time: %s", ex)
 
     async def count(self, data_source: str) -> int:
         """
@@ -82,35 +358,130 @@ class ElasticSearchEngine(ISearchEngine):
         return resp["count"]
 
 
+def _request_body(search_query: IElasticQuery) -> Dict[str, Any]:
+    return {**search_query.query, **_source_filter(search_query)}
+
+
+def _source_filter(search_query: IElasticQuery) -> Dict[str, Any]:
+    if search_query.fields is None:
+        return {}
+    return {"_source": {"includes": search_query.fields}}
+
+
+def _beyond_window(paging: Dict[str, Any]) -> bool:
+    return paging.get("from", 0) + paging.get("size", 10) > MAX_RESULT_WINDOW
+
+
+def _total(response: Dict[str, Any]) -> Tuple[Optional[int], bool]:
+    total = response["hits"].get("total")
+    if total is None:
+        return None, True
+    return total["value"], total["relation"] == "eq"
+
+
+# поля, сортировка по которым идёт по keyword-подполю
+SORT_FIELDS = {"title": "title.raw"}
+
+_PERSON_FIELDS = ("actors", "writers", "directors")
+
+
 class IElasticQuery(IQuery):
+    """
+    Elasticsearch query: a body template of the query shape and
+    the values of its slots. query is the body as a dict, body()
+    the same body serialized with only the values filled in.
+    """
+
     linked_searcher_class = ElasticSearchEngine
+    template: BodyTemplate
+    values: Dict[str, Any]
 
     @abstractmethod
     def __init__(self, params: QueryParams):
         pass
 
+    @property
+    def query(self) -> Dict[str, Any]:
+        return self.template.build(self.values)
+
+    def body(self) -> bytes:
+        return self.template.render(self.values)
+
+    def document(self, hit: Dict[str, Any]) -> Dict[str, Any]:
+        """Document of the results made from a search hit"""
+        return hit["_source"]
+
     @staticmethod
     def _get_offset(page_number: int, page_size: int) -> int:
         return (page_number - 1) * page_size
 
+    def _paging(self, params: QueryParams) -> Dict[str, Any]:
+        return {
+            "from": self._get_offset(params.page_number, params.page_size),
+            "size": params.page_size,
+        }
+
+
+_PAGING = {"from": Slot("from"), "size": Slot("size")}
 
+
+@register_query
 class ElasticFilmQuery(IElasticQuery, FilmQuery):
-    def __init__(self, params: QueryParams):
-        offset = self._get_offset(params.page_number, params.page_size)
-        self.query = {
+    template = BodyTemplate(
+        "film_search",
+        1,
+        {
             "query": {
                 "multi_match": {
-                    "query": params.query,
+                    "query": Slot("query"),
                     "fields": ["title", "directors", "actors", "writers"],
                     "type": "best_fields",
                 }
             },
-            "from": offset,
-            "size": params.page_size,
-        }
+            **_PAGING,
+        },
+    )
+
+    def __init__(self, params: QueryParams):
+        self.values = {"query": params.query, **self._paging(params)}
 
 
+@register_query
 class ElasticPopularFilmQuery(IElasticQuery, PopularFilmQuery):
+    # id - уникальный ключ сортировки для пагинации по курсору
+    template = BodyTemplate(
+        "film_popular",
+        1,
+        {
+            "query": {"bool": {"must": [{"match_all": {}}]}},
+            "sort": [Slot("sort"), {"id": {"order": "asc"}}],
+            **_PAGING,
+        },
+    )
+    genre_template = BodyTemplate(
+        "film_popular_by_genre",
+        1,
+        {
+            "query": {
+                "bool": {
+                    "must": [{"match_all": {}}],
+                    "filter": [
+                        {
+                            "nested": {
+                                "path": "genres",
+                                "query": {
+                                    "term": {"genres.id": Slot("genre")}
+                                },
+                            }
+                        }
+                    ],
+                }
+            },
+            "sort": [Slot("sort"), {"id": {"order": "asc"}}],
+            **_PAGING,
+        },
+    )
+
     def __init__(self, params: QueryParams):
         if not hasattr(params, "sort"):
             raise ValueError(
@@ -118,83 +489,163 @@ class ElasticPopularFilmQuery(IElasticQuery, PopularFilmQuery):
                 " supports params with sort attribute"
             )
 
-        offset = self._get_offset(params.page_number, params.page_size)
         order = "desc" if params.sort.startswith("-") else "asc"
         sort_field = params.sort.lstrip("-")
 
-        self.query = {
-            "query": {"bool": {"must": [{"match_all": {}}]}},
-            "sort": [{sort_field: {"order": order}}],
-            "from": offset,
-            "size": params.page_size,
+        self.values = {
+            "sort": {
+                SORT_FIELDS.get(sort_field, sort_field): {"order": order}
+            },
+            **self._paging(params),
         }
 
         if params.query:
-            self.query["query"]["bool"]["filter"] = [
-                {
-                    "nested": {
-                        "path": "genres",
-                        "query": {"term": {"genres.id": params.query}},
-                    }
-                }
-            ]
+            self.template = self.genre_template
+            self.values["genre"] = params.query
 
 
+@register_query
 class ElasticGenreQuery(IElasticQuery, GenreQuery):
-    def __init__(self, params: QueryParams):
-        offset = self._get_offset(params.page_number, params.page_size)
+    template = BodyTemplate(
+        "genre_list", 1, {"query": {"match_all": {}}, **_PAGING}
+    )
 
-        self.query = {
-            "query": {"match_all": {}},
-            "from": offset,
-            "size": params.page_size,
-        }
+    def __init__(self, params: QueryParams):
+        self.values = self._paging(params)
 
 
+@register_query
 class ElasticPersonQuery(IElasticQuery, PersonQuery):
-    def __init__(self, params: QueryParams):
-        offset = self._get_offset(params.page_number, params.page_size)
+    template = BodyTemplate(
+        "person_search",
+        1,
+        {"query": {"match": {"full_name": Slot("query")}}, **_PAGING},
+    )
 
-        self.query = {
-            "query": {"match": {"full_name": params.query}},
-            "from": offset,
-            "size": params.page_size,
-        }
+    def __init__(self, params: QueryParams):
+        self.values = {"query": params.query, **self._paging(params)}
 
 
+@register_query
 class ElasticFilmsByPersonIDQuery(IElasticQuery, FilmsByPersonIDQuery):
-    def __init__(self, params: QueryParams):
-        offset = self._get_offset(params.page_number, params.page_size)
-
-        self.query = {
+    template = BodyTemplate(
+        "films_by_person",
+        1,
+        {
             "query": {
                 "bool": {
                     "should": [
                         {
                             "nested": {
-                                "path": "actors",
-                                "query": {"term": {"actors.id": params.query}},
-                            }
-                        },
-                        {
-                            "nested": {
-                                "path": "writers",
+                                "path": field,
                                 "query": {
-                                    "term": {"writers.id": params.query}
+                                    "term": {f"{field}.id": Slot("person")}
                                 },
                             }
-                        },
+                        }
+                        for field in _PERSON_FIELDS
+                    ]
+                }
+            },
+            **_PAGING,
+        },
+    )
+
+    def __init__(self, params: QueryParams):
+        self.values = {"person": params.query, **self._paging(params)}
+
+
+@register_query
+class ElasticFilmsByPersonIDsQuery(IElasticQuery, FilmsByPersonIDsQuery):
+    # совпавшие вложенные персоны каждой роли приходят в inner_hits
+    # только своими id из doc values, без _source; у всех совпадений
+    # одинаковый score, так что страницы from/size стыкуются только
+    # при сортировке по id
+    template = BodyTemplate(
+        "films_by_persons",
+        3,
+        {
+            "query": {
+                "bool": {
+                    "should": [
                         {
                             "nested": {
-                                "path": "directors",
+                                "path": field,
                                 "query": {
-                                    "term": {"directors.id": params.query}
+                                    "terms": {f"{field}.id": Slot("persons")}
+                                },
+                                "inner_hits": {
+                                    "name": field,
+                                    "size": Slot("persons_size"),
+                                    "_source": False,
+                                    "docvalue_fields": [f"{field}.id"],
                                 },
                             }
-                        },
+                        }
+                        for field in _PERSON_FIELDS
                     ]
                 }
             },
-            "from": offset,
-            "size": params.page_size,
+            "sort": [{"id": {"order": "asc"}}],
+            **_PAGING,
+        },
+    )
+
+    def __init__(self, params: IdsQueryParams):
+        if len(params.ids) > MAX_PERSON_IDS:
+            raise ValueError(
+                f"At most {MAX_PERSON_IDS} persons per query,"
+                f" got {len(params.ids)}"
+            )
+        self.values = {
+            "persons": params.ids,
+            "persons_size": max(1, len(params.ids)),
+            **self._paging(params),
         }
+
+    def document(self, hit: Dict[str, Any]) -> Dict[str, Any]:
+        doc = dict(hit["_source"])
+        inner_hits = hit.get("inner_hits", {})
+        for field in _PERSON_FIELDS:
+            matched = inner_hits.get(field, {}).get("hits", {}).get("hits", [])
+            doc[field] = [
+                {"id": person["fields"][f"{field}.id"][0]}
+                for person in matched
+            ]
+        return doc
+
+
+class _ElasticSuggestQuery(IElasticQuery):
+    # подсказки по мере набора: общее число совпадений не нужно
+    count_total = False
+
+    def __init__(self, params: QueryParams):
+        self.values = {"prefix": params.query, "size": params.page_size}
+
+
+def _suggest_template(name: str, field: str) -> BodyTemplate:
+    return BodyTemplate(
+        name,
+        1,
+        {
+            "query": {
+                "match": {
+                    f"{field}.suggest": {
+                        "query": Slot("prefix"),
+                        "operator": "and",
+                    }
+                }
+            },
+            "size": Slot("size"),
+        },
+    )
+
+
+@register_query
+class ElasticFilmSuggestQuery(_ElasticSuggestQuery, FilmSuggestQuery):
+    template = _suggest_template("film_suggest", "title")
+
+
+@register_query
+class ElasticPersonSuggestQuery(_ElasticSuggestQuery, PersonSuggestQuery):
+    template = _suggest_template("person_suggest", "full_name")
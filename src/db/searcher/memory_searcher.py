@@ -0,0 +1,468 @@
+from __future__ import annotations
+
+import logging
+import math
+import pathlib
+from abc import abstractmethod
+from collections import defaultdict
+from typing import (
+    Any,
+    AsyncIterator,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Union,
+)
+
+import orjson
+
+from db.searcher import (
+    ISearchEngine,
+    SearchPage,
+    SearchResult,
+    register_query,
+)
+from db.searcher.analysis import Analyzer, field_analyzers
+from db.searcher.cursor import (
+    InvalidCursorError,
+    decode_cursor,
+    encode_cursor,
+    query_fingerprint,
+)
+from db.searcher.query import (
+    IQuery,
+    FilmQuery,
+    PopularFilmQuery,
+    GenreQuery,
+    PersonQuery,
+    FilmsByPersonIDQuery,
+    FilmsByPersonIDsQuery,
+    FilmSuggestQuery,
+    PersonSuggestQuery,
+    MAX_PERSON_IDS,
+)
+from models.query_params import IdsQueryParams, QueryParams
+
+logger = logging.getLogger(__name__)
+
+# параметры BM25 по умолчанию в Elasticsearch
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_PERSON_FIELDS = ("actors", "writers", "directors")
+
+
+class TextIndex:
+    """
+    Inverted index of one text field with BM25 scoring. The query text
+    is analyzed with search_analyzer, by default the same as values.
+    """
+
+    def __init__(
+        self,
+        analyzer: Analyzer,
+        values: Iterable[Optional[str]],
+        search_analyzer: Optional[Analyzer] = None,
+    ) -> None:
+        self.analyzer = analyzer
+        self.search_analyzer = search_analyzer or analyzer
+        self.postings: Dict[str, Dict[int, int]] = defaultdict(dict)
+        self.lengths: List[int] = []
+
+        for doc, value in enumerate(values):
+            terms = analyzer(value)
+            self.lengths.append(len(terms))
+            for term in terms:
+                postings = self.postings[term]
+                postings[doc] = postings.get(doc, 0) + 1
+
+        self.postings = dict(self.postings)
+        total = sum(self.lengths)
+        self.avg_length = total / len(self.lengths) if total else 1.0
+
+    def match(self, text: Optional[str], operator: str = "or") -> List[int]:
+        """
+        Documents containing any term of the text (as "match" with the
+        "or" operator) or, with "and", all of them; best BM25 score first.
+        """
+        scores: Dict[int, float] = defaultdict(float)
+        docs_count = len(self.lengths)
+        terms = self.search_analyzer(text)
+        matched: Dict[int, Set[str]] = defaultdict(set)
+        for term in terms:
+            postings = self.postings.get(term)
+            if not postings:
+                if operator == "and":
+                    return []
+                continue
+            found = len(postings)
+            idf = math.log(1 + (docs_count - found + 0.5) / (found + 0.5))
+            for doc, freq in postings.items():
+                length = self.lengths[doc] / self.avg_length
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * length)
+                scores[doc] += idf * freq * (BM25_K1 + 1) / (freq + norm)
+                matched[doc].add(term)
+
+        if operator == "and":
+            required = len(set(terms))
+            scores = {
+                doc: score
+                for doc, score in scores.items()
+                if len(matched[doc]) == required
+            }
+        return sorted(scores, key=lambda doc: (-scores[doc], doc))
+
+
+class MemoryIndex:
+    """
+    Documents of one index and the structures queries run on:
+    inverted indexes of the text fields, columns of the sortable fields
+    and ids of nested objects (genres, persons of films).
+
+    A text sub-field ("title.suggest") is indexed from the value of its
+    field with its own analyzer.
+    """
+
+    def __init__(
+        self,
+        docs: List[Dict[str, Any]],
+        analyzers: Optional[Dict[str, Analyzer]] = None,
+        search_analyzers: Optional[Dict[str, Analyzer]] = None,
+    ) -> None:
+        self.docs = docs
+        self.positions = {doc["id"]: n for n, doc in enumerate(docs)}
+
+        search_analyzers = search_analyzers or {}
+        self.text = {
+            field: TextIndex(
+                analyzer,
+                (doc.get(field.split(".", 1)[0]) for doc in docs),
+                search_analyzers.get(field),
+            )
+            for field, analyzer in (analyzers or {}).items()
+        }
+
+        self.columns: Dict[str, List[Any]] = {}
+        self.nested: Dict[str, Dict[str, Set[int]]] = {}
+        for field in dict.fromkeys(key for doc in docs for key in doc):
+            values = [doc.get(field) for doc in docs]
+            if all(isinstance(v, list) for v in values):
+                self.nested[field] = _nested_ids(values)
+            else:
+                self.columns[field] = values
+
+        self._orders: Dict[tuple, List[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    def order(self, field: str, descending: bool) -> List[int]:
+        """
+        All documents sorted by the column, then by id; documents
+        without a value go last, as in Elasticsearch.
+        """
+        key = (field, descending)
+        if key not in self._orders:
+            column = self.columns.get(field, [None] * len(self.docs))
+            by_id = sorted(
+                range(len(self.docs)), key=lambda doc: self.docs[doc]["id"]
+            )
+            present = [doc for doc in by_id if column[doc] is not None]
+            # сортировка устойчива: при равных значениях остаётся порядок id
+            present.sort(key=column.__getitem__, reverse=descending)
+            missing = [doc for doc in by_id if column[doc] is None]
+            self._orders[key] = present + missing
+        return self._orders[key]
+
+    def with_nested(self, path: str, id: str) -> Set[int]:
+        return self.nested.get(path, {}).get(id, set())
+
+
+class InMemorySearchEngine(ISearchEngine):
+    """
+    ISearchEngine over documents kept in process memory, loaded from
+    the elasticdump files. For benchmarks, CI and nodes without
+    Elasticsearch; the data is read-only and results follow the
+    Elasticsearch queries closely, but not score for score.
+    """
+
+    def __init__(
+        self, client: Dict[str, MemoryIndex], track_total_hits: int = 10_000
+    ):
+        """
+        :param client: индексы по именам
+        :param track_total_hits: до скольких совпадений точно считать
+            общее число, как у ElasticSearchEngine
+        """
+        self.indexes = client
+        self.track_total_hits = track_total_hits
+
+    @classmethod
+    def from_dump(
+        cls,
+        path: Union[str, pathlib.Path],
+        dump_name: str = "{index}_dump.json",
+        **kwargs: Any,
+    ) -> InMemorySearchEngine:
+        """
+        Loads every index that has <index>_idx.json (settings and
+        mappings) and a dump with documents in the directory.
+        """
+        path = pathlib.Path(path)
+        indexes = {}
+        for idx_file in sorted(path.glob("*_idx.json")):
+            index = idx_file.name[: -len("_idx.json")]
+            dump_file = path / dump_name.format(index=index)
+            if not dump_file.exists():
+                continue
+
+            with open(dump_file, "rb") as f_in:
+                docs = [orjson.loads(line)["_source"] for line in f_in]
+            with open(idx_file, "rb") as f_in:
+                index_settings = orjson.loads(f_in.read())
+
+            indexes[index] = MemoryIndex(
+                docs,
+                field_analyzers(index_settings),
+                field_analyzers(index_settings, search=True),
+            )
+            logger.info("Loaded %d documents into %s", len(docs), index)
+
+        return cls(indexes, **kwargs)
+
+    async def get(self, data_source: str, id: str) -> Optional[Dict[str, Any]]:
+        index = self.indexes.get(data_source)
+        if index is None or id not in index.positions:
+            return None
+        return dict(index.docs[index.positions[id]])
+
+    async def mget(
+        self, data_source: str, ids: List[str]
+    ) -> List[Optional[Dict[str, Any]]]:
+        return [await self.get(data_source, id) for id in ids]
+
+    async def search(
+        self, data_source: str, search_query: IMemoryQuery
+    ) -> SearchResult:
+        if not isinstance(search_query, IMemoryQuery):
+            raise TypeError("search_query must be instance of IMemoryQuery")
+
+        index = self.indexes.get(data_source)
+        if index is None:
+            return SearchResult(items=[], total=0)
+
+        found = search_query.run(index)
+        start = search_query.offset
+        items = self._source(
+            index, found[start:start + search_query.size], search_query
+        )
+        if not search_query.count_total:
+            return SearchResult(items=items)
+
+        total = min(len(found), self.track_total_hits)
+        return SearchResult(
+            items=items, total=total, total_exact=total == len(found)
+        )
+
+    async def search_page(
+        self,
+        data_source: str,
+        search_query: IMemoryQuery,
+        cursor: Optional[str] = None,
+    ) -> SearchPage:
+        """
+        The data never changes, so the cursor holds just the position
+        of the next page in the results of the query.
+        """
+        if not isinstance(search_query, IMemoryQuery):
+            raise TypeError("search_query must be instance of IMemoryQuery")
+
+        fingerprint = search_query.fingerprint()
+        start = search_query.offset
+        if cursor is not None:
+            position = decode_cursor(cursor, fingerprint)
+            if len(position) != 1 or not isinstance(position[0], int):
+                raise InvalidCursorError("Malformed cursor")
+            start = position[0]
+
+        index = self.indexes.get(data_source)
+        if index is None:
+            return SearchPage(items=[], total=0)
+
+        found = search_query.run(index)
+        end = start + search_query.size
+        next_cursor = None
+        if end < len(found):
+            next_cursor = encode_cursor(fingerprint, [end])
+
+        total = min(len(found), self.track_total_hits)
+        return SearchPage(
+            items=self._source(index, found[start:end], search_query),
+            total=None if cursor else total,
+            total_exact=total == len(found),
+            next_cursor=next_cursor,
+        )
+
+    async def scan(
+        self,
+        data_source: str,
+        search_query: IMemoryQuery,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        if not isinstance(search_query, IMemoryQuery):
+            raise TypeError("search_query must be instance of IMemoryQuery")
+
+        index = self.indexes.get(data_source)
+        if index is None:
+            return
+
+        found = search_query.run(index)
+        for start in range(0, len(found), batch_size):
+            yield self._source(
+                index, found[start:start + batch_size], search_query
+            )
+
+    async def count(self, data_source: str) -> int:
+        index = self.indexes.get(data_source)
+        return len(index) if index is not None else 0
+
+    @staticmethod
+    def _source(
+        index: MemoryIndex, docs: List[int], search_query: IMemoryQuery
+    ) -> List[Dict[str, Any]]:
+        return [search_query.document(index.docs[doc]) for doc in docs]
+
+
+def _nested_ids(values: List[List[Any]]) -> Dict[str, Set[int]]:
+    ids: Dict[str, Set[int]] = defaultdict(set)
+    for doc, objects in enumerate(values):
+        for obj in objects:
+            if isinstance(obj, dict) and "id" in obj:
+                ids[obj["id"]].add(doc)
+    return dict(ids)
+
+
+class IMemoryQuery(IQuery):
+    """
+    Query of the in-memory engine: run() returns positions of all
+    matching documents in the order of the results.
+    """
+
+    linked_searcher_class = InMemorySearchEngine
+
+    def __init__(self, params: QueryParams):
+        self.params = params
+        self.offset = (params.page_number - 1) * params.page_size
+        self.size = params.page_size
+
+    @abstractmethod
+    def run(self, index: MemoryIndex) -> List[int]:
+        pass
+
+    def document(self, source: Dict[str, Any]) -> Dict[str, Any]:
+        """Document of the results: the source limited to fields"""
+        if self.fields is None:
+            return dict(source)
+        return {key: source[key] for key in self.fields if key in source}
+
+    def fingerprint(self) -> str:
+        return query_fingerprint(
+            {
+                "query": type(self).__name__,
+                **self.params.model_dump(
+                    exclude={"page_size", "page_number"}
+                ),
+            }
+        )
+
+
+@register_query
+class MemoryFilmQuery(IMemoryQuery, FilmQuery):
+    # поля персон во вложенных объектах: multi_match ElasticFilmQuery
+    # без nested-запроса по ним не ищет, поиск идёт по названию
+    def run(self, index: MemoryIndex) -> List[int]:
+        return index.text["title"].match(self.params.query)
+
+
+@register_query
+class MemoryPopularFilmQuery(IMemoryQuery, PopularFilmQuery):
+    def run(self, index: MemoryIndex) -> List[int]:
+        sort = self.params.sort
+        docs = index.order(sort.lstrip("-"), sort.startswith("-"))
+        if self.params.query:
+            genre = index.with_nested("genres", self.params.query)
+            docs = [doc for doc in docs if doc in genre]
+        return docs
+
+
+@register_query
+class MemoryGenreQuery(IMemoryQuery, GenreQuery):
+    def run(self, index: MemoryIndex) -> List[int]:
+        return list(range(len(index)))
+
+
+@register_query
+class MemoryPersonQuery(IMemoryQuery, PersonQuery):
+    def run(self, index: MemoryIndex) -> List[int]:
+        return index.text["full_name"].match(self.params.query)
+
+
+@register_query
+class MemoryFilmsByPersonIDQuery(IMemoryQuery, FilmsByPersonIDQuery):
+    def run(self, index: MemoryIndex) -> List[int]:
+        docs: Set[int] = set()
+        for field in _PERSON_FIELDS:
+            docs |= index.with_nested(field, self.params.query)
+        return sorted(docs)
+
+
+@register_query
+class MemoryFilmsByPersonIDsQuery(IMemoryQuery, FilmsByPersonIDsQuery):
+    params: IdsQueryParams
+
+    def __init__(self, params: IdsQueryParams):
+        if len(params.ids) > MAX_PERSON_IDS:
+            raise ValueError(
+                f"At most {MAX_PERSON_IDS} persons per query,"
+                f" got {len(params.ids)}"
+            )
+        super().__init__(params)
+        self.ids = set(params.ids)
+
+    def run(self, index: MemoryIndex) -> List[int]:
+        docs: Set[int] = set()
+        for field in _PERSON_FIELDS:
+            for person_id in self.params.ids:
+                docs |= index.with_nested(field, person_id)
+        # как в ES: по id
+        return sorted(docs, key=lambda doc: index.docs[doc]["id"])
+
+    def document(self, source: Dict[str, Any]) -> Dict[str, Any]:
+        doc = super().document(source)
+        for field in _PERSON_FIELDS:
+            doc[field] = [
+                {"id": person["id"]}
+                for person in source.get(field) or ()
+                if person["id"] in self.ids
+            ]
+        return doc
+
+
+@register_query
+class MemoryFilmSuggestQuery(IMemoryQuery, FilmSuggestQuery):
+    count_total = False
+
+    def run(self, index: MemoryIndex) -> List[int]:
+        return index.text["title.suggest"].match(self.params.query, "and")
+
+
+@register_query
+class MemoryPersonSuggestQuery(IMemoryQuery, PersonSuggestQuery):
+    count_total = False
+
+    def run(self, index: MemoryIndex) -> List[int]:
+        return index.text["full_name.suggest"].match(
+            self.params.query, "and"
+        )
@@ -2,6 +2,10 @@ from abc import ABC
 
 from db.searcher import IQuery
 
+# ES отдаёт не больше index.max_inner_result_window (100) совпавших
+# вложенных объектов на документ
+MAX_PERSON_IDS = 100
+
 
 class FilmQuery(IQuery, ABC):
     pass
@@ -21,3 +25,20 @@ class PersonQuery(IQuery, ABC):
 
 class FilmsByPersonIDQuery(IQuery, ABC):
     pass
+
+
+class FilmsByPersonIDsQuery(IQuery, ABC):
+    """
+    Фильмы с участием любой из персон (не больше MAX_PERSON_IDS).
+    В документах результата, кроме полей fields, в actors, directors
+    и writers - только искомые персоны этого фильма, [{"id": ...}]:
+    роли считает поисковый движок, полные составы не передаются.
+    """
+
+
+class FilmSuggestQuery(IQuery, ABC):
+    pass
+
+
+class PersonSuggestQuery(IQuery, ABC):
+    pass
@@ -0,0 +1,92 @@
+import re
+from typing import Any, Dict, List, Mapping, NamedTuple, Tuple
+
+import orjson
+
+_SLOT_MARK = "\x1fslot:{}\x1f"
+_SLOT_RE = re.compile(rb'"\\u001fslot:(\d+)\\u001f"')
+
+
+class Slot(NamedTuple):
+    """Place of a query parameter in a body template."""
+
+    name: str
+
+
+class BodyTemplate:
+    """
+    Search request body serialized once, with slots for the parameters.
+
+    The skeleton is a request body where parameter values are replaced
+    by Slot(name). render() serializes only the parameter values and
+    joins them with the pre-serialized parts of the skeleton; build()
+    returns the same body as a dict, for callers that need to edit it.
+
+    name and version identify the query shape. They are sent as the
+    search stats group "<name>@v<version>", so shapes can be compared
+    in the index search stats when a new version is rolled out.
+    """
+
+    def __init__(
+        self, name: str, version: int, skeleton: Dict[str, Any]
+    ) -> None:
+        self.name = name
+        self.version = version
+        self.skeleton = {**skeleton, "stats": [self.id]}
+        self._chunks, self._slots = _compile(self.skeleton)
+
+    @property
+    def id(self) -> str:
+        return f"{self.name}@v{self.version}"
+
+    @property
+    def slots(self) -> Tuple[str, ...]:
+        return self._slots
+
+    def render(self, values: Mapping[str, Any]) -> bytes:
+        parts = [self._chunks[0]]
+        for name, chunk in zip(self._slots, self._chunks[1:]):
+            parts.append(orjson.dumps(values[name]))
+            parts.append(chunk)
+        return b"".join(parts)
+
+    def build(self, values: Mapping[str, Any]) -> Dict[str, Any]:
+        return _fill(self.skeleton, values)
+
+
+def extend_body(body: bytes, fields: Dict[str, Any]) -> bytes:
+    """Adds top-level fields to a serialized request body."""
+    if not fields:
+        return body
+    return body[:-1] + b"," + orjson.dumps(fields)[1:]
+
+
+def _compile(
+    skeleton: Dict[str, Any]
+) -> Tuple[List[bytes], Tuple[str, ...]]:
+    slots: List[str] = []
+
+    def mark(node: Any) -> Any:
+        if isinstance(node, Slot):
+            slots.append(node.name)
+            return _SLOT_MARK.format(len(slots) - 1)
+        if isinstance(node, dict):
+            return {key: mark(value) for key, value in node.items()}
+        if isinstance(node, (list, tuple)):
+            return [mark(value) for value in node]
+        return node
+
+    payload = orjson.dumps(mark(skeleton))
+    # re.split чередует куски тела и номера слотов
+    parts = _SLOT_RE.split(payload)
+    return parts[::2], tuple(slots[int(i)] for i in parts[1::2])
+
+
+def _fill(node: Any, values: Mapping[str, Any]) -> Any:
+    if isinstance(node, Slot):
+        return values[node.name]
+    if isinstance(node, dict):
+        return {key: _fill(value, values) for key, value in node.items()}
+    if isinstance(node, list):
+        return [_fill(value, values) for value in node]
+    return node
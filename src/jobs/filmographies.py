@@ -0,0 +1,228 @@
+"""
+Материализация фильмографий персон: для каждой персоны в документ
+индекса person записывается films: [{id, roles}] - все фильмы
+с её участием и её роли в них. После этого эндпоинты персон читают
+один документ вместо поиска фильмов персоны по индексу film.
+
+Полный пересчёт обходит весь индекс film, инкрементальный (--films)
+пересчитывает только персон изменённых фильмов: нынешних участников
+и тех, у кого эти фильмы уже записаны. Персоны, документ которых
+ещё не пересчитан (films отсутствует или null), собираются
+PersonService по-старому, запросом к индексу film. Записи кэша
+с обновлёнными персонами (get_by_id и страницы поиска) удаляются
+после каждой пачки обновлений.
+
+Запуск из директории src:
+    python -m jobs.filmographies
+    python -m jobs.filmographies --films <uuid> [<uuid> ...]
+"""
+import argparse
+import asyncio
+import logging
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Set
+
+from elasticsearch import AsyncElasticsearch
+from elasticsearch.helpers import async_bulk, async_scan
+
+from core.config import settings
+from db.cacher import AbstractCache
+from db.redis import RedisCache, create_redis, invalidate_documents
+from db.searcher import IQuery, query_factory
+from db.searcher.elastic_searcher import ElasticSearchEngine
+from db.searcher.query import (
+    MAX_PERSON_IDS,
+    FilmsByPersonIDsQuery,
+    PopularFilmQuery,
+)
+from models.query_params import IdsQueryParams, SortableQueryParams
+from services.person import PERSON_ROLE_FIELDS, collect_roles
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+FILM_FIELDS = ["id", *PERSON_ROLE_FIELDS]
+
+
+async def materialize(
+    client: AsyncElasticsearch,
+    film_ids: Optional[List[str]] = None,
+    batch_size: int = BATCH_SIZE,
+    cache: Optional[AbstractCache] = None,
+) -> int:
+    """
+    Пересчитывает фильмографии всех персон или, если переданы
+    film_ids, только персон этих фильмов. С cache после каждой
+    пачки из него удаляются записи, собранные из документов
+    обновлённых персон.
+    Возвращает число обновлённых документов персон.
+    """
+    engine = ElasticSearchEngine(client)
+
+    person_ids: Optional[Set[str]] = None
+    if film_ids is None:
+        queries = [_all_films_query(engine, batch_size)]
+    else:
+        person_ids = await _affected_persons(client, film_ids)
+        if not person_ids:
+            return 0
+        queries = _persons_films_queries(engine, person_ids, batch_size)
+
+    roles: Dict[str, Dict[str, List[str]]] = {}
+    for query in queries:
+        async for films in engine.scan("film", query, batch_size):
+            collect_roles(films, person_ids, roles)
+
+    if person_ids is None:
+        targets: AsyncIterator[str] = _all_persons(client)
+    else:
+        targets = _iterate(person_ids)
+
+    updated = 0
+    async for batch in _batches(targets, batch_size):
+        done, errors = await async_bulk(
+            client,
+            _updates(batch, roles),
+            chunk_size=batch_size,
+            raise_on_error=False,
+        )
+        for error in errors:
+            logger.warning("Person is not updated: %s", error)
+        updated += done
+        if cache is not None:
+            await invalidate_documents(cache, "person", batch)
+    return updated
+
+
+def _all_films_query(engine: ElasticSearchEngine, batch_size: int) -> IQuery:
+    params = SortableQueryParams(
+        query=None, page_size=batch_size, page_number=1, sort="-imdb_rating"
+    )
+    return query_factory(engine, PopularFilmQuery, params, FILM_FIELDS)
+
+
+def _persons_films_queries(
+    engine: ElasticSearchEngine, person_ids: Set[str], batch_size: int
+) -> List[IQuery]:
+    # роли персон считает ES, из фильмов приходят только id
+    ids = sorted(person_ids)
+    return [
+        query_factory(
+            engine,
+            FilmsByPersonIDsQuery,
+            IdsQueryParams(
+                ids=ids[i:i + MAX_PERSON_IDS],
+                page_size=batch_size,
+                page_number=1,
+            ),
+            ["id"],
+        )
+        for i in range(0, len(ids), MAX_PERSON_IDS)
+    ]
+
+
+async def _affected_persons(
+    client: AsyncElasticsearch, film_ids: List[str]
+) -> Set[str]:
+    # нынешние участники фильмов
+    response = await client.mget(
+        index="film", ids=film_ids, source_includes=FILM_FIELDS
+    )
+    films = [doc["_source"] for doc in response["docs"] if doc.get("found")]
+    persons = set(collect_roles(films))
+
+    # персоны, у которых фильмы уже записаны: кто-то из них мог
+    # перестать быть участником
+    query = {
+        "query": {
+            "nested": {
+                "path": "films",
+                "query": {"terms": {"films.id": film_ids}},
+            }
+        }
+    }
+    async for hit in async_scan(
+        client, index="person", query=query, _source=["id"]
+    ):
+        persons.add(hit["_source"]["id"])
+    return persons
+
+
+async def _all_persons(client: AsyncElasticsearch) -> AsyncIterator[str]:
+    async for hit in async_scan(
+        client,
+        index="person",
+        query={"query": {"match_all": {}}},
+        _source=["id"],
+    ):
+        yield hit["_source"]["id"]
+
+
+async def _iterate(ids: Set[str]) -> AsyncIterator[str]:
+    for id in sorted(ids):
+        yield id
+
+
+async def _batches(
+    ids: AsyncIterator[str], size: int
+) -> AsyncIterator[List[str]]:
+    batch: List[str] = []
+    async for id in ids:
+        batch.append(id)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _updates(
+    person_ids: List[str], roles: Dict[str, Dict[str, List[str]]]
+) -> Iterator[Dict]:
+    for person_id in person_ids:
+        films = roles.get(person_id, {})
+        yield {
+            "_op_type": "update",
+            "_index": "person",
+            "_id": person_id,
+            "doc": {
+                "films": [
+                    {"id": film_id, "roles": film_roles}
+                    for film_id, film_roles in films.items()
+                ]
+            },
+        }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--films",
+        nargs="+",
+        metavar="UUID",
+        help="пересчитать только персон этих фильмов",
+    )
+    args = parser.parse_args()
+
+    client = AsyncElasticsearch(
+        hosts=[f"http://{settings.ELASTIC_HOST}:{settings.ELASTIC_PORT}"]
+    )
+    redis_client, _ = create_redis(
+        mode=settings.REDIS_MODE,
+        host=settings.REDIS_HOST,
+        port=settings.REDIS_PORT,
+        nodes=settings.REDIS_NODES,
+        sentinel_master=settings.REDIS_SENTINEL_MASTER,
+    )
+    try:
+        updated = await materialize(
+            client, args.films, cache=RedisCache(redis_client)
+        )
+    finally:
+        await client.close()
+        await redis_client.aclose()
+    logger.info("Filmographies of %s persons are materialized", updated)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from contextlib import asynccontextmanager
 
@@ -8,35 +9,121 @@ from core.config import settings
 from core.log_config import setup_logging
 
 from elasticsearch import AsyncElasticsearch
-from redis.asyncio import Redis
 
 import db.searcher as searcher
 import db.cacher as cacher
 from db import elastic
 from db import redis
+from db.searcher.batching import MSearchBatcher
 from db.searcher.elastic_searcher import ElasticSearchEngine
+from db.searcher.memory_searcher import InMemorySearchEngine
+from models import decode
+from api.v1 import cache
 from api.v1 import films
 from api.v1 import genres
 from api.v1 import persons
+from api.v1 import suggest
 from db.redis import RedisCache
+from db.cacher.codec import get_codec
+from db.cacher.compression import CompressedCodec, load_dictionary
+from db.cacher.local import LocalCache
+from db.cacher.tiered import TieredCache
+from services.film import FilmService
+from services.genre import GenreService
+from services.person import PersonService
+from services.warmup import CacheWarmer
 
 setup_logging()
 logger = logging.getLogger(__name__)
 
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    redis.redis = Redis(host=settings.REDIS_HOST, port=settings.REDIS_PORT)
-    cacher.cacher = RedisCache(redis.redis)
+def create_elastic_engine() -> ElasticSearchEngine:
     elastic.es_client = AsyncElasticsearch(
         hosts=[f"http://{settings.ELASTIC_HOST}:{settings.ELASTIC_PORT}"]
     )
-    searcher.search_engine = ElasticSearchEngine(elastic.es_client)
+    batcher = None
+    if settings.ELASTIC_MSEARCH_ENABLED:
+        batcher = MSearchBatcher(
+            elastic.es_client,
+            window=settings.ELASTIC_MSEARCH_WINDOW_MS / 1000,
+            max_batch=settings.ELASTIC_MSEARCH_MAX_BATCH,
+        )
+    return ElasticSearchEngine(
+        elastic.es_client,
+        batcher=batcher,
+        track_total_hits=settings.ELASTIC_TRACK_TOTAL_HITS,
+        templates=settings.ELASTIC_QUERY_TEMPLATES,
+    )
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    decode.trusted = settings.MODEL_DECODE == "trusted"
+    redis.redis, redis.redis_replica = redis.create_redis(
+        mode=settings.REDIS_MODE,
+        host=settings.REDIS_HOST,
+        port=settings.REDIS_PORT,
+        nodes=settings.REDIS_NODES,
+        sentinel_master=settings.REDIS_SENTINEL_MASTER,
+        read_from_replicas=settings.REDIS_READ_FROM_REPLICAS,
+    )
+    codec = get_codec(settings.CACHE_CODEC)
+    if settings.CACHE_COMPRESSION_THRESHOLD:
+        codec = CompressedCodec(
+            codec,
+            threshold=settings.CACHE_COMPRESSION_THRESHOLD,
+            level=settings.CACHE_COMPRESSION_LEVEL,
+            dict_data=load_dictionary(settings.CACHE_ZSTD_DICT_PATH),
+        )
+    cacher.cacher = RedisCache(
+        redis.redis, codec=codec, replica=redis.redis_replica
+    )
+    if settings.LOCAL_CACHE_ENABLED:
+        local_cache = LocalCache(
+            max_entries=settings.LOCAL_CACHE_MAX_ENTRIES,
+            max_bytes=settings.LOCAL_CACHE_MAX_BYTES,
+            max_ttl=settings.LOCAL_CACHE_MAX_TTL,
+        )
+        cacher.cacher = TieredCache(local=local_cache, remote=cacher.cacher)
+    if settings.SEARCH_ENGINE == "memory":
+        searcher.search_engine = InMemorySearchEngine.from_dump(
+            settings.SEARCH_DUMP_DIR,
+            track_total_hits=settings.ELASTIC_TRACK_TOTAL_HITS,
+        )
+    else:
+        searcher.search_engine = create_elastic_engine()
     logger.debug("Successfully connected to Redis and Elasticsearch.")
+    warmup_task = None
+    if settings.CACHE_WARMUP_ENABLED:
+        services = {
+            name: service(
+                cache=cacher.cacher, search_engine=searcher.search_engine
+            )
+            for name, service in (
+                ("film", FilmService),
+                ("genre", GenreService),
+                ("person", PersonService),
+            )
+        }
+        warmer = CacheWarmer(
+            services,
+            cache=cacher.cacher,
+            pages=settings.CACHE_WARMUP_PAGES,
+            concurrency=settings.CACHE_WARMUP_CONCURRENCY,
+        )
+        # прогрев идёт в фоне и не задерживает старт приложения
+        warmup_task = asyncio.create_task(
+            warmer.run_forever(settings.CACHE_WARMUP_INTERVAL)
+        )
     yield
     logger.debug("Closing connections")
-    await redis.redis.close()
-    await elastic.es_client.close()
+    if warmup_task is not None:
+        warmup_task.cancel()
+    await redis.redis.aclose()
+    if redis.redis_replica is not None:
+        await redis.redis_replica.aclose()
+    if elastic.es_client is not None:
+        await elastic.es_client.close()
 
 
 app = FastAPI(
@@ -55,3 +142,7 @@ app.include_router(genres.router, prefix="/v1/genres", tags=["genre_service"])
 app.include_router(
     persons.router, prefix="/v1/persons", tags=["person_service"]
 )
+app.include_router(
+    suggest.router, prefix="/v1/suggest", tags=["suggest_service"]
+)
+app.include_router(cache.router, prefix="/v1/cache", tags=["cache_service"])
@@ -0,0 +1,190 @@
+"""
+Сборка моделей из документов ES.
+
+В строгом режиме документ проходит полную валидацию pydantic.
+Документы индексов уже были проверены при индексации, поэтому
+в доверенном режиме модели собираются без валидации, заранее
+собранной для модели функцией (model_construct в pydantic 2
+медленнее самой валидации): значения только приводятся к типам
+полей, которые нельзя оставить как есть (UUID, вложенные модели,
+даты). Документ без обязательного поля и в этом режиме даёт
+ValidationError, а модели с валидаторами, приватными атрибутами
+или лишними полями всегда проходят валидацию.
+Приложение, в том числе в функциональных тестах, работает
+в доверенном режиме (MODEL_DECODE=trusted); строгий включается
+настройкой MODEL_DECODE=strict. Код, который не задаёт режим
+при старте (скрипты, бенчмарки), получает строгий.
+"""
+import inspect
+from functools import lru_cache
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Literal,
+    Optional,
+    Tuple,
+    Type,
+    TypeVar,
+    Union,
+    get_args,
+    get_origin,
+)
+from uuid import UUID
+
+from pydantic import AliasChoices, BaseModel, TypeAdapter, ValidationError
+
+M = TypeVar("M", bound=BaseModel)
+Converter = Callable[[Any], Any]
+# (поле модели, ключи документа, приведение значения или None,
+#  значение по умолчанию или _MISSING)
+_Plan = Tuple[
+    Tuple[str, Tuple[str, ...], Optional[Converter], Any], ...
+]
+_MISSING = object()
+
+trusted: bool = False
+
+_PLAIN = (str, int, float, bool, Any)
+
+
+def decode(model: Type[M], row: Dict[str, Any]) -> M:
+    """Модель из одного документа"""
+    if trusted:
+        return _construct(model, row)
+    return model.model_validate(row)
+
+
+def decode_many(model: Type[M], rows: Iterable[Dict[str, Any]]) -> List[M]:
+    """Модели из списка документов"""
+    if trusted:
+        return [_construct(model, row) for row in rows]
+    return _list_adapter(model).validate_python(list(rows))
+
+
+def _construct(model: Type[M], row: Dict[str, Any]) -> M:
+    return _constructor(model)(row)
+
+
+@lru_cache(maxsize=None)
+def _constructor(model: Type[M]) -> Callable[[Dict[str, Any]], M]:
+    """
+    Собирает функцию, создающую экземпляр model из документа так же,
+    как model_construct, но без его общих проверок на каждый вызов.
+    """
+    if not _constructible(model):
+        return model.model_validate
+
+    plan = _plan(model)
+    new = object.__new__
+    setattr_ = object.__setattr__
+
+    def construct(row: Dict[str, Any]) -> M:
+        if not isinstance(row, dict):
+            # уже собранная модель, например переданная вложенной
+            return row
+        values = {}
+        fields_set = set()
+        for name, keys, convert, default in plan:
+            for key in keys:
+                if key in row:
+                    value = row[key]
+                    if convert is not None:
+                        value = convert(value)
+                    values[name] = value
+                    fields_set.add(name)
+                    break
+            else:
+                if default is _MISSING:
+                    raise _missing(model, keys[0], row)
+                values[name] = default
+        obj = new(model)
+        setattr_(obj, "__dict__", values)
+        setattr_(obj, "__pydantic_fields_set__", fields_set)
+        setattr_(obj, "__pydantic_extra__", None)
+        setattr_(obj, "__pydantic_private__", None)
+        return obj
+
+    return construct
+
+
+def _constructible(model: Type[BaseModel]) -> bool:
+    # то, что сборка без валидации пропустила бы молча
+    decorators = model.__pydantic_decorators__
+    return not (
+        decorators.validators
+        or decorators.field_validators
+        or decorators.root_validators
+        or decorators.model_validators
+        or model.__private_attributes__
+        or model.model_config.get("extra") == "allow"
+    )
+
+
+def _missing(
+    model: Type[BaseModel], key: str, row: Dict[str, Any]
+) -> ValidationError:
+    return ValidationError.from_exception_data(
+        model.__name__, [{"type": "missing", "loc": (key,), "input": row}]
+    )
+
+
+@lru_cache(maxsize=None)
+def _plan(model: Type[BaseModel]) -> _Plan:
+    plan = []
+    for name, field in model.model_fields.items():
+        alias = field.validation_alias
+        if isinstance(alias, AliasChoices):
+            keys = tuple(c for c in alias.choices if isinstance(c, str))
+        elif isinstance(alias, str):
+            keys = (alias,)
+        else:
+            keys = (field.alias or name,)
+        default = (
+            _MISSING
+            if field.is_required()
+            else field.get_default(call_default_factory=True)
+        )
+        plan.append((name, keys, _converter(field.annotation), default))
+    return tuple(plan)
+
+
+def _converter(annotation: Any) -> Optional[Converter]:
+    if annotation in _PLAIN:
+        return None
+    if annotation is UUID:
+        return _uuid
+    if inspect.isclass(annotation) and issubclass(annotation, BaseModel):
+        return _constructor(annotation)
+
+    origin, args = get_origin(annotation), get_args(annotation)
+    if origin is Literal:
+        return None
+    if origin is Union and type(None) in args and len(args) == 2:
+        inner = _converter(next(a for a in args if a is not type(None)))
+        if inner is None:
+            return None
+        return lambda value: None if value is None else inner(value)
+    if origin is list and len(args) == 1:
+        item = _converter(args[0])
+        if item is None:
+            return None
+        return lambda values: [item(value) for value in values]
+
+    # остальные типы (даты и т.п.) приводит pydantic
+    return TypeAdapter(annotation).validate_python
+
+
+# одни и те же id (персоны, жанры) встречаются в документах постоянно
+@lru_cache(maxsize=65536)
+def _uuid(value: Any) -> UUID:
+    if isinstance(value, UUID):
+        return value
+    return UUID(value)
+
+
+@lru_cache(maxsize=None)
+def _list_adapter(model: Type[M]) -> TypeAdapter:
+    return TypeAdapter(List[model])
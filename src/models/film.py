@@ -2,7 +2,7 @@ from datetime import datetime
 from typing import List, Optional
 from uuid import UUID
 
-from pydantic import BaseModel
+from pydantic import AliasChoices, BaseModel, Field
 
 from models.genre import GenreBase
 from models.person import PersonBase
@@ -21,6 +21,11 @@ class Film(BaseModel):
 
 
 class FilmShort(BaseModel):
-    uuid: UUID
+    """
+    Фильм в списках выдачи. Собирается прямо из документа ES,
+    в котором идентификатор лежит в поле id.
+    """
+
+    uuid: UUID = Field(validation_alias=AliasChoices("id", "uuid"))
     title: str
     imdb_rating: Optional[float] = None
@@ -0,0 +1,31 @@
+from typing import Any, List, Optional
+
+from pydantic import BaseModel
+
+
+class Page(BaseModel):
+    """
+    Страница выдачи вместе с общим числом найденных документов.
+    total - None, если число не считалось (страница по курсору);
+    при total_exact=False это нижняя граница: ES считает совпадения
+    только до порога ELASTIC_TRACK_TOTAL_HITS.
+    """
+
+    items: List[Any]
+    total: Optional[int] = None
+    total_exact: bool = True
+
+
+class RenderedPage(BaseModel):
+    """
+    Страница выдачи, уже отрендеренная в тело ответа API.
+    В кэше лежит вместе с телом как есть и отдаётся без повторной
+    сериализации; ids - id документов страницы для тегов кэша
+    и прогрева.
+    """
+
+    body: bytes
+    ids: List[str]
+    total: Optional[int] = None
+    total_exact: bool = True
+    next_cursor: Optional[str] = None
@@ -1,13 +1,16 @@
 from typing import Literal, List
 from uuid import UUID
 
-from pydantic import BaseModel
+from pydantic import AliasChoices, BaseModel, Field
+
+from models.page import Page
 
 PERSON_ROLES = Literal["actor", "director", "writer"]
 
 
 class PersonFilm(BaseModel):
-    uuid: UUID
+    # в материализованной фильмографии документа персоны - поле id
+    uuid: UUID = Field(validation_alias=AliasChoices("id", "uuid"))
     roles: List[PERSON_ROLES]
 
 
@@ -22,3 +25,7 @@ class PersonBase(BaseModel):
 
 class Person(PersonBase):
     films: List[PersonFilm]
+
+
+class PersonPage(Page):
+    items: List[Person]
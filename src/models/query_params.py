@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import List, Optional
 
 from pydantic import BaseModel, Field
 
@@ -15,3 +15,7 @@ class SortableQueryParams(QueryParams):
         description="Field to sort by,"
         " prefix with '-' for descending order",
     )
+
+
+class IdsQueryParams(QueryParams):
+    ids: List[str] = Field(..., description="Identifiers to search by")
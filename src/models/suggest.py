@@ -0,0 +1,21 @@
+from typing import List
+from uuid import UUID
+
+from pydantic import AliasChoices, BaseModel, Field
+
+
+class FilmSuggestion(BaseModel):
+    uuid: UUID = Field(validation_alias=AliasChoices("id", "uuid"))
+    title: str
+
+
+class PersonSuggestion(BaseModel):
+    uuid: UUID = Field(validation_alias=AliasChoices("id", "uuid"))
+    full_name: str
+
+
+class Suggestions(BaseModel):
+    """Подсказки по началу введённого текста: фильмы и персоны"""
+
+    films: List[FilmSuggestion]
+    persons: List[PersonSuggestion]
@@ -0,0 +1,16 @@
+from typing import List, Literal
+
+from pydantic import BaseModel, Field
+
+
+class InvalidateSchema(BaseModel):
+    index: Literal["film", "genre", "person"] = Field(
+        ..., description="Индекс ES, в котором изменились документы"
+    )
+    ids: List[str] = Field(
+        ..., min_length=1, description="Список id изменённых документов"
+    )
+
+
+class InvalidateResultSchema(BaseModel):
+    evicted: int = Field(..., description="Кол-во удалённых записей кэша")
@@ -0,0 +1,31 @@
+from uuid import UUID
+from typing import List
+
+from pydantic import BaseModel, Field
+
+
+class UUIDMixin(BaseModel):
+    uuid: UUID = Field(
+        ...,
+        title="Уникальный идентификатор",
+        examples=["123e4567-e89b-12d3-a456-426614174000"],
+    )
+
+
+class FilmSuggestSchema(UUIDMixin):
+    title: str = Field(..., title="Название фильма", examples=["Star Wars"])
+
+
+class PersonSuggestSchema(UUIDMixin):
+    full_name: str = Field(
+        ..., title="Полное имя персоны", examples=["George Lucas"]
+    )
+
+
+class SuggestSchema(BaseModel):
+    films: List[FilmSuggestSchema] = Field(
+        ..., description="Фильмы, название которых начинается с текста"
+    )
+    persons: List[PersonSuggestSchema] = Field(
+        ..., description="Персоны, имя которых начинается с текста"
+    )
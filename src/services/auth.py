@@ -2,10 +2,12 @@ import os
 import time
 
 import aiohttp
+import jwt
 from aiohttp import ClientResponseError
 from dotenv import load_dotenv
 from fastapi import Request, HTTPException, status
 from fastapi.params import Depends
+from pydantic import ValidationError
 
 from db.cacher import get_cacher, AbstractCache
 from schemas.auth import AccessJWT
@@ -13,6 +15,9 @@ from services.circuit_breaker import circuit_breaker
 
 load_dotenv()
 
+# базовая роль: доступное ей доступно и остальным ролям
+BASE_ROLE = "USER"
+
 
 @circuit_breaker()
 async def verify_access_token(token: str, role: str) -> None:
@@ -63,7 +68,25 @@ class PermissionChecker:
                 detail="Access token is missing"
             )
 
-        cache_key = str(self.__class__) + ":" + token
+        try:
+            access_jwt = AccessJWT.from_jwt(token, secret_key=None)
+        except (jwt.PyJWTError, ValidationError) as exc:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid or expired token"
+            ) from exc
+
+        # роль из токена не проверена, но отказать по ней безопасно
+        if self.required != BASE_ROLE and access_jwt.role != self.required:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Not enough permissions"
+            )
+
+        # проверка одного токена для разных ролей кэшируется отдельно
+        cache_key = (
+            str(self.__class__) + ":" + self.required + ":" + token
+        )
 
         # чтение кеша
         is_valid = await cacher.get(cache_key)
@@ -74,7 +97,6 @@ class PermissionChecker:
         await verify_access_token(token, self.required)
 
         # кэширование результата на время жизни токена
-        access_jwt = AccessJWT.from_jwt(token, secret_key=None)
         issue_epoch = access_jwt.exp
 
         diff = int(issue_epoch - time.time())
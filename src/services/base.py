@@ -1,11 +1,15 @@
 import abc
 import logging
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Type
 
 from pydantic import BaseModel
 
-from db.redis import AbstractCache, cache_method
-from db.searcher import ISearchEngine, IQuery
+from db.cacher.tags import source_tags
+from db.redis import AbstractCache, cache_many_method, cache_method
+from db.searcher import ISearchEngine, IQuery, source_fields
+from models.decode import decode, decode_many
+from models.page import RenderedPage
+from utils.render import render_page
 
 logger = logging.getLogger(__name__)
 
@@ -13,6 +17,12 @@ logger = logging.getLogger(__name__)
 class BaseService(abc.ABC):
     data_source = ""
     model_type = BaseModel
+    # модель элементов списков выдачи, если в них нужны не все поля
+    # документа: из ES запрашиваются только её поля
+    list_model_type: Optional[Type[BaseModel]] = None
+    # схема элементов списков в ответе API: render_search отдаёт
+    # страницу поиска готовым телом ответа
+    list_schema_type: Optional[Type[BaseModel]] = None
 
     def __init__(self, cache: AbstractCache, search_engine: ISearchEngine):
         self.cacher = cache
@@ -24,26 +34,38 @@ class BaseService(abc.ABC):
     ) -> IQuery:
         pass
 
-    @cache_method(cache_attr="cacher")
-    async def search(
+    @cache_method(cache_attr="cacher", soft_expire=300, tags=source_tags)
+    async def render_search(
         self, query: str, page_size: int, page_number: int
-    ) -> List[BaseModel]:
+    ) -> RenderedPage:
         """
-        Функция поиска, вызывающая поиск в Эластике и обогащающая результат.
+        Функция поиска в Эластике, отдающая страницу сразу
+        отрендеренной в тело ответа API схемой list_schema_type,
+        минуя модели.
         Параметры:
           :query: str Ключевое слово для поиска
           :page_size: int Кол-во элементов на странице
           :page_number: int Номер страницы выдачи
-        Возвращает: список найденных элементов заданного класса.
+        Возвращает: тело ответа, id найденных элементов
+        и их общее число.
         """
-        query = self._get_query(query, page_size, page_number)
-        data = await self.searcher.search(self.data_source, query)
+        return await self._render_search(query, page_size, page_number)
 
-        items = [self.model_type(**row) for row in data]
+    async def _render_search(
+        self, query: str, page_size: int, page_number: int
+    ) -> RenderedPage:
+        query = self._get_query(query, page_size, page_number)
+        result = await self.searcher.search(self.data_source, query)
+        return render_page(self.list_schema_type, result)
 
-        return items
+    def _list_fields(self) -> Optional[List[str]]:
+        if self.list_model_type is None:
+            return None
+        return source_fields(self.list_model_type)
 
-    @cache_method(cache_attr="cacher")
+    @cache_method(
+        cache_attr="cacher", expire=21600, tags=source_tags, grouped=True
+    )
     async def get_by_id(self, id: str) -> Optional[BaseModel]:
         """
         Функция для получения инф-ии об объекте по его id.
@@ -55,8 +77,33 @@ class BaseService(abc.ABC):
         if not data:
             return None
 
-        return self.model_type(**data)
+        return await self._make_model(data)
+
+    @cache_many_method(cache_attr="cacher", method="get_by_id")
+    async def get_many_by_ids(
+        self, ids: List[str]
+    ) -> List[Optional[BaseModel]]:
+        """
+        Функция для получения объектов по списку id одним запросом.
+        Объекты, уже лежащие в кэше get_by_id, берутся из кэша,
+        в ES запрашиваются только остальные.
+        Параметры:
+          :ids: List[str] UUID объектов
+        Возвращает: список объектов в порядке ids, None для ненайденных.
+        """
+        data = await self.searcher.mget(self.data_source, ids)
+
+        found = iter(await self._make_models([row for row in data if row]))
+        return [next(found) if row else None for row in data]
+
+    async def _make_model(self, data: Dict[str, Any]) -> BaseModel:
+        return decode(self.model_type, data)
 
-    @cache_method(cache_attr="cacher")
-    async def get_count(self) -> int:
-        return await self.searcher.count(self.data_source)
+    async def _make_models(
+        self, rows: List[Dict[str, Any]]
+    ) -> List[BaseModel]:
+        """
+        Модели для нескольких документов; сервисы, обогащающие
+        документы данными других индексов, делают это одним запросом.
+        """
+        return decode_many(self.model_type, rows)
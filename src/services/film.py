@@ -1,56 +1,150 @@
 import logging
 from functools import lru_cache
-from typing import List, Optional
+from typing import AsyncIterator, List, Optional
 
 from fastapi import Depends
 
+from db.cacher.tags import index_tags
 from db.redis import cache_method
-from db.searcher import query_factory, IQuery, get_search_engine, ISearchEngine
+from db.searcher import (
+    query_factory,
+    IQuery,
+    get_search_engine,
+    ISearchEngine,
+    SearchPage,
+)
 from db.searcher.query import PopularFilmQuery, FilmQuery
 from db.cacher import AbstractCache, get_cacher
-from models.film import Film
+from models.decode import decode_many
+from models.film import Film, FilmShort
+from models.page import RenderedPage
 from models.query_params import SortableQueryParams, QueryParams
+from schemas.film import FilmSchema
 from services.base import BaseService
+from utils.render import render_page
 
 logger = logging.getLogger(__name__)
 
+VALID_SORT_OPT = (
+    "-imdb_rating",
+    "imdb_rating",
+    "-title",
+    "title",
+    "-creation_date",
+    "creation_date",
+)
+
 
 class FilmService(BaseService):
 
     data_source = "film"
     model_type = Film
+    list_model_type = FilmShort
+    list_schema_type = FilmSchema
 
-    @cache_method(cache_attr="cacher")
-    async def get_popular_films(
-        self, sort: str, page_size: int, page_number: int, genre: Optional[str]
-    ) -> List:
+    @cache_method(
+        cache_attr="cacher",
+        local_expire=30,
+        lease_ttl=5,
+        early_beta=1.0,
+        tags=index_tags("film"),
+    )
+    async def render_popular_films(
+        self,
+        sort: str,
+        page_size: int,
+        page_number: int,
+        genre: Optional[str],
+    ) -> RenderedPage:
         """
-        Функция для получения из ES списка популярных фильмов
+        Функция для получения из ES списка популярных фильмов,
+        сразу отрендеренного в тело ответа API /v1/films, минуя модели
         Параметры:
           :sort: str Поле для сортировки выдачи
           :genre: str Поле для фильтрации по жанру
           :page_size: int Кол-во фильмов в выдаче
           :page_number: int Номер страницы выдачи
         Возвращает:
-        Список с фильмами
+        Страницу с телом ответа, id фильмов, их общим числом
+        и курсором следующей страницы
+        """
+        page = await self._popular_films_page(
+            sort, page_size, page_number, genre, None
+        )
+        return render_page(self.list_schema_type, page)
+
+    async def render_films_after_cursor(
+        self,
+        sort: str,
+        page_size: int,
+        genre: Optional[str],
+        cursor: str,
+    ) -> RenderedPage:
         """
+        То же, что render_popular_films, для страницы после курсора.
+        Курсоры почти не повторяются, поэтому такие страницы
+        не кэшируются: каждая читается из ES, в снимке своего обхода.
+        Параметры:
+          :sort: str Поле для сортировки выдачи
+          :genre: str Поле для фильтрации по жанру
+          :page_size: int Кол-во фильмов в выдаче
+          :cursor: str Курсор предыдущей страницы
+        Возвращает:
+        Страницу с телом ответа, id фильмов и курсором следующей страницы
+        """
+        page = await self._popular_films_page(
+            sort, page_size, 1, genre, cursor
+        )
+        return render_page(self.list_schema_type, page)
+
+    async def _popular_films_page(
+        self,
+        sort: str,
+        page_size: int,
+        page_number: int,
+        genre: Optional[str],
+        cursor: Optional[str],
+    ) -> SearchPage:
         params = SortableQueryParams(
             query=genre,
             page_size=page_size,
             page_number=page_number,
             sort=sort,
         )
-        query = query_factory(self.searcher, PopularFilmQuery, params)
-
-        data = await self.searcher.search(self.data_source, query)
-
-        films = [Film(**row) for row in data]
+        query = query_factory(
+            self.searcher, PopularFilmQuery, params, self._list_fields()
+        )
+        return await self.searcher.search_page(
+            self.data_source, query, cursor
+        )
 
-        return films
+    async def export_films(
+        self, sort: str, genre: Optional[str], batch_size: int = 1000
+    ) -> AsyncIterator[List[FilmShort]]:
+        """
+        Функция для выгрузки всех фильмов из ES пачками, без кэша:
+        в памяти одновременно держится только одна пачка
+        Параметры:
+          :sort: str Поле для сортировки выдачи
+          :genre: str Поле для фильтрации по жанру
+          :batch_size: int Кол-во фильмов в пачке
+        Возвращает:
+        Асинхронный генератор списков фильмов
+        """
+        params = SortableQueryParams(
+            query=genre, page_size=batch_size, page_number=1, sort=sort
+        )
+        query = query_factory(
+            self.searcher, PopularFilmQuery, params, self._list_fields()
+        )
 
-    async def get_total_films_count(self) -> int:
-        """Функция возвращает кол-во фильмов в ES"""
-        return await self.get_count()
+        batches = self.searcher.scan(self.data_source, query, batch_size)
+        try:
+            async for rows in batches:
+                yield decode_many(FilmShort, rows)
+        finally:
+            # закрывает PIT и при обрыве выгрузки клиентом
+            await batches.aclose()
 
     def _get_query(
         self, query: str, page_size: int, page_number: int
@@ -59,7 +153,9 @@ class FilmService(BaseService):
             query=query, page_size=page_size, page_number=page_number
         )
 
-        return query_factory(self.searcher, FilmQuery, params)
+        return query_factory(
+            self.searcher, FilmQuery, params, self._list_fields()
+        )
 
 
 @lru_cache
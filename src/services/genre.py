@@ -1,14 +1,16 @@
 import logging
 from functools import lru_cache
-
 from fastapi import Depends
 
+from db.cacher.tags import source_tags
 from db.redis import cache_method
 from db.searcher import IQuery, query_factory, get_search_engine, ISearchEngine
 from db.searcher.query import GenreQuery
 from db.cacher import AbstractCache, get_cacher
 from models.genre import Genre
+from models.page import RenderedPage
 from models.query_params import QueryParams
+from schemas.genre import GenreSchema
 from services.base import BaseService
 
 
@@ -19,11 +21,17 @@ class GenreService(BaseService):
 
     data_source = "genre"
     model_type = Genre
+    list_schema_type = GenreSchema
 
-    @cache_method(cache_attr="cacher")
-    async def get_total_genres_count(self) -> int:
-        """Функция возвращает кол-во жанров в ES"""
-        return await self.get_count()
+    @cache_method(cache_attr="cacher", local_expire=60, tags=source_tags)
+    async def render_search(
+        self, query: str, page_size: int, page_number: int
+    ) -> RenderedPage:
+        """
+        Список жанров почти не меняется и запрашивается постоянно,
+        поэтому дополнительно держится в памяти воркера.
+        """
+        return await self._render_search(query, page_size, page_number)
 
     def _get_query(
         self, query: str, page_size: int, page_number: int
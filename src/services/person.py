@@ -1,21 +1,75 @@
+import asyncio
 import logging
 from functools import lru_cache
-from typing import Dict, List, Any, Optional
+from typing import Dict, Iterable, List, Any, Optional, Set
 
 from fastapi import Depends
 from pydantic import BaseModel
 
+from db.cacher.tags import index_tags, person_tags
 from db.redis import cache_method
-from db.searcher import IQuery, query_factory, ISearchEngine, get_search_engine
-from db.searcher.query import PersonQuery, FilmsByPersonIDQuery
+from db.searcher import (
+    IQuery,
+    query_factory,
+    ISearchEngine,
+    SearchResult,
+    get_search_engine,
+    source_fields,
+)
+from db.searcher.query import (
+    PersonQuery,
+    FilmsByPersonIDQuery,
+    FilmsByPersonIDsQuery,
+)
 from db.cacher import AbstractCache, get_cacher
-from models.film import Film, FilmShort
-from models.person import Person, PersonFilm
-from models.query_params import QueryParams
+from models.decode import decode, decode_many
+from models.film import FilmShort
+from models.person import Person, PersonFilm, PersonPage
+from models.query_params import IdsQueryParams, QueryParams
 from services.base import BaseService
 
 logger = logging.getLogger(__name__)
 
+# фильмов на персону в одном запросе фильмографий
+FILMS_PER_PERSON = 50
+# персон в одном запросе: FILMS_PER_PERSON * PERSONS_PER_QUERY фильмов
+# не выходят за index.max_result_window
+PERSONS_PER_QUERY = 50
+# index.max_result_window по умолчанию: глубже страниц ES не отдаёт
+MAX_RESULT_WINDOW = 10_000
+# поле фильма с персонами -> роль персоны
+PERSON_ROLE_FIELDS = {
+    "actors": "actor",
+    "directors": "director",
+    "writers": "writer",
+}
+
+
+def collect_roles(
+    films: Iterable[Dict[str, Any]],
+    person_ids: Optional[Set[str]] = None,
+    roles: Optional[Dict[str, Dict[str, List[str]]]] = None,
+) -> Dict[str, Dict[str, List[str]]]:
+    """
+    Роли персон в фильмах по документам фильмов (с полями id и
+    PERSON_ROLE_FIELDS): UUID персоны -> UUID фильма -> роли.
+    Учитываются только person_ids, если они переданы;
+    с roles найденное добавляется к ним.
+    """
+    if roles is None:
+        roles = {}
+    for film in films:
+        for field, role in PERSON_ROLE_FIELDS.items():
+            for person in film.get(field) or ():
+                if person_ids is not None and person["id"] not in person_ids:
+                    continue
+                film_roles = roles.setdefault(person["id"], {}).setdefault(
+                    film["id"], []
+                )
+                if role not in film_roles:
+                    film_roles.append(role)
+    return roles
+
 
 class PersonService(BaseService):
     data_source = "person"
@@ -30,30 +84,30 @@ class PersonService(BaseService):
 
         return query_factory(self.searcher, PersonQuery, params)
 
-    @cache_method(cache_attr="cacher")
+    @cache_method(cache_attr="cacher", tags=person_tags, grouped=True)
     async def get_by_id(self, id: str) -> Optional[BaseModel]:
         data = await self.searcher.get(data_source=self.data_source, id=id)
         if not data:
             return None
 
-        enriched = await self._enrich_by_films(data)
-        return self.model_type(**enriched)
+        return await self._make_model(data)
 
-    @cache_method(cache_attr="cacher")
+    @cache_method(cache_attr="cacher", soft_expire=300, tags=person_tags)
     async def search(
         self, query: str, page_size: int, page_number: int
-    ) -> List[BaseModel]:
+    ) -> PersonPage:
         query = self._get_query(query, page_size, page_number)
-        data = await self.searcher.search(self.data_source, query)
+        result = await self.searcher.search(self.data_source, query)
 
-        items = []
-        for row in data:
-            enriched = await self._enrich_by_films(row)
-            items.append(self.model_type(**enriched))
-
-        return items
+        return PersonPage(
+            items=await self._make_models(result.items),
+            total=result.total,
+            total_exact=result.total_exact,
+        )
 
-    @cache_method(cache_attr="cacher")
+    @cache_method(
+        cache_attr="cacher", early_beta=1.0, tags=index_tags("film")
+    )
     async def get_films_by_person_id(
         self, person_id: str, page_size: int = 50, page_number: int = 1
     ) -> List[FilmShort]:
@@ -69,84 +123,113 @@ class PersonService(BaseService):
 
         logger.debug("get_films_by_person_id: %s", person_id)
 
-        person_films = await self._get_films_by_person_id(
-            person_id, page_size, page_number
-        )
-
-        filmshort_list = [
-            FilmShort(uuid=pf.id, title=pf.title, imdb_rating=pf.imdb_rating)
-            for pf in person_films
-        ]
-
-        return filmshort_list
-
-    async def _enrich_by_films(self, obj: Dict[str, Any]) -> Dict[str, Any]:
-        obj["films"] = await self._get_person_films(obj["id"])
-        return obj
-
-    async def _get_films_by_person_id(
-        self, person_id: str, page_size: int = 50, page_number: int = 1
-    ) -> List[Film]:
-        """
-        Функция для поиска в Эластике фильмов по person_id,
-        Параметры:
-          :person_id: str UUID персоны
-          :page_size: int Кол-во фильмов в выдаче
-          :page_number: int Номер страницы выдачи
-        Возвращает: список фильмов с участием запрошенной персоны.
-        """
-
-        logger.debug("_get_films_from_es_by_person_id: %s", person_id)
-
         params = QueryParams(
             query=person_id, page_size=page_size, page_number=page_number
         )
-        query = query_factory(self.searcher, FilmsByPersonIDQuery, params)
+        query = query_factory(
+            self.searcher,
+            FilmsByPersonIDQuery,
+            params,
+            source_fields(FilmShort),
+        )
 
-        data = await self.searcher.search("film", query)
+        result = await self.searcher.search("film", query)
 
-        films = [Film(**row) for row in data]
+        return decode_many(FilmShort, result.items)
 
-        return films
+    async def _make_model(self, data: Dict[str, Any]) -> BaseModel:
+        return (await self._make_models([data]))[0]
 
-    async def _get_person_films(self, person_id: str) -> List[PersonFilm]:
+    async def _make_models(self, rows: List[Dict[str, Any]]) -> List[Person]:
         """
-        Вспомогательная функция для формирования List[PersonFilm]
-          со списком roles в каждом фильме.
+        Собирает персон с фильмографиями. Обычно фильмография уже
+        материализована в документе персоны (jobs.filmographies);
+        для документов без неё фильмы всех таких персон запрашиваются
+        из ES одним запросом.
+        """
+        ids = [row["id"] for row in rows if row.get("films") is None]
+        if ids:
+            logger.debug("%s persons without materialized films", len(ids))
+        filmographies: Dict[str, List[PersonFilm]] = {}
+        for chunk in await asyncio.gather(
+            *(
+                self._get_filmographies(ids[i:i + PERSONS_PER_QUERY])
+                for i in range(0, len(ids), PERSONS_PER_QUERY)
+            )
+        ):
+            filmographies.update(chunk)
+
+        persons = []
+        for row in rows:
+            films = row.get("films")
+            if films is None:
+                films = filmographies.get(row["id"], [])
+            persons.append(decode(self.model_type, {**row, "films": films}))
+        return persons
+
+    async def _get_filmographies(
+        self, person_ids: List[str]
+    ) -> Dict[str, List[PersonFilm]]:
+        """
+        Функция для поиска в Эластике фильмов нескольких персон
+        и их ролей в этих фильмах за один запрос. Из фильмов
+        приходят только id и совпавшие персоны, роли определяет ES.
+        Если фильмов больше, чем на странице, остальные страницы
+        запрашиваются разом.
         Параметры:
-          :person_id: str UUID персоны
-          :person_films: List[Film] список фильмов, полученный
-            из ф-ии _get_films_from_es_by_person_id(person_id)
-        Возвращает: список PersonFilm.
+          :person_ids: List[str] UUID персон
+        Возвращает: словарь UUID персоны -> список PersonFilm.
         """
-
-        person_films = await self._get_films_by_person_id(person_id)
-
-        films = []
-
-        for person_film in person_films:
-
-            roles = set()
-            for pp, role in zip(
-                [
-                    person_film.actors,
-                    person_film.directors,
-                    person_film.writers,
-                ],
-                ["actor", "director", "writer"],
+        logger.debug("_get_filmographies: %s persons", len(person_ids))
+
+        page_size = FILMS_PER_PERSON * len(person_ids)
+        result = await self._search_filmographies(person_ids, page_size, 1)
+        films = list(result.items)
+
+        if result.total is not None and result.total > len(films):
+            pages = min(
+                -(-result.total // page_size),
+                MAX_RESULT_WINDOW // page_size,
+            )
+            for rest in await asyncio.gather(
+                *(
+                    self._search_filmographies(person_ids, page_size, page)
+                    for page in range(2, pages + 1)
+                )
             ):
-                for p in pp:
-                    if str(p.id) == person_id:
-                        roles.add(role)
-
-            films.append(PersonFilm(uuid=person_film.id, roles=roles))
-
-        return films
-
-    @cache_method(cache_attr="cacher")
-    async def get_total_persons_count(self) -> int:
-        """Функция возвращает кол-во персон в ES"""
-        return await self.get_count()
+                films.extend(rest.items)
+            if result.total > len(films):
+                logger.warning(
+                    "Filmographies of %s persons are truncated to %s films",
+                    len(person_ids),
+                    len(films),
+                )
+
+        # фильм, попавший на две страницы, учитывается один раз
+        unique = {film["id"]: film for film in films}
+        roles = collect_roles(unique.values(), set(person_ids))
+
+        return {
+            person_id: [
+                PersonFilm(uuid=film_id, roles=film_roles)
+                for film_id, film_roles in films.items()
+            ]
+            for person_id, films in roles.items()
+        }
+
+    async def _search_filmographies(
+        self, person_ids: List[str], page_size: int, page_number: int
+    ) -> SearchResult:
+        params = IdsQueryParams(
+            ids=person_ids, page_size=page_size, page_number=page_number
+        )
+        query = query_factory(
+            self.searcher,
+            FilmsByPersonIDsQuery,
+            params,
+            ["id"],
+        )
+        return await self.searcher.search("film", query)
 
 
 @lru_cache
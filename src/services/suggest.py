@@ -0,0 +1,93 @@
+import asyncio
+import logging
+from functools import lru_cache
+from typing import List, Type
+
+from fastapi import Depends
+from pydantic import BaseModel
+
+from db.cacher import AbstractCache, get_cacher
+from db.redis import cache_method
+from db.searcher import (
+    IQuery,
+    ISearchEngine,
+    get_search_engine,
+    query_factory,
+    source_fields,
+)
+from db.searcher.query import FilmSuggestQuery, PersonSuggestQuery
+from models.decode import decode_many
+from models.query_params import QueryParams
+from models.suggest import FilmSuggestion, PersonSuggestion, Suggestions
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_prefix(prefix: str) -> str:
+    """
+    Приводит введённый текст к ключу кэша: регистр и лишние пробелы
+    на результат поиска не влияют, такие префиксы делят одну запись.
+    """
+    return " ".join(prefix.lower().split())
+
+
+class SuggestService:
+    """
+    Подсказки для строки поиска по мере набора текста.
+
+    Запросы идут в подполя suggest (edge n-gram) индексов фильмов
+    и персон, за id и названием, без подсчёта общего числа найденных.
+    """
+
+    def __init__(self, cache: AbstractCache, search_engine: ISearchEngine):
+        self.cacher = cache
+        self.searcher = search_engine
+
+    async def suggest(self, prefix: str, size: int) -> Suggestions:
+        """
+        Функция для получения подсказок по началу текста.
+        Параметры:
+          :prefix: str Введённый пользователем текст
+          :size: int Кол-во подсказок каждого вида
+        """
+        return await self._suggest(normalize_prefix(prefix), size)
+
+    # отдельные короткоживущие записи: подсказки устаревают не больше
+    # чем на минуту, поэтому без тегов инвалидации и их записей в Redis
+    @cache_method(cache_attr="cacher", expire=60, local_expire=15)
+    async def _suggest(self, prefix: str, size: int) -> Suggestions:
+        films, persons = await asyncio.gather(
+            self._search(
+                "film", FilmSuggestQuery, FilmSuggestion, prefix, size
+            ),
+            self._search(
+                "person", PersonSuggestQuery, PersonSuggestion, prefix, size
+            ),
+        )
+        return Suggestions(films=films, persons=persons)
+
+    async def _search(
+        self,
+        data_source: str,
+        query_cls: Type[IQuery],
+        model: Type[BaseModel],
+        prefix: str,
+        size: int,
+    ) -> List[BaseModel]:
+        params = QueryParams(query=prefix, page_size=size, page_number=1)
+        query = query_factory(
+            self.searcher, query_cls, params, source_fields(model)
+        )
+        result = await self.searcher.search(data_source, query)
+        return decode_many(model, result.items)
+
+
+@lru_cache
+def get_suggest_service(
+    cacher: AbstractCache = Depends(get_cacher),
+    searcher: ISearchEngine = Depends(get_search_engine),
+) -> SuggestService:
+    """
+    Функция для создания экземпляра класса SuggestService
+    """
+    return SuggestService(cache=cacher, search_engine=searcher)
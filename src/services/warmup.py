@@ -0,0 +1,217 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from db.cacher import AbstractCache
+from db.cacher.keys import key_prefix
+from db.cacher.stats import cache_stats
+from db.redis import force_refresh
+from services.base import BaseService
+from services.film import VALID_SORT_OPT
+
+logger = logging.getLogger(__name__)
+
+# размер страницы по умолчанию в обработчиках списков
+PAGE_SIZE = 50
+# как часто писать в лог о ходе прогрева, в долях от всех вызовов
+PROGRESS_STEP = 0.1
+
+
+class WarmupCall(NamedTuple):
+    """
+    Вызов метода сервиса, результат которого нужно положить в кэш.
+    Аргументы должны совпадать с теми, что передаёт обработчик API,
+    иначе ключ кэша будет другим.
+    """
+
+    service: str
+    method: str
+    args: Tuple[Any, ...] = ()
+
+
+@dataclass
+class WarmupReport:
+    calls: int = 0
+    errors: int = 0
+    seconds: float = 0.0
+
+
+def _pages(total: int, page_size: int = PAGE_SIZE) -> int:
+    return (total + page_size - 1) // page_size
+
+
+def _total(page: Any) -> int:
+    if page is None:
+        return 0
+    return page.total or 0
+
+
+def first_calls() -> List[WarmupCall]:
+    """Первые страницы списков: по ним же узнаётся общее число"""
+    return [
+        WarmupCall(
+            "film",
+            "render_popular_films",
+            (VALID_SORT_OPT[0], PAGE_SIZE, 1, None),
+        ),
+        WarmupCall("genre", "render_search", ("", PAGE_SIZE, 1)),
+    ]
+
+
+def genre_calls(genres_total: int) -> List[WarmupCall]:
+    return [
+        WarmupCall("genre", "render_search", ("", PAGE_SIZE, page))
+        for page in range(2, _pages(genres_total) + 1)
+    ]
+
+
+def film_calls(
+    genre_ids: Sequence[Optional[str]], pages: int
+) -> List[WarmupCall]:
+    return [
+        WarmupCall(
+            "film",
+            "render_popular_films",
+            (sort, PAGE_SIZE, page, genre),
+        )
+        for sort in VALID_SORT_OPT
+        for genre in genre_ids
+        for page in range(1, pages + 1)
+    ]
+
+
+class CacheWarmer:
+    """
+    Заполняет кэш результатами самых частых запросов: списка жанров
+    и первых страниц /v1/films для каждой сортировки и каждого жанра.
+
+    Вызовы идут через методы сервисов, поэтому значения попадают
+    в кэш под теми же ключами, что и при обычных запросах. Одновременно
+    выполняется не больше concurrency вызовов.
+    """
+
+    def __init__(
+        self,
+        services: Dict[str, BaseService],
+        cache: AbstractCache,
+        pages: int = 3,
+        concurrency: int = 4,
+    ) -> None:
+        """
+        :param services: сервисы по именам, используемым в WarmupCall
+        :param cache: кэш, через аренду в котором воркеры договариваются,
+            кто прогревает кэш
+        :param pages: сколько первых страниц фильмов прогревать
+        :param concurrency: максимум одновременных запросов к ES
+        """
+        self.services = services
+        self.cache = cache
+        self.pages = pages
+        self.concurrency = concurrency
+
+    async def warm(self, force: bool = False) -> WarmupReport:
+        """
+        Прогревает кэш по плану горячих запросов.
+        С force=True значения пересчитываются, даже если они есть в кэше.
+        """
+        report = WarmupReport()
+        started = time.monotonic()
+        token = force_refresh.set(force)
+        try:
+            first = first_calls()
+            film_page, genre_page = await self.execute(first, report)
+            genre_pages = [genre_page] + await self.execute(
+                genre_calls(_total(genre_page)), report
+            )
+            genre_ids = [None] + [
+                genre_id
+                for page in genre_pages
+                if page is not None
+                for genre_id in page.ids
+            ]
+            pages = min(self.pages, _pages(_total(film_page)))
+            await self.execute(
+                [
+                    call
+                    for call in film_calls(genre_ids, pages)
+                    if call not in first
+                ],
+                report,
+            )
+        finally:
+            force_refresh.reset(token)
+
+        report.seconds = time.monotonic() - started
+        cache_stats.incr("warmup_runs")
+        cache_stats.set("warmup_last_seconds", report.seconds)
+        logger.info(
+            "Cache warmup finished: %d calls, %d errors in %.1fs",
+            report.calls,
+            report.errors,
+            report.seconds,
+        )
+        return report
+
+    async def execute(
+        self, calls: List[WarmupCall], report: WarmupReport
+    ) -> List[Any]:
+        """
+        Выполняет вызовы с ограничением параллельности.
+        Возвращает результаты в порядке calls, None для упавших вызовов.
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+        step = max(1, int(len(calls) * PROGRESS_STEP))
+        done = 0
+
+        async def run(call: WarmupCall) -> Any:
+            nonlocal done
+            async with semaphore:
+                method = getattr(self.services[call.service], call.method)
+                try:
+                    return await method(*call.args)
+                except Exception as ex:
+                    report.errors += 1
+                    cache_stats.incr("warmup_errors")
+                    logger.error("Cache warmup of %s failed: %s", call, ex)
+                    return None
+                finally:
+                    report.calls += 1
+                    cache_stats.incr("warmup_calls")
+                    done += 1
+                    if done % step == 0 or done == len(calls):
+                        logger.info(
+                            "Cache warmup progress: %d/%d", done, len(calls)
+                        )
+
+        return await asyncio.gather(*(run(call) for call in calls))
+
+    async def run_forever(self, interval: int) -> None:
+        """
+        Прогревает кэш при старте и затем каждые interval секунд
+        (interval 0 - только при старте).
+
+        Из нескольких воркеров прогрев за интервал выполняет один:
+        тот, кто взял аренду в кэше. Аренда не снимается и истекает
+        сама через interval секунд.
+        """
+        force = False
+        while True:
+            if await self._acquire(interval):
+                try:
+                    await self.warm(force=force)
+                except Exception as ex:
+                    logger.error("Cache warmup failed: %s", ex)
+            if not interval:
+                return
+            force = True
+            await asyncio.sleep(interval)
+
+    async def _acquire(self, interval: int) -> bool:
+        if not hasattr(self.cache, "acquire_lease"):
+            return True
+        lease = await self.cache.acquire_lease(
+            f"{key_prefix()}:warmup", max(interval, 60)
+        )
+        return lease is not None
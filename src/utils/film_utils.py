@@ -1,23 +1,20 @@
-from typing import List
+from typing import Optional
 from http import HTTPStatus
 
 from fastapi import HTTPException
 
-from schemas.film import FilmSchema
 
-
-async def get_response_list(lst: List) -> List:
+def validate_page_number(
+    page_number: int, page_size: int, total: Optional[int]
+) -> None:
     """
-    Формирует список ответов на основе входного списка объектов.
+    Проверяет номер страницы по общему числу найденных документов.
+    Первая страница допустима и при пустой выдаче,
+    total=None (число не считалось) не проверяется.
     """
-    resp_list = [
-        FilmSchema(uuid=hit.id, title=hit.title, imdb_rating=hit.imdb_rating)
-        for hit in lst
-    ]
-    return resp_list
-
-
-def validate_page_number(page_number: int, max_pages: int) -> None:
+    if total is None:
+        return
+    max_pages = max(1, (total + page_size - 1) // page_size)
     if page_number > max_pages:
         raise HTTPException(
             status_code=HTTPStatus.BAD_REQUEST,
@@ -0,0 +1,91 @@
+"""
+Рендеринг списков выдачи прямо из документов ES в тело ответа API.
+
+Элемент ответа - схема из schemas, её поля берутся из одноимённых
+полей документа, uuid - из id. В доверенном режиме models.decode
+тело собирается orjson без pydantic; в строгом каждый элемент
+проходит валидацию схемы, так что тесты проверяют соответствие
+документов response_model обработчиков.
+"""
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Type
+
+import orjson
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter
+
+from db.searcher import SearchResult
+from models import decode
+from models.page import RenderedPage
+
+# поле схемы -> поле документа ES
+SOURCE_KEYS = {"uuid": "id"}
+
+
+def render_list(
+    schema: Type[BaseModel], rows: Iterable[Dict[str, Any]]
+) -> bytes:
+    """JSON-массив элементов schema из документов rows"""
+    fields = _fields(schema)
+    if decode.trusted:
+        return orjson.dumps(
+            [
+                {
+                    name: _float(row.get(key)) if is_float else row.get(key)
+                    for name, key, is_float in fields
+                }
+                for row in rows
+            ]
+        )
+    adapter = _list_adapter(schema)
+    items = [{name: row.get(key) for name, key, _ in fields} for row in rows]
+    return adapter.dump_json(adapter.validate_python(items))
+
+
+def render_page(
+    schema: Type[BaseModel], result: SearchResult
+) -> RenderedPage:
+    """Страница выдачи поиска, отрендеренная схемой schema"""
+    return RenderedPage(
+        body=render_list(schema, result.items),
+        ids=[row["id"] for row in result.items],
+        total=result.total,
+        total_exact=result.total_exact,
+        next_cursor=getattr(result, "next_cursor", None),
+    )
+
+
+def json_response(body: bytes) -> Response:
+    """
+    Ответ с уже отрендеренным телом: FastAPI отдаёт его как есть,
+    без проверки по response_model и сериализации.
+    """
+    return Response(content=body, media_type="application/json")
+
+
+def source_keys(schema: Type[BaseModel]) -> List[str]:
+    """Поля документа, нужные для рендеринга schema"""
+    return [key for _, key, _ in _fields(schema)]
+
+
+@lru_cache(maxsize=None)
+def _fields(schema: Type[BaseModel]) -> Tuple[Tuple[str, str, bool], ...]:
+    # (поле схемы, поле документа, число с плавающей точкой)
+    return tuple(
+        (
+            name,
+            SOURCE_KEYS.get(name, name),
+            field.annotation in (float, Optional[float]),
+        )
+        for name, field in schema.model_fields.items()
+    )
+
+
+def _float(value: Any) -> Any:
+    # в документах встречаются целые рейтинги: 7, а не 7.0, как у pydantic
+    return value if value is None else float(value)
+
+
+@lru_cache(maxsize=None)
+def _list_adapter(schema: Type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(List[schema])
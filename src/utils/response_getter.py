@@ -1,3 +1,4 @@
+import json
 from typing import Dict
 
 film_list_example = [
@@ -19,6 +20,13 @@ def get_film_list_response() -> Dict[int, Dict]:
         200: {
             "description": "Успешный ответ, возвращает список фильмов.",
             "content": {"application/json": {"example": film_list_example}},
+            "headers": {
+                "X-Next-Cursor": {
+                    "description": "Курсор следующей страницы для "
+                    "параметра cursor, нет на последней странице",
+                    "schema": {"type": "string"},
+                }
+            },
         },
         400: {
             "description": "Неверный запрос. Например, если указана \
@@ -252,3 +260,56 @@ def genres_by_id_response() -> Dict[int, Dict]:
             },
         },
     }
+
+
+def suggest_response() -> Dict[int, Dict]:
+    return {
+        200: {
+            "description": "Подсказки успешно получены, списки могут "
+            "быть пустыми",
+            "content": {
+                "application/json": {
+                    "example": {
+                        "films": [
+                            {
+                                "uuid": "123e4567-e89b-12d3-a456-"
+                                "426614174000",
+                                "title": "Star Wars",
+                            }
+                        ],
+                        "persons": [
+                            {
+                                "uuid": "123e4567-e89b-12d3-a456-"
+                                "426614174001",
+                                "full_name": "Steven Spielberg",
+                            }
+                        ],
+                    }
+                }
+            },
+        },
+    }
+
+
+def export_films_response() -> Dict[int, Dict]:
+    return {
+        200: {
+            "description": "Фильмы в формате NDJSON, по одному в строке",
+            "content": {
+                "application/x-ndjson": {
+                    "example": "".join(
+                        f"{json.dumps(film, ensure_ascii=False)}\n"
+                        for film in film_list_example
+                    )
+                }
+            },
+        },
+        400: {
+            "description": "Недопустимое поле сортировки",
+            "content": {
+                "application/json": {
+                    "example": {"detail": "Недопустимое поле: rating"}
+                }
+            },
+        },
+    }
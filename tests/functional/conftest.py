@@ -5,7 +5,8 @@ from uuid import uuid4
 import aiohttp
 import pytest_asyncio
 from elasticsearch import AsyncElasticsearch
-from redis.asyncio import Redis
+from redis.asyncio import Redis, RedisCluster
+from redis.asyncio.cluster import ClusterNode
 
 from tests.functional.settings import test_settings
 from models.film import FilmShort
@@ -84,6 +85,31 @@ async def redis_client() -> AsyncGenerator[Redis, None]:
         await client.aclose()
 
 
+@pytest_asyncio.fixture(name="redis_cluster_client", scope="session")
+async def redis_cluster_client() -> AsyncGenerator[RedisCluster, None]:
+    """
+    Фикстура, создающая клиент Redis Cluster.
+
+    Узлы кластера объявляют адрес 0.0.0.0, поэтому адреса, которые
+    возвращает кластер, подменяются на адрес контейнера с кластером.
+
+    Возвращает:
+        AsyncGenerator[RedisCluster, None]: Асинхронный генератор,
+        который предоставляет клиент Redis Cluster.
+    """
+    host = (
+        "localhost"
+        if test_settings.SERVICE_URL == "http://localhost:8000"
+        else test_settings.REDIS_CLUSTER_HOST
+    )
+    client = RedisCluster(
+        startup_nodes=[ClusterNode(host, test_settings.REDIS_CLUSTER_PORT)],
+        address_remap=lambda address: (host, address[1]),
+    )
+    yield client
+    await client.aclose()
+
+
 @pytest_asyncio.fixture(name="make_get_request")
 def make_get_request(
     aiohttp_client: aiohttp.ClientSession,
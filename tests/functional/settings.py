@@ -17,5 +17,8 @@ class TestSettings(BaseSettings):
     REDIS_HOST: str = "redis"
     REDIS_PORT: int = 6379
 
+    REDIS_CLUSTER_HOST: str = "redis-cluster"
+    REDIS_CLUSTER_PORT: int = 7000
+
 
 test_settings = TestSettings()
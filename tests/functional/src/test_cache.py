@@ -0,0 +1,176 @@
+import time
+from http import HTTPStatus
+from uuid import uuid4
+
+import jwt
+import pytest
+from aiohttp import ClientSession
+from elasticsearch import AsyncElasticsearch
+from redis.asyncio import Redis, RedisCluster
+
+from db.redis import RedisCache, form_key, invalidate_documents
+from db.searcher.elastic_searcher import ElasticSearchEngine
+from models.genre import Genre
+from services.auth import PermissionChecker
+from services.genre import GenreService
+from tests.functional.settings import test_settings
+
+
+@pytest.mark.asyncio
+async def test_invalidate_documents(redis_client: Redis):
+    """
+    Тестирует удаление из кэша записей, построенных из изменённого документа.
+
+    Проверяет, что удаляются все записи с тегом документа,
+    а записи других документов остаются в кэше.
+    """
+    cache = RedisCache(redis_client)
+    genre_id, other_id = str(uuid4()), str(uuid4())
+
+    by_id_key = form_key("GenreService.get_by_id", (genre_id,), {})
+    list_key = form_key(
+        "GenreService.render_search", ("", 50, 1), {"test": genre_id}
+    )
+    other_key = form_key("GenreService.get_by_id", (other_id,), {})
+
+    genre = Genre(id=genre_id, name="CACHE")
+    other = Genre(id=other_id, name="OTHER")
+
+    await cache.set(by_id_key, genre, 60)
+    await cache.add_tags(by_id_key, [("genre", genre_id)], 60)
+    await cache.set(list_key, [genre, other], 60)
+    await cache.add_tags(
+        list_key, [("genre", genre_id), ("genre", other_id)], 60
+    )
+    await cache.set(other_key, other, 60)
+    await cache.add_tags(other_key, [("genre", other_id)], 60)
+
+    evicted = await invalidate_documents(cache, "genre", [genre_id])
+
+    assert set(evicted) == {by_id_key, list_key}
+    assert await cache.get(by_id_key) is None
+    assert await cache.get(list_key) is None
+    assert await cache.get(other_key) == other
+
+    await invalidate_documents(cache, "genre", [other_id])
+    assert await cache.get(other_key) is None
+
+
+@pytest.mark.asyncio
+async def test_cluster_cache(redis_cluster_client: RedisCluster):
+    """
+    Тестирует работу кэша поверх Redis Cluster.
+
+    Проверяет запись и чтение, пакетное чтение ключей одной группы
+    и ключей из разных слотов, а также инвалидацию по тегам,
+    множества которых лежат в разных слотах.
+    """
+    cache = RedisCache(redis_cluster_client)
+    genres = [Genre(id=str(uuid4()), name=f"CLUSTER {i}") for i in range(5)]
+
+    grouped_keys = [
+        form_key("GenreService.get_by_id", (str(g.id),), {}, grouped=True)
+        for g in genres
+    ]
+    plain_keys = [
+        form_key("GenreService.get_by_id", (str(g.id),), {}) for g in genres
+    ]
+
+    for key, plain_key, genre in zip(grouped_keys, plain_keys, genres):
+        await cache.set(key, genre, 60)
+        await cache.set(plain_key, genre, 60)
+        await cache.add_tags(key, [("genre", str(genre.id))], 60)
+        await cache.add_tags(plain_key, [("genre", str(genre.id))], 60)
+
+    missing_key = form_key("GenreService.get_by_id", ("missing",), {})
+
+    assert await cache.get(grouped_keys[0]) == genres[0]
+    assert await cache.get_many(grouped_keys) == genres
+    assert await cache.get_many([*plain_keys, missing_key]) == [*genres, None]
+
+    evicted = await invalidate_documents(
+        cache, "genre", [str(g.id) for g in genres]
+    )
+
+    assert set(evicted) == {*grouped_keys, *plain_keys}
+    assert await cache.get_many(grouped_keys) == [None] * len(genres)
+
+
+@pytest.mark.asyncio
+async def test_get_many_by_ids(
+    redis_client: Redis, es_client: AsyncElasticsearch
+):
+    """
+    Тестирует пакетное получение объектов по списку id.
+
+    Проверяет, что порядок ответа совпадает с порядком id,
+    ненайденные id возвращаются как None, значения из кэша get_by_id
+    не запрашиваются в ES, а полученные из ES кладутся в кэш get_by_id.
+    """
+    cache = RedisCache(redis_client)
+    service = GenreService(
+        cache=cache, search_engine=ElasticSearchEngine(es_client)
+    )
+    cached_id = str(uuid4())
+    es_id = "3d8d9bf5-0d90-4353-88ba-4ccc5d2c07ff"
+    missing_id = str(uuid4())
+
+    cached_key = form_key(
+        "GenreService.get_by_id", (cached_id,), {}, grouped=True
+    )
+    es_key = form_key("GenreService.get_by_id", (es_id,), {}, grouped=True)
+    await cache.set(cached_key, Genre(id=cached_id, name="CACHED"), 60)
+    await redis_client.delete(es_key)
+
+    genres = await service.get_many_by_ids([es_id, missing_id, cached_id])
+
+    assert [genre and genre.name for genre in genres] == [
+        "Action",
+        None,
+        "CACHED",
+    ]
+    assert await cache.get(es_key) == genres[0]
+
+    await redis_client.delete(cached_key, es_key)
+
+
+@pytest.mark.asyncio
+async def test_cache_endpoints_reject_user_token(
+    redis_client: Redis, aiohttp_client: ClientSession
+):
+    """
+    Тестирует доступ к служебным эндпоинтам кэша.
+
+    Проверяет, что токен с ролью USER, уже прошедший проверку
+    на пользовательских эндпоинтах (её результат лежит в кэше),
+    получает 403 на /v1/cache/*.
+    """
+    now = time.time()
+    token = jwt.encode(
+        {
+            "jti": str(uuid4()),
+            "user_id": str(uuid4()),
+            "iat": now,
+            "exp": now + 60,
+            "role": "USER",
+        },
+        "secret",
+        algorithm="HS256",
+    )
+    user_key = str(PermissionChecker) + ":USER:" + token
+    await RedisCache(redis_client).set(user_key, True, 60)
+
+    url = test_settings.SERVICE_URL + "/api/v1/cache"
+    cookies = {"access_token": token}
+    try:
+        response = await aiohttp_client.get(url + "/stats", cookies=cookies)
+        assert response.status == HTTPStatus.FORBIDDEN
+
+        response = await aiohttp_client.post(
+            url + "/invalidate",
+            json={"index": "genre", "ids": [str(uuid4())]},
+            cookies=cookies,
+        )
+        assert response.status == HTTPStatus.FORBIDDEN
+    finally:
+        await redis_client.delete(user_key)
@@ -0,0 +1,108 @@
+import pathlib
+from http import HTTPStatus
+from typing import Any, Dict
+
+import pytest
+from aiohttp import ClientSession
+from fastapi.routing import APIRoute
+from pydantic import TypeAdapter
+
+from api.v1 import films, genres
+from db.cacher.local import LocalCache
+from db.searcher.memory_searcher import InMemorySearchEngine
+from models import decode
+from services.film import FilmService
+from services.genre import GenreService
+from tests.functional.settings import test_settings
+
+TEST_DUMP_DIR = pathlib.Path(__file__).resolve().parent.parent / "test_dump"
+
+# обработчики, отдающие тело ответа, отрендеренное сервисом
+RENDERED_ROUTES = [
+    ("/v1/films/", "?sort=-imdb_rating"),
+    ("/v1/films/search", "?query=star"),
+    ("/v1/genres/", ""),
+]
+
+
+def response_schema(openapi: Dict[str, Any], path: str) -> Dict[str, Any]:
+    content = openapi["paths"][path]["get"]["responses"]["200"]["content"]
+    schema = content["application/json"]["schema"]
+    assert schema["type"] == "array"
+    name = schema["items"]["$ref"].rsplit("/", 1)[-1]
+    return openapi["components"]["schemas"][name]
+
+
+@pytest.mark.parametrize("path, query", RENDERED_ROUTES)
+@pytest.mark.asyncio
+async def test_rendered_response_matches_openapi(
+    aiohttp_client: ClientSession, path: str, query: str
+):
+    """
+    Тестирует, что тела ответов, которые сервисы рендерят сами,
+    минуя response_model, совпадают со схемой ответа в OpenAPI:
+    у каждого элемента ровно поля схемы и все обязательные на месте.
+    """
+    url = test_settings.SERVICE_URL + "/api/openapi.json"
+    response = await aiohttp_client.get(url)
+    openapi = await response.json()
+    schema = response_schema(openapi, path)
+
+    url = test_settings.SERVICE_URL + "/api" + path + query
+    response = await aiohttp_client.get(url)
+    body = await response.json()
+
+    assert response.status == HTTPStatus.OK
+    assert response.content_type == "application/json"
+
+    assert body
+    for item in body:
+        assert set(item) == set(schema["properties"])
+        assert set(schema.get("required", [])) <= set(item)
+
+
+def route_model(router: Any, path: str) -> Any:
+    for route in router.routes:
+        if isinstance(route, APIRoute) and route.path == path:
+            return route.response_model
+    raise LookupError(path)
+
+
+@pytest.mark.asyncio
+async def test_trusted_render_matches_response_model():
+    """
+    Тестирует быстрый рендеринг (режим trusted): тело совпадает
+    байт в байт с сериализацией response_model обработчика.
+    """
+    engine = InMemorySearchEngine.from_dump(
+        TEST_DUMP_DIR, dump_name="test_{index}_dump.json"
+    )
+    film_service = FilmService(LocalCache(100, 2**24, 60), engine)
+    genre_service = GenreService(LocalCache(100, 2**24, 60), engine)
+
+    decode.trusted = True
+    try:
+        pages = [
+            (
+                route_model(films.router, "/"),
+                await film_service.render_popular_films(
+                    "-imdb_rating", 50, 1, None
+                ),
+            ),
+            (
+                route_model(films.router, "/search"),
+                await film_service.render_search("star", 50, 1),
+            ),
+            (
+                route_model(genres.router, "/"),
+                await genre_service.render_search("", 50, 1),
+            ),
+        ]
+    finally:
+        decode.trusted = False
+
+    for model, page in pages:
+        adapter = TypeAdapter(model)
+        items = adapter.validate_json(page.body)
+        assert items
+        assert adapter.dump_json(items) == page.body
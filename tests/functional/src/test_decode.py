@@ -0,0 +1,68 @@
+import pathlib
+from typing import Any, Dict, List
+
+import orjson
+import pytest
+from pydantic import ValidationError
+
+from models import decode
+from models.film import Film, FilmShort
+from models.genre import Genre
+from models.person import Person
+
+TEST_DUMP_DIR = pathlib.Path(__file__).resolve().parent.parent / "test_dump"
+
+
+def load_dump(index: str) -> List[Dict[str, Any]]:
+    path = TEST_DUMP_DIR / f"test_{index}_dump.json"
+    with open(path, "rb") as f_in:
+        return [orjson.loads(line)["_source"] for line in f_in]
+
+
+def decode_many(model, rows, trusted):
+    decode.trusted = trusted
+    try:
+        return decode.decode_many(model, rows)
+    finally:
+        decode.trusted = False
+
+
+@pytest.mark.parametrize(
+    "model, index",
+    [
+        (Film, "film"),
+        (FilmShort, "film"),
+        (Genre, "genre"),
+        (Person, "person"),
+    ],
+)
+def test_trusted_decode_matches_strict(model, index):
+    """
+    Тестирует сборку моделей без валидации (режим trusted, в котором
+    работает сервис): модели из документов тестовых дампов совпадают
+    с проверенными pydantic в строгом режиме, вместе с сериализацией.
+    """
+    rows = load_dump(index)
+    if model is Person:
+        rows = [{**row, "films": []} for row in rows]
+
+    strict = decode_many(model, rows, trusted=False)
+    trusted = decode_many(model, rows, trusted=True)
+
+    assert strict
+    assert trusted == strict
+    assert [m.model_dump_json() for m in trusted] == [
+        m.model_dump_json() for m in strict
+    ]
+
+
+@pytest.mark.parametrize("trusted", [False, True])
+def test_decode_missing_required_field(trusted):
+    """
+    Тестирует документ без обязательного поля: в обоих режимах
+    сборка падает с ValidationError, а не отдаёт неполную модель.
+    """
+    row = {"title": "No id"}
+
+    with pytest.raises(ValidationError):
+        decode_many(FilmShort, [row], trusted)
@@ -1,4 +1,4 @@
-import pickle
+import json
 from http import HTTPStatus
 from typing import Any, Callable, Dict
 from urllib.parse import urlencode
@@ -6,7 +6,7 @@ from uuid import uuid4
 
 import pytest
 from aiohttp import ClientResponse
-from db.redis import form_key
+from db.redis import form_key, RedisCache
 from models.film import Film
 from redis.asyncio import Redis
 from tests.functional.settings import test_settings
@@ -154,6 +154,44 @@ async def test_list_films_with_pages(
     assert len(body) == exp_answer.get("body_len")
 
 
+@pytest.mark.parametrize(
+    "query_data, exp_answer",
+    [
+        (
+            {"page_size": 2, "page_number": 2},
+            {"status": HTTPStatus.OK, "body_len": 1},
+        ),
+        (
+            {"page_size": 2, "page_number": 3},
+            {"status": HTTPStatus.BAD_REQUEST, "body_len": 1},
+        ),
+    ],
+)
+@pytest.mark.asyncio
+async def test_list_films_pages_by_genre(
+    make_get_request: Callable[[str, str], ClientResponse],
+    query_data: Dict[str, Any],
+    exp_answer: Dict[str, Any],
+):
+    """
+    Тестирует пагинацию списка фильмов с фильтром по жанру.
+
+    Проверяет, что число страниц считается по фильмам жанра
+    (3 из 6 фильмов), а не по всему индексу.
+    """
+    genre_id = "3d8d9bf5-0d90-4353-88ba-4ccc5d2c07ff"
+    query_parameters = f"?{urlencode({'genre_id': genre_id, **query_data})}"
+
+    response = await make_get_request(
+        test_settings.ES_FILM_IDX, query_parameters
+    )
+
+    body = await response.json()
+
+    assert response.status == exp_answer.get("status")
+    assert len(body) == exp_answer.get("body_len")
+
+
 @pytest.mark.parametrize(
     "query_data, exp_answer",
     [
@@ -232,6 +270,81 @@ async def test_list_films_with_sort_and_filter(
     assert first_film.get("uuid") == exp_answer.get("film_id")
 
 
+@pytest.mark.asyncio
+async def test_list_films_cursor_pagination(
+    make_get_request: Callable[[str, str], ClientResponse],
+):
+    """
+    Тестирует пагинацию списка фильмов по курсору.
+
+    Проверяет, что обход по курсорам из заголовка X-Next-Cursor выдаёт
+    те же фильмы, что и обход по номерам страниц, без повторов,
+    обход заканчивается страницей без курсора,
+    а курсор, выданный для другой сортировки, отклоняется.
+    """
+    by_number = []
+    for page_number in range(1, 7):
+        query = {"page_size": 1, "page_number": page_number}
+        response = await make_get_request(
+            test_settings.ES_FILM_IDX, f"?{urlencode(query)}"
+        )
+        by_number.extend(film["uuid"] for film in await response.json())
+
+    by_cursor = []
+    params: Dict[str, Any] = {"page_size": 1}
+    while True:
+        response = await make_get_request(
+            test_settings.ES_FILM_IDX, f"?{urlencode(params)}"
+        )
+        assert response.status == HTTPStatus.OK
+        films = await response.json()
+        by_cursor.extend(film["uuid"] for film in films)
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+        params["cursor"] = cursor
+
+    assert by_cursor == by_number
+    assert len(set(by_cursor)) == len(by_cursor)
+
+    params["sort"] = "title"
+    response = await make_get_request(
+        test_settings.ES_FILM_IDX, f"?{urlencode(params)}"
+    )
+    assert response.status == HTTPStatus.BAD_REQUEST
+
+
+@pytest.mark.asyncio
+async def test_export_films(
+    make_get_request: Callable[[str, str], ClientResponse],
+):
+    """
+    Тестирует выгрузку фильмов в NDJSON.
+
+    Проверяет, что выгрузка отдаёт все фильмы по одному в строке
+    в порядке списка фильмов с той же сортировкой,
+    а недопустимая сортировка отклоняется до начала выгрузки.
+    """
+    query = {"sort": "title", "page_size": 50}
+    response = await make_get_request(
+        test_settings.ES_FILM_IDX, f"?{urlencode(query)}"
+    )
+    expected = [film["uuid"] for film in await response.json()]
+
+    response = await make_get_request(
+        test_settings.ES_FILM_IDX, "export?sort=title"
+    )
+    assert response.status == HTTPStatus.OK
+    assert response.content_type == "application/x-ndjson"
+    lines = (await response.text()).splitlines()
+    assert [json.loads(line)["uuid"] for line in lines] == expected
+
+    response = await make_get_request(
+        test_settings.ES_FILM_IDX, "export?sort=rating"
+    )
+    assert response.status == HTTPStatus.BAD_REQUEST
+
+
 @pytest.mark.asyncio
 async def test_cache_film_by_id(
     make_get_request: Callable[[str, str], ClientResponse], redis_client: Redis
@@ -247,7 +360,9 @@ async def test_cache_film_by_id(
     и что кэш очищается после запроса.
     """
     film_id = str(uuid4())
-    key = form_key("get_by_id", (film_id,), {})
+    key = form_key(
+        "FilmService.get_by_id", (film_id,), {}, grouped=True
+    )
     test_film_data = Film(
         id=film_id,
         title="CACHE",
@@ -257,7 +372,7 @@ async def test_cache_film_by_id(
         genres=[],
     )
 
-    await redis_client.set(key, pickle.dumps(test_film_data), ex=60)
+    await RedisCache(redis_client).set(key, test_film_data, 60)
 
     response = await make_get_request(test_settings.ES_FILM_IDX, film_id)
     body = await response.json()
@@ -4,7 +4,7 @@ from typing import Dict
 from uuid import uuid4
 
 import pytest
-from db.redis import form_key
+from db.redis import form_key, RedisCache
 from models.genre import Genre
 from tests.functional.settings import test_settings
 
@@ -106,10 +106,12 @@ async def test_list_genres_with_pages(
 async def test_cache_genre_by_id(redis_client, make_get_request):
 
     genre_id = str(uuid4())
-    key = form_key("get_by_id", (genre_id,), {})
+    key = form_key(
+        "GenreService.get_by_id", (genre_id,), {}, grouped=True
+    )
     test_genre_data = Genre(id=genre_id, name="CACHE")
 
-    await redis_client.set(key, pickle.dumps(test_genre_data), ex=60)
+    await RedisCache(redis_client).set(key, test_genre_data, 60)
 
     response = await make_get_request(test_settings.ES_GENRE_IDX, genre_id)
     body = await response.json()
@@ -122,3 +124,23 @@ async def test_cache_genre_by_id(redis_client, make_get_request):
 
     response = await make_get_request(test_settings.ES_GENRE_IDX, genre_id)
     assert response.status == HTTPStatus.NOT_FOUND
+
+
+@pytest.mark.asyncio
+async def test_legacy_pickle_entry_is_miss(redis_client, make_get_request):
+
+    genre_id = "3d8d9bf5-0d90-4353-88ba-4ccc5d2c07ff"
+    key = form_key(
+        "GenreService.get_by_id", (genre_id,), {}, grouped=True
+    )
+    legacy_data = Genre(id=genre_id, name="LEGACY")
+
+    await redis_client.set(key, pickle.dumps(legacy_data), ex=60)
+
+    response = await make_get_request(test_settings.ES_GENRE_IDX, genre_id)
+    body = await response.json()
+
+    assert response.status == HTTPStatus.OK
+    assert body["name"] == "Action"
+
+    await redis_client.delete(key)
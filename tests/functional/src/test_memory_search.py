@@ -0,0 +1,149 @@
+import pathlib
+from typing import Type
+
+import pytest
+from elasticsearch import AsyncElasticsearch
+
+from db.searcher import IQuery, query_factory
+from db.searcher.elastic_searcher import ElasticSearchEngine
+from db.searcher.memory_searcher import InMemorySearchEngine
+from db.searcher.query import (
+    FilmQuery,
+    FilmsByPersonIDQuery,
+    FilmsByPersonIDsQuery,
+    FilmSuggestQuery,
+    GenreQuery,
+    PersonQuery,
+    PersonSuggestQuery,
+    PopularFilmQuery,
+)
+from models.query_params import (
+    IdsQueryParams,
+    QueryParams,
+    SortableQueryParams,
+)
+
+TEST_DUMP_DIR = pathlib.Path(__file__).resolve().parent.parent / "test_dump"
+
+
+def params(query=None, page_size=50, page_number=1, sort=None):
+    if sort is None:
+        return QueryParams(
+            query=query, page_size=page_size, page_number=page_number
+        )
+    return SortableQueryParams(
+        query=query, page_size=page_size, page_number=page_number, sort=sort
+    )
+
+
+@pytest.mark.parametrize(
+    "index, query_cls, query_params, ordered",
+    [
+        ("film", FilmQuery, params("Star"), False),
+        ("film", FilmQuery, params("wars hope"), False),
+        ("film", FilmQuery, params("UNEXISTS"), False),
+        ("film", PopularFilmQuery, params(sort="-imdb_rating"), True),
+        ("film", PopularFilmQuery, params(sort="title"), True),
+        ("film", PopularFilmQuery, params(sort="-creation_date"), True),
+        (
+            "film",
+            PopularFilmQuery,
+            params(
+                "3d8d9bf5-0d90-4353-88ba-4ccc5d2c07ff",
+                page_size=2,
+                page_number=2,
+                sort="imdb_rating",
+            ),
+            True,
+        ),
+        (
+            "film",
+            FilmsByPersonIDQuery,
+            params("a5a8f573-3cee-4ccc-8a2b-91cb9f55250a"),
+            False,
+        ),
+        ("genre", GenreQuery, params(), False),
+        ("person", PersonQuery, params("george"), False),
+        ("person", PersonQuery, params("Endô"), False),
+        ("film", FilmSuggestQuery, params("star wa", page_size=5), False),
+        ("person", PersonSuggestQuery, params("geo", page_size=5), False),
+    ],
+)
+@pytest.mark.asyncio
+async def test_memory_search_matches_elastic(
+    es_client: AsyncElasticsearch,
+    index: str,
+    query_cls: Type[IQuery],
+    query_params: QueryParams,
+    ordered: bool,
+):
+    """
+    Тестирует, что поиск в памяти по тестовому дампу находит те же
+    документы, что и Elasticsearch с этими данными.
+
+    Для отсортированных запросов сравнивается порядок, для остальных -
+    набор документов страницы и общее число найденных.
+    """
+    memory = InMemorySearchEngine.from_dump(
+        TEST_DUMP_DIR, dump_name="test_{index}_dump.json"
+    )
+    elastic = ElasticSearchEngine(es_client)
+
+    expected = await elastic.search(
+        index, query_factory(elastic, query_cls, query_params, ["id"])
+    )
+    result = await memory.search(
+        index, query_factory(memory, query_cls, query_params, ["id"])
+    )
+
+    expected_ids = [doc["id"] for doc in expected.items]
+    result_ids = [doc["id"] for doc in result.items]
+    if not ordered:
+        expected_ids, result_ids = set(expected_ids), set(result_ids)
+
+    assert result_ids == expected_ids
+    assert result.total == expected.total
+
+
+@pytest.mark.asyncio
+async def test_memory_filmographies_match_elastic(
+    es_client: AsyncElasticsearch,
+):
+    """
+    Тестирует, что фильмы нескольких персон в поиске в памяти
+    совпадают с Elasticsearch вместе с персонами в полях ролей:
+    ES определяет их по inner_hits, без полных составов фильмов.
+    """
+    memory = InMemorySearchEngine.from_dump(
+        TEST_DUMP_DIR, dump_name="test_{index}_dump.json"
+    )
+    elastic = ElasticSearchEngine(es_client)
+    query_params = IdsQueryParams(
+        ids=[
+            "a5a8f573-3cee-4ccc-8a2b-91cb9f55250a",
+            "26e83050-29ef-4163-a99d-b546cac208f8",
+        ],
+        page_size=100,
+        page_number=1,
+    )
+
+    def films(result):
+        return {
+            doc["id"]: {
+                field: sorted(person["id"] for person in doc[field])
+                for field in ("actors", "directors", "writers")
+            }
+            for doc in result.items
+        }
+
+    expected = await elastic.search(
+        "film",
+        query_factory(elastic, FilmsByPersonIDsQuery, query_params, ["id"]),
+    )
+    result = await memory.search(
+        "film",
+        query_factory(memory, FilmsByPersonIDsQuery, query_params, ["id"]),
+    )
+
+    assert films(expected)
+    assert films(result) == films(expected)
@@ -1,16 +1,23 @@
+import pathlib
 from typing import Dict, Callable, Optional, Any, List
 from http import HTTPStatus
 from urllib.parse import urlencode
 from uuid import uuid4
-import pickle
 
+from elasticsearch import AsyncElasticsearch
 from redis.asyncio import Redis
 import pytest
 from aiohttp import ClientResponse
-from db.redis import form_key
+from db.cacher.local import LocalCache
+from db.redis import form_key, RedisCache
+from db.searcher.memory_searcher import InMemorySearchEngine
+from jobs.filmographies import materialize
 from models.person import Person
+from services import person as person_service
 from tests.functional.settings import test_settings
 
+TEST_DUMP_DIR = pathlib.Path(__file__).resolve().parent.parent / "test_dump"
+
 
 @pytest.mark.parametrize(
     "query_data, exp_answer",
@@ -104,10 +111,12 @@ async def test_cache_person_by_id(
     :param make_get_request: Фикстура для выполнения GET-запроса.
     """
     person_id = str(uuid4())
-    key = form_key("get_by_id", (person_id,), {})
+    key = form_key(
+        "PersonService.get_by_id", (person_id,), {}, grouped=True
+    )
     test_person_data = Person(id=person_id, full_name="CACHE", films=[])
 
-    await redis_client.set(key, pickle.dumps(test_person_data), ex=60)
+    await RedisCache(redis_client).set(key, test_person_data, 60)
 
     response = await make_get_request(test_settings.ES_PERSON_IDX, person_id)
     body = await response.json()
@@ -257,10 +266,12 @@ async def test_cache_get_films_by_person_id(
     и что кэш очищается после запроса
     """
     person_id = str(uuid4())
-    key = form_key("get_films_by_person_id", (person_id, 50, 1), {})
+    key = form_key(
+        "PersonService.get_films_by_person_id", (person_id, 50, 1), {}
+    )
     cached_data = get_short_list
 
-    await redis_client.set(key, pickle.dumps(cached_data), ex=60)
+    await RedisCache(redis_client).set(key, cached_data, 60)
 
     response = await make_request_persons_list(
         test_settings.ES_PERSON_IDX, person_id
@@ -278,3 +289,88 @@ async def test_cache_get_films_by_person_id(
     body = await response.json()
     assert response.status == HTTPStatus.OK
     assert body == []
+
+
+@pytest.mark.asyncio
+async def test_materialized_filmography(
+    es_client: AsyncElasticsearch,
+    redis_client: Redis,
+    make_get_request: Callable[[str, str], ClientResponse],
+):
+    """
+    Тестирует материализацию фильмографий в документы персон.
+
+    Проверяет, что пересчёт по изменённому фильму записывает в документ
+    персоны все её фильмы с ролями, а персона, собранная из такого
+    документа, совпадает с собранной по индексу film, а закэшированная
+    до пересчёта запись персоны удалена из кэша.
+    """
+    person_id = "a5a8f573-3cee-4ccc-8a2b-91cb9f55250a"
+    film_id = "3d825f60-9fff-4dfe-b294-1a45fa1e115d"
+    key = form_key("PersonService.get_by_id", (person_id,), {}, grouped=True)
+
+    await redis_client.delete(key)
+    response = await make_get_request(test_settings.ES_PERSON_IDX, person_id)
+    expected = {
+        film["uuid"]: set(film["roles"])
+        for film in (await response.json())["films"]
+    }
+
+    try:
+        updated = await materialize(
+            es_client, [film_id], cache=RedisCache(redis_client)
+        )
+        assert updated > 0
+        assert not await redis_client.exists(key)
+        await es_client.indices.refresh(index=test_settings.ES_PERSON_IDX)
+
+        doc = await es_client.get(
+            index=test_settings.ES_PERSON_IDX, id=person_id
+        )
+        materialized = {
+            film["id"]: set(film["roles"]) for film in doc["_source"]["films"]
+        }
+        assert materialized == expected
+        assert materialized[film_id] == {"director", "writer"}
+
+        response = await make_get_request(
+            test_settings.ES_PERSON_IDX, person_id
+        )
+        body = await response.json()
+        assert {
+            film["uuid"]: set(film["roles"]) for film in body["films"]
+        } == expected
+    finally:
+        # остальные тесты рассчитаны на документы без фильмографий
+        await es_client.update_by_query(
+            index=test_settings.ES_PERSON_IDX,
+            script={"source": "ctx._source.remove('films')"},
+            refresh=True,
+        )
+        await redis_client.delete(key)
+
+
+@pytest.mark.asyncio
+async def test_filmographies_beyond_first_page(monkeypatch):
+    """
+    Тестирует фильмографии персон, фильмы которых не помещаются
+    на одну страницу запроса: остальные страницы догружаются,
+    и фильмография совпадает с полученной одной страницей.
+    """
+    engine = InMemorySearchEngine.from_dump(
+        TEST_DUMP_DIR, dump_name="test_{index}_dump.json"
+    )
+    service = person_service.PersonService(
+        LocalCache(100, 2**24, 60), engine
+    )
+    ids = [
+        "a5a8f573-3cee-4ccc-8a2b-91cb9f55250a",
+        "26e83050-29ef-4163-a99d-b546cac208f8",
+    ]
+
+    expected = await service._get_filmographies(ids)
+    monkeypatch.setattr(person_service, "FILMS_PER_PERSON", 1)
+    result = await service._get_filmographies(ids)
+
+    assert sum(len(films) for films in expected.values()) > len(ids)
+    assert result == expected
@@ -3,16 +3,18 @@ from urllib.parse import urlencode
 from http import HTTPStatus
 from uuid import uuid4
 
+import orjson
 import pytest
-from aiohttp import ClientResponse
+from aiohttp import ClientResponse, ClientSession
 from pydantic import BaseModel
 from redis.asyncio import Redis
 
 from db.redis import form_key, RedisCache
 from schemas.film import FilmSchema
 from schemas.person import PersonSchema
-from models.film import Film
-from models.person import Person
+from schemas.suggest import SuggestSchema
+from models.page import RenderedPage
+from models.person import Person, PersonPage
 from tests.functional.settings import test_settings
 from tests.functional.utils.helpers import (
     perform_request_and_assert,
@@ -280,32 +282,34 @@ async def test_film_search_predicate(
 
 
 @pytest.mark.parametrize(
-    "fake_data, query_data, exp_answer, index",
+    "fake_data, query_data, exp_answer, index, method",
     [
         pytest.param(
-            [
-                Film(
-                    id=uuid4(),
-                    title="!Super-Star!",
-                    directors=[],
-                    actors=[],
-                    writers=[],
-                    genres=[],
-                )
-            ],
+            RenderedPage(
+                body=orjson.dumps(
+                    [{"uuid": str(uuid4()), "title": "!Super-Star!"}]
+                ),
+                ids=[],
+                total=1,
+            ),
             {"query": "Star", "page_size": 30, "page_number": 1},
             {"status": HTTPStatus.OK, "body_len": 1},
             test_settings.ES_FILM_IDX,
+            "render_search",
             id="cache films",
         ),
         pytest.param(
-            [
-                Person(id=uuid4(), full_name="Harrison Toyota", films=[]),
-                Person(id=uuid4(), full_name="Toyota Corolla", films=[]),
-            ],
+            PersonPage(
+                items=[
+                    Person(id=uuid4(), full_name="Harrison Toyota", films=[]),
+                    Person(id=uuid4(), full_name="Toyota Corolla", films=[]),
+                ],
+                total=2,
+            ),
             {"query": "Toyota", "page_size": 30, "page_number": 1},
             {"status": HTTPStatus.OK, "body_len": 2},
             test_settings.ES_PERSON_IDX,
+            "search",
             id="cache persons",
         ),
     ],
@@ -314,10 +318,11 @@ async def test_film_search_predicate(
 async def test_cache(
     make_get_request: Callable[[str, str], ClientResponse],
     redis_client: Redis,
-    fake_data: List[BaseModel],
+    fake_data: BaseModel,
     query_data: Dict[str, Any],
     exp_answer: Dict[str, Any],
     index: str,
+    method: str,
 ):
     """
     Test function for verifying the caching mechanism for search
@@ -327,7 +332,8 @@ async def test_cache(
     - make_get_request (Callable[[str, str], ClientResponse]):
         Fixture to make GET requests to the API endpoint.
     - redis_client (Redis): Redis client for interacting with the cache.
-    - fake_data (List[BaseModel]): List of fake data objects to be cached.
+    - fake_data (BaseModel): Page of fake data objects, or a page
+        already rendered into the response body, to be cached.
     - query_data (Dict[str, Any]):
         Dictionary containing the query parameters to
         be used in the API request.
@@ -338,6 +344,7 @@ async def test_cache(
     - index (str):
         The index or base URL for making the request
         (e.g., film or person index).
+    - method (str): The cached service method the endpoint reads.
 
     Actions:
     - Forms a cache key based on the query parameters.
@@ -350,7 +357,7 @@ async def test_cache(
     redis_cache = RedisCache(redis_client)
 
     key = form_key(
-        "search",
+        f"{index.capitalize()}Service.{method}",
         (
             query_data["query"],
             query_data["page_size"],
@@ -419,3 +426,55 @@ async def test_structure(
 
     for row in body:
         valid_schema.model_validate(row)
+
+
+@pytest.mark.parametrize(
+    "query_data, exp_answer",
+    [
+        pytest.param(
+            {"query": "star wa"},
+            {"status": HTTPStatus.OK, "films": 3, "persons": 0},
+            id="prefix of the last word",
+        ),
+        pytest.param(
+            {"query": "  STAR   Wa "},
+            {"status": HTTPStatus.OK, "films": 3, "persons": 0},
+            id="case and spaces",
+        ),
+        pytest.param(
+            {"query": "george luc"},
+            {"status": HTTPStatus.OK, "films": 0, "persons": 1},
+            id="person",
+        ),
+        pytest.param(
+            {"query": "star", "size": 2},
+            {"status": HTTPStatus.OK, "films": 2, "persons": 0},
+            id="size",
+        ),
+        pytest.param(
+            {"query": "s"},
+            {"status": HTTPStatus.UNPROCESSABLE_ENTITY},
+            id="too short",
+        ),
+    ],
+)
+@pytest.mark.asyncio
+async def test_suggest(
+    aiohttp_client: ClientSession,
+    query_data: Dict[str, Any],
+    exp_answer: Dict[str, Any],
+):
+    """
+    Тестирует подсказки по началу текста на '/suggest':
+    число найденных фильмов и персон и проверку длины текста.
+    """
+    url = f"{test_settings.SERVICE_URL}/api/v1/suggest/"
+
+    response = await aiohttp_client.get(f"{url}?{urlencode(query_data)}")
+
+    assert response.status == exp_answer["status"]
+    if response.status != HTTPStatus.OK:
+        return
+    body = SuggestSchema.model_validate(await response.json())
+    assert len(body.films) == exp_answer["films"]
+    assert len(body.persons) == exp_answer["persons"]